@@ -11,6 +11,7 @@ from form.data.validation import validate_required_fields
 from form.data.constants import *
 from form.utils.file_handling import save_uploaded_files
 from form.utils.recipients import determine_report_recipients
+from form.utils.hashing import content_hash, VOLATILE_FIELDS
 from storage.storage_interface import get_storage_provider
 from form.utils.recipients import display_submission_table
 
@@ -201,15 +202,33 @@ def show_report_submission_results(form_data):
     
     st.info(f"Here is the Report ID you can save for your reference in the future: **{report_id}**")
     
-    storage_provider = get_storage_provider()
-    
-    if not hasattr(storage_provider, 'initialized') or not storage_provider.initialized:
-        initialized = storage_provider.initialize()
+    # Reruns (downloads, recipient checkboxes) must not save the same report again
+    submission_key = f"{report_id}:{content_hash(complete_data, exclude=VOLATILE_FIELDS)}"
+    saved_submission = st.session_state.get('saved_submission')
     
-    report_path, machine_readable_output = storage_provider.save_report(complete_data)
+    if saved_submission and saved_submission["key"] == submission_key:
+        report_path, machine_readable_output = saved_submission["result"]
+    else:
+        # The provider is shared by the whole process and initializes itself on first use
+        storage_provider = get_storage_provider()
+        report_path, machine_readable_output = storage_provider.save_report(complete_data)
+        # A report that only reached session state was not saved, so the next rerun retries
+        if not report_path.startswith("session_state:"):
+            st.session_state['saved_submission'] = {
+                "key": submission_key,
+                "result": (report_path, machine_readable_output)
+            }
         
     st.subheader("Your Report Has Been Created")
     st.write("Your report has been saved and is available for download in the following formats:")
+    if report_path.startswith("spool:"):
+        spool = get_storage_provider().spool
+        if any(entry["report_id"] == report_id for entry in spool.dead_letters()):
+            st.error("Your report could not be published to the report database. Please download a copy and contact us.")
+        else:
+            st.caption("Your report is queued and will be published to the report database as soon as it is reachable.")
+    elif report_path.startswith("session_state:"):
+        st.warning("Your report could not be stored and is only kept for this session. Please download a copy.")
     
     col1, col2 = st.columns(2)
     
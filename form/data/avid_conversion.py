@@ -1,136 +1,79 @@
 import json
 from pathlib import Path
 from datetime import datetime, timezone
-
-def _load_any(obj):
-    """
-    Accepts dict, path to JSON file, or JSON string.
-    Returns a Python dict.
-    """
-    if isinstance(obj, dict):
-        return obj
-    if isinstance(obj, (str, Path)):
-        p = Path(str(obj))
-        if p.exists():
-            with open(p, "r", encoding="utf-8") as f:
-                return json.load(f)
-        try:
-            return json.loads(str(obj))
-        except json.JSONDecodeError as e:
-            raise TypeError(
-                "Input must be a dict, a path to a JSON file, or a JSON string."
-            ) from e
-    raise TypeError("Input must be a dict, a path to a JSON file, or a JSON string.")
-
-def _first(lst, default=None):
-    if isinstance(lst, list) and lst:
-        return lst[0]
-    return default
-
-def _collect_system_info(data: dict):
-    """
-    Returns (product_name, product_version, vendor_name, all_systems).
-    """
-    product_name = "Unknown System"
-    product_version = ""
-    vendor_name = "Unknown"
-    all_systems = []
-
-    if "Systems" in data and isinstance(data["Systems"], list) and data["Systems"]:
-        all_systems = data["Systems"]
-        product_name = all_systems[0]
-
-    return product_name, product_version, vendor_name, all_systems
-
-def _get_list(data: dict, *keys):
-    for k in keys:
-        if k in data and isinstance(data[k], list):
-            return data[k]
-    return []
-
-def _get_str(data: dict, *keys, default=""):
-    for k in keys:
-        v = data.get(k)
-        if isinstance(v, str) and v.strip() != "":
-            return v
-    return default
-
-def _get_from_nested(data: dict, path: list, default=None):
-    cur = data
-    for key in path:
-        if isinstance(cur, dict) and key in cur:
-            cur = cur[key]
-        else:
-            return default
-    return cur
-
-def _map_system_to_vendor(system_name: str) -> dict:
-    """Maps AI system names to their developers/deployers."""
-    vendor_mapping = {
-        "GPT-3.5-Turbo": {"developer": "OpenAI", "deployer": "OpenAI"},
-        "GPT-4": {"developer": "OpenAI", "deployer": "OpenAI"},
-        "GPT-4o": {"developer": "OpenAI", "deployer": "OpenAI"},
-        "Claude": {"developer": "Anthropic", "deployer": "Anthropic"},
-        "Claude 3": {"developer": "Anthropic", "deployer": "Anthropic"},
-        "Claude 3.5": {"developer": "Anthropic", "deployer": "Anthropic"},
-        "Gemini": {"developer": "Google", "deployer": "Google"},
-        "PaLM": {"developer": "Google", "deployer": "Google"},
-        "LLaMA": {"developer": "Meta", "deployer": "Meta"},
-        "Llama": {"developer": "Meta", "deployer": "Meta"},
-        "Copilot": {"developer": "Microsoft", "deployer": "Microsoft"},
-        "DALL-E": {"developer": "OpenAI", "deployer": "OpenAI"},
-        "DALL-E 2": {"developer": "OpenAI", "deployer": "OpenAI"},
-        "DALL-E 3": {"developer": "OpenAI", "deployer": "OpenAI"},
-        "Midjourney": {"developer": "Midjourney Inc", "deployer": "Midjourney Inc"},
-        "Stable Diffusion": {"developer": "Stability AI", "deployer": "Stability AI"},
-        "BERT": {"developer": "Google", "deployer": "HuggingFace"},
-        "bert-base-uncased": {"developer": "Google", "deployer": "HuggingFace"}
+from form.data.report_ir import ReportIR, parse_report
+from form.data.org_resolver import get_org_resolver
+
+# Impacts mapped to AVID risk domains and SEP view based on actual AVID taxonomy
+IMPACT_TO_RISK_MAPPING = {
+    "Discrimination/Bias": {
+        "domain": "Ethics",
+        "sep": ["E0100: Bias/ Discrimination", "E0101: Group fairness"]
+    },
+    "Privacy": {
+        "domain": "Privacy",
+        "sep": ["P0300: Privacy", "P0301: Anonymization"]
+    },
+    "Misinformation": {
+        "domain": "Ethics",
+        "sep": ["E0400: Misinformation", "E0401: Deliberative Misinformation"]
+    },
+    "Safety": {
+        "domain": "Performance",
+        "sep": ["P0400: Safety", "P0402: Physical safety"]
+    },
+    "Security": {
+        "domain": "Security",
+        "sep": ["S0100: Software Vulnerability"]
+    },
+    "Environmental": {
+        "domain": "Performance",
+        "sep": ["P0404: Environmental safety"]
     }
-    return vendor_mapping.get(system_name, {"developer": "Unknown", "deployer": "Unknown"})
+}
 
 def convert_to_avid_format(raw_or_path) -> dict:
     """
     Converts AI flaw report (raw form JSON) into AVID format.
-    Accepts dict, path to JSON file, or JSON string.
+    Accepts dict, path to JSON file, JSON string, or a parsed ReportIR.
     """
-    data = _load_any(raw_or_path)
+    return avid_from_ir(parse_report(raw_or_path))
 
-    product_name, product_version, vendor_name, all_systems = _collect_system_info(data)
+def avid_from_ir(ir: ReportIR) -> dict:
+    """Builds the AVID report from a parsed report."""
+    all_systems = ir.systems
+    product_name = ir.product_name or "Unknown System"
+    vendor_name = ir.publisher_name or "Unknown"
 
     # artifacts, developers, and deployers lists
     artifacts = []
-    developers = set()
-    deployers = set()
+    developers = {}  # insertion-ordered set, so output is stable across processes
+    deployers = {}
 
+    resolver = get_org_resolver()
     for system in all_systems:
         artifacts.append({
             "type": "Model",
             "name": system
         })
-        vendor_info = _map_system_to_vendor(system)
-        developers.add(vendor_info["developer"])
-        deployers.add(vendor_info["deployer"])
+        vendor_info = resolver.resolve(system)
+        developers[vendor_info["developer"]] = None
+        deployers[vendor_info["deployer"]] = None
 
     if not artifacts:
         artifacts.append({"type": "Model", "name": product_name})
         if vendor_name and vendor_name != "Unknown":
-            developers.add(vendor_name)
-            deployers.add(vendor_name)
+            developers[vendor_name] = None
+            deployers[vendor_name] = None
 
-    report_id = _get_str(data, "Report ID", "identifier", default=None)
-    if not report_id:
-        atid = data.get("@id", "")
-        if isinstance(atid, str) and atid.rsplit("/", 1)[-1]:
-            report_id = atid.rsplit("/", 1)[-1]
-        else:
-            report_id = f"TEMP-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}"
+    report_id = ir.report_id or f"TEMP-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}"
 
     year = datetime.now().year
     avid_report_id = f"AVID-{year}-R{report_id[:4].upper()}" if len(report_id) >= 4 else f"AVID-{year}-RXXXX"
 
-    report_types = _get_list(data, "Report Types", "reportType")
-    impacts = _get_list(data, "Impacts", "impacts")
-    specific_harms = _get_list(data, "Specific Harm Types", "aifr:specificHarmTypes")
+    report_types = ir.report_types
+    impacts = ir.impacts
+    specific_harms = ir.specific_harms
 
     # Map to AVID ClassEnum: "AIID Incident", "ATLAS Case Study", "CVE Entry", "LLM Evaluation", "Undefined"
     classof = "LLM Evaluation"  # Default
@@ -155,13 +98,12 @@ def convert_to_avid_format(raw_or_path) -> dict:
         problem_type = "Measurement"
 
     # description
-    description = _get_str(
-        data,
-        "Flaw Description",
-        "Incident Description",
-        "Incident Description - Detailed",
-        "Flaw Description - Detailed",
-        "description",
+    description = ir.first_text(
+        "flaw_description",
+        "incident_description",
+        "incident_description_detailed",
+        "flaw_description_detailed",
+        "jsonld_description",
         default="No description provided"
     )
    
@@ -177,35 +119,8 @@ def convert_to_avid_format(raw_or_path) -> dict:
     risk_domains = []
     sep_views = []
 
-    impact_to_risk_mapping = {
-        "Discrimination/Bias": {
-            "domain": "Ethics",
-            "sep": ["E0100: Bias/ Discrimination", "E0101: Group fairness"]
-        },
-        "Privacy": {
-            "domain": "Privacy",
-            "sep": ["P0300: Privacy", "P0301: Anonymization"]
-        },
-        "Misinformation": {
-            "domain": "Ethics",
-            "sep": ["E0400: Misinformation", "E0401: Deliberative Misinformation"]
-        },
-        "Safety": {
-            "domain": "Performance",
-            "sep": ["P0400: Safety", "P0402: Physical safety"]
-        },
-        "Security": {
-            "domain": "Security",
-            "sep": ["S0100: Software Vulnerability"]
-        },
-        "Environmental": {
-            "domain": "Performance",
-            "sep": ["P0404: Environmental safety"]
-        }
-    }
-
     for impact in impacts:
-        mapping = impact_to_risk_mapping.get(impact)
+        mapping = IMPACT_TO_RISK_MAPPING.get(impact)
         if mapping:
             if mapping["domain"] not in risk_domains:
                 risk_domains.append(mapping["domain"])
@@ -228,9 +143,9 @@ def convert_to_avid_format(raw_or_path) -> dict:
 
     # metrics
     metrics = []
-    detection_methods = _get_list(data, "Detection", "aifr:detectionMethods")
-    severity = _get_str(data, "Severity", "severity", default="Unknown")
-    prevalence = _get_str(data, "Prevalence", "prevalence", default="Unknown")
+    detection_methods = ir.detection_methods
+    severity = ir.severity or "Unknown"
+    prevalence = ir.prevalence or "Unknown"
 
     if detection_methods:
         for method in detection_methods:
@@ -253,7 +168,7 @@ def convert_to_avid_format(raw_or_path) -> dict:
 
             # Add sensitive attributes if bias-related
             if "Discrimination/Bias" in impacts:
-                stakeholders = _get_list(data, "Impacted Stakeholder(s)", "aifr:impactedStakeholders")
+                stakeholders = ir.stakeholders
                 if stakeholders:
                     metric["results"]["sensitive_attributes"] = stakeholders
 
@@ -262,19 +177,14 @@ def convert_to_avid_format(raw_or_path) -> dict:
     # references
     references = []
 
-    poc = _get_str(data, "Proof-of-Concept Exploit", default="")
-    if not poc:
-        poc = _get_from_nested(data, ["aifr:vulnerability", "aifr:proofOfConcept"], default="")
-   
-    if poc:
+    if ir.proof_of_concept:
         references.append({
             "type": "source",
             "label": "Proof of Concept",
             "url": ""  # URL would need to be provided
         })
 
-    context_info = _get_str(data, "Context Info", "aifr:contextInfo", default="")
-    if context_info:
+    if ir.context_info:
         references.append({
             "type": "misc",
             "label": "Additional Context",
@@ -283,15 +193,14 @@ def convert_to_avid_format(raw_or_path) -> dict:
 
     # credit
     credit = []
-    reporter_id = _get_str(data, "Reporter ID", default="")
-   
+    reporter_id = ir.reporter_id
     if reporter_id:
         credit.append({
             "lang": "eng",
             "value": f"Reporter: {reporter_id}"
         })
 
-    submitter_rel = _get_str(data, "Submitter Relationship", default="")
+    submitter_rel = ir.submitter_relationship
     if submitter_rel:
         credit.append({
             "lang": "eng",
@@ -301,8 +210,8 @@ def convert_to_avid_format(raw_or_path) -> dict:
     if not credit:
         credit.append({"lang": "eng", "value": "Anonymous"})
 
-    submission_timestamp = _get_str(data, "Submission Timestamp", "dateCreated", default="")
-    flaw_timestamp = _get_str(data, "Flaw Timestamp Start", default="")
+    submission_timestamp = ir.submission_timestamp
+    flaw_timestamp = ir.flaw_timestamp
 
     reported_date = None
     if submission_timestamp:
@@ -363,6 +272,7 @@ def convert_to_avid_format(raw_or_path) -> dict:
     return avid_report
 
 if __name__ == "__main__":
-    ai_flaw_example = "/Users/elainezhu/Downloads/ai_flaw_report_67120781-6f5a-4bdf-973b-e2355161a7bd.json"
-    avid_report = convert_to_avid_format(ai_flaw_example)
-    print(json.dumps(avid_report, indent=4))
\ No newline at end of file
+    # Convert the report files given on the command line; use form.data.batch_convert for bulk exports
+    import sys
+    for report_path in sys.argv[1:]:
+        print(json.dumps(convert_to_avid_format(Path(report_path)), indent=4))
@@ -0,0 +1,163 @@
+import sys
+import json
+import argparse
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from form.data.batch_jsonld import BatchStats, _init_worker, iter_form_records, map_chunks
+from form.data.conversion import FORMATS, emit_format
+from form.data.report_ir import ReportIR
+
+# Formats converted by default; JSON-LD regeneration has its own CLI in batch_jsonld
+DEFAULT_FORMATS = ["avid", "cert", "mitre"]
+
+
+def _convert_chunk(chunk: List[Tuple[int, Dict[str, Any]]], formats: Tuple[str, ...],
+                   trusted: bool = False) -> List[Dict[str, Any]]:
+    """
+    Convert a chunk of reports into every requested format
+
+    Each report is parsed once. Outputs are serialized in the worker so only
+    strings travel back to the parent process. A failing format does not stop
+    the other formats of the same report.
+    """
+    results = []
+    for index, form_data in chunk:
+        report_id = form_data.get("Report ID") if isinstance(form_data, dict) else None
+        outputs = {}
+        errors = {}
+        try:
+            ir = ReportIR(form_data)
+        except Exception as e:
+            errors = {name: f"{type(e).__name__}: {e}" for name in formats}
+        else:
+            for name in formats:
+                try:
+                    outputs[name] = json.dumps(emit_format(ir, name, trusted=trusted), default=str)
+                except Exception as e:
+                    errors[name] = f"{type(e).__name__}: {e}"
+        results.append({"index": index, "report_id": report_id, "outputs": outputs,
+                        "errors": errors, "error": "; ".join(errors.values()) or None})
+    return results
+
+
+def convert_batch(records: Iterable[Any], formats: Optional[List[str]] = None, workers: Optional[int] = None,
+                  chunk_size: int = 256, stats: Optional[BatchStats] = None,
+                  trusted: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Convert many reports into AVID / CERT / MITRE (and optionally JSON-LD) across worker processes
+
+    Args:
+        records: Raw form dicts or stored report records (see iter_form_records)
+        formats: Output formats from conversion.FORMATS (default: DEFAULT_FORMATS)
+        workers: Number of worker processes (default: CPU count); 1 runs in-process
+        chunk_size: Records per task sent to a worker
+        stats: Optional BatchStats updated as results are yielded
+        trusted: Skip validation when generating JSON-LD for stored reports that already passed it
+
+    Yields:
+        {"index", "report_id", "outputs", "errors", "error"} dicts in input order; outputs
+        maps each converted format to its JSON string, errors maps each failed format to
+        its error message
+    """
+    formats = tuple(formats or DEFAULT_FORMATS)
+    unknown = [f for f in formats if f not in FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown output formats: {unknown}")
+
+    # Only JSON-LD needs the knowledge base and contexts warmed up in each worker
+    initializer = _init_worker if "jsonld" in formats else None
+    yield from map_chunks(records, partial(_convert_chunk, formats=formats, trusted=trusted),
+                          workers, chunk_size, initializer, stats)
+
+
+class FormatWriter:
+    """
+    Write one output format as NDJSON, either to a single file or to numbered part files
+
+    With records_per_file set, lines go to <directory>/part-00000.ndjson,
+    part-00001.ndjson, ... so large exports can be handed off in pieces.
+    """
+
+    def __init__(self, output_dir: Path, name: str, records_per_file: Optional[int] = None):
+        self.output_dir = Path(output_dir)
+        self.name = name
+        self.records_per_file = records_per_file
+        self.records = 0
+        self._part = 0
+        self._file: Optional[TextIO] = None
+
+    def _open_next(self):
+        if self._file:
+            self._file.close()
+        if self.records_per_file:
+            part_dir = self.output_dir / self.name
+            part_dir.mkdir(parents=True, exist_ok=True)
+            path = part_dir / f"part-{self._part:05d}.ndjson"
+            self._part += 1
+        else:
+            path = self.output_dir / f"{self.name}.ndjson"
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, line: str):
+        if self._file is None or (self.records_per_file and self.records % self.records_per_file == 0):
+            self._open_next()
+        self._file.write(line + "\n")
+        self.records += 1
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Convert AI flaw reports to AVID, CERT VRF and MITRE ATLAS in bulk")
+    parser.add_argument("source", help='JSON, JSONL/NDJSON or Parquet file, a directory of report JSON files, '
+                                       'or "-" for JSONL on stdin')
+    parser.add_argument("-o", "--output-dir", required=True, help="Directory for the converted output")
+    parser.add_argument("-f", "--formats", default=",".join(DEFAULT_FORMATS),
+                        help=f"Comma-separated output formats out of {', '.join(FORMATS)}")
+    parser.add_argument("--records-per-file", type=int, default=None,
+                        help="Split each format into part files of this many records (default: one file per format)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Records per worker task")
+    parser.add_argument("--trusted", action="store_true",
+                        help="Skip validation for stored reports that already passed it (JSON-LD only)")
+    parser.add_argument("--progress-every", type=int, default=10000, help="Print throughput every N records")
+    args = parser.parse_args(argv)
+
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    stats = BatchStats()
+    writers = {name: FormatWriter(output_dir, name, args.records_per_file) for name in formats}
+    error_log = open(output_dir / "errors.ndjson", "w", encoding="utf-8")
+    try:
+        results = convert_batch(iter_form_records(args.source), formats, args.workers, args.chunk_size, stats,
+                                trusted=args.trusted)
+        for result in results:
+            for name, line in result["outputs"].items():
+                writers[name].write(line)
+            for name, error in result["errors"].items():
+                error_log.write(json.dumps({"index": result["index"], "report_id": result["report_id"],
+                                            "format": name, "error": error}) + "\n")
+            if args.progress_every and stats.records % args.progress_every == 0:
+                print(stats.summary(), file=sys.stderr)
+    finally:
+        for writer in writers.values():
+            writer.close()
+        error_log.close()
+
+    print(stats.summary(), file=sys.stderr)
+    for name, writer in writers.items():
+        print(f"  {name}: {writer.records} records", file=sys.stderr)
+    if stats.errors:
+        print(f"  errors logged to {output_dir / 'errors.ndjson'}", file=sys.stderr)
+    return 1 if stats.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
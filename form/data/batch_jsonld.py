@@ -0,0 +1,245 @@
+import os
+import sys
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from form.data.schema import build_machine_readable_output, get_knowledge_base
+from form.data.jsonld_loader import get_document_loader
+
+# Minimal report used to warm the knowledge base and pyld context caches in each worker
+_WARMUP_RECORD = {
+    "Report ID": "warmup",
+    "Flaw Description": "warmup",
+    "Systems": [],
+    "Disclosure Intent": "No",
+}
+
+
+def _form_data_of(record: Any) -> Dict[str, Any]:
+    """Accept raw form dicts as well as stored report records ({"form_data": ...})"""
+    if isinstance(record, str):
+        record = json.loads(record)
+    if isinstance(record, dict) and "form_data" in record:
+        form_data = record["form_data"]
+        return json.loads(form_data) if isinstance(form_data, str) else form_data
+    if isinstance(record, dict) and "report" in record:
+        # Spool outbox entries wrap the stored record
+        return _form_data_of(record["report"])
+    return record
+
+
+def iter_form_records(source: Union[str, Path, Iterable[Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Stream raw form dicts from a source
+
+    Args:
+        source: An iterable of form dicts / stored records, or a path to a .json file
+            (one record or a list), a .jsonl/.ndjson file, a .parquet file with a form_data
+            column, a directory of .json report files, or "-" for JSONL on stdin
+
+    Yields:
+        Raw form data dicts
+    """
+    if not isinstance(source, (str, Path)):
+        for record in source:
+            yield _form_data_of(record)
+        return
+    if str(source) == "-":
+        for line in sys.stdin:
+            if line.strip():
+                yield _form_data_of(json.loads(line))
+        return
+
+    path = Path(source)
+    if path.is_dir():
+        for file_path in sorted(path.rglob("*.json")):
+            with open(file_path, "r", encoding="utf-8") as f:
+                yield _form_data_of(json.load(f))
+    elif path.suffix in (".jsonl", ".ndjson"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield _form_data_of(json.loads(line))
+    elif path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(columns=["form_data"]):
+            for form_data in batch.column(0).to_pylist():
+                yield _form_data_of({"form_data": form_data})
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for record in (data if isinstance(data, list) else [data]):
+            yield _form_data_of(record)
+
+
+def _init_worker():
+    """Load the knowledge base and JSON-LD contexts once per worker process"""
+    get_knowledge_base()
+    get_document_loader()
+    try:
+        build_machine_readable_output(dict(_WARMUP_RECORD))
+    except Exception:
+        pass
+
+
+def _process_chunk(chunk: List[Tuple[int, Dict[str, Any]]], trusted: bool = False) -> List[Dict[str, Any]]:
+    results = []
+    for index, form_data in chunk:
+        report_id = form_data.get("Report ID") if isinstance(form_data, dict) else None
+        try:
+            output = build_machine_readable_output(form_data, trusted=trusted)
+            results.append({"index": index, "report_id": report_id, "machine_readable": output, "error": None})
+        except Exception as e:
+            results.append({"index": index, "report_id": report_id, "machine_readable": None,
+                            "error": f"{type(e).__name__}: {e}"})
+    return results
+
+
+class BatchStats:
+    """Running counters for a batch run"""
+
+    def __init__(self):
+        self.records = 0
+        self.errors = 0
+        self.started_at = time.monotonic()
+
+    def add(self, result: Dict[str, Any]):
+        self.records += 1
+        if result["error"]:
+            self.errors += 1
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def rate(self) -> float:
+        """Records per second"""
+        return self.records / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.records} records, {self.errors} errors in {self.elapsed:.1f}s "
+                f"({self.rate:.1f} records/s)")
+
+
+def map_chunks(records: Iterable[Any], process_chunk: Callable[[List[Tuple[int, Dict[str, Any]]]], List[Dict[str, Any]]],
+               workers: Optional[int] = None, chunk_size: int = 32, initializer: Optional[Callable[[], None]] = None,
+               stats: Optional[BatchStats] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Run a chunk function over many reports across worker processes
+
+    Work is submitted in chunks with a bounded number in flight, so arbitrarily
+    large sources stream in constant memory. Results come back in input order.
+
+    Args:
+        records: Raw form dicts or stored report records (see iter_form_records)
+        process_chunk: Picklable function taking a list of (index, form_data) pairs and
+            returning one result dict (with an "error" key) per pair
+        workers: Number of worker processes (default: CPU count); 1 runs in-process
+        chunk_size: Records per task sent to a worker
+        initializer: Optional function run once in each worker
+        stats: Optional BatchStats updated as results are yielded
+
+    Yields:
+        The result dicts returned by process_chunk
+    """
+    numbered = enumerate(_form_data_of(record) for record in records)
+    chunks = iter(lambda: list(islice(numbered, chunk_size)), [])
+
+    if workers == 1:
+        if initializer:
+            initializer()
+        for chunk in chunks:
+            for result in process_chunk(chunk):
+                if stats:
+                    stats.add(result)
+                yield result
+        return
+
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=initializer)
+    max_in_flight = workers * 4
+    pending = deque()
+    try:
+        for chunk in chunks:
+            pending.append(executor.submit(process_chunk, chunk))
+            while len(pending) >= max_in_flight or (pending and pending[0].done()):
+                for result in pending.popleft().result():
+                    if stats:
+                        stats.add(result)
+                    yield result
+        while pending:
+            for result in pending.popleft().result():
+                if stats:
+                    stats.add(result)
+                yield result
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def generate_batch(records: Iterable[Any], workers: Optional[int] = None, chunk_size: int = 32,
+                   stats: Optional[BatchStats] = None, trusted: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Generate JSON-LD for many reports across worker processes
+
+    Args:
+        records: Raw form dicts or stored report records (see iter_form_records)
+        workers: Number of worker processes (default: CPU count); 1 runs in-process
+        chunk_size: Records per task sent to a worker
+        stats: Optional BatchStats updated as results are yielded
+        trusted: Skip pydantic validation; only for reports that were stored after validation
+
+    Yields:
+        {"index", "report_id", "machine_readable", "error"} dicts in input order;
+        machine_readable is the JSON-LD string, or None when error is set
+    """
+    yield from map_chunks(records, partial(_process_chunk, trusted=trusted), workers, chunk_size,
+                          _init_worker, stats)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Regenerate JSON-LD for a corpus of AI flaw reports")
+    parser.add_argument("source", help="JSON, JSONL or Parquet file, or a directory of report JSON files")
+    parser.add_argument("-o", "--output", help="Output JSONL file (default: stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=32, help="Records per worker task")
+    parser.add_argument("--trusted", action="store_true",
+                        help="Skip validation for stored reports that already passed it")
+    parser.add_argument("--progress-every", type=int, default=1000, help="Print throughput every N records")
+    args = parser.parse_args(argv)
+
+    stats = BatchStats()
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for result in generate_batch(iter_form_records(args.source), args.workers, args.chunk_size, stats,
+                                     trusted=args.trusted):
+            line = {
+                "index": result["index"],
+                "report_id": result["report_id"],
+                "machine_readable": json.loads(result["machine_readable"]) if result["machine_readable"] else None,
+                "error": result["error"],
+            }
+            out.write(json.dumps(line) + "\n")
+            if result["error"]:
+                print(f"record {result['index']} ({result['report_id']}): {result['error']}", file=sys.stderr)
+            if args.progress_every and stats.records % args.progress_every == 0:
+                print(stats.summary(), file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(stats.summary(), file=sys.stderr)
+    return 1 if stats.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Union
+
+from form.data.report_ir import ReportIR, parse_report
+from form.data.avid_conversion import avid_from_ir
+from form.data.cert_conversion import cert_from_ir
+from form.data.mitre_conversion import mitre_from_ir
+
+def jsonld_from_ir(ir: ReportIR, trusted: bool = False) -> Dict[str, Any]:
+    """Build the JSON-LD document; JSON-LD input is returned as is"""
+    if ir.is_jsonld:
+        return ir.data
+    from form.data.schema import build_jsonld_document
+
+    return build_jsonld_document(ir.data, trusted=trusted)
+
+# Output formats, in the order they are emitted
+EMITTERS: Dict[str, Callable[[ReportIR], Dict[str, Any]]] = {
+    "avid": avid_from_ir,
+    "cert": cert_from_ir,
+    "mitre": mitre_from_ir,
+    "jsonld": jsonld_from_ir,
+}
+
+FORMATS = list(EMITTERS)
+
+def emit_format(ir: ReportIR, name: str, trusted: bool = False) -> Dict[str, Any]:
+    """Emit one output format from a parsed report"""
+    if name == "jsonld":
+        return jsonld_from_ir(ir, trusted=trusted)
+    return EMITTERS[name](ir)
+
+def convert_report(raw_or_path: Union[ReportIR, dict, str, Path],
+                   formats: Optional[Iterable[str]] = None, trusted: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Convert one report into several output formats in a single pass
+
+    The report is loaded and normalized into a ReportIR once and every
+    requested format is emitted from it.
+
+    Args:
+        raw_or_path: A dict, a path to a JSON file, a JSON string or a ReportIR
+        formats: Any subset of FORMATS (default: all of them)
+        trusted: Skip validation when generating JSON-LD for stored reports that already passed it
+
+    Returns:
+        Dict mapping each requested format to its output document
+    """
+    formats = list(formats) if formats is not None else FORMATS
+    unknown = [f for f in formats if f not in EMITTERS]
+    if unknown:
+        raise ValueError(f"Unknown output formats: {unknown}")
+
+    ir = parse_report(raw_or_path)
+    return {name: emit_format(ir, name, trusted=trusted) for name in formats}
@@ -40,7 +40,7 @@ form_entries = {
     "ai_systems": FormEntry(
         name="ai_systems",
         title="AI System(s)",
-        input_type=InputType.MULTISELECT,
+        input_type=InputType.SEARCHABLE_MULTISELECT,
         options=[],
         required=True,
         help_text="Pick all the AI versions you used when you found the problem.",
@@ -1,16 +1,25 @@
-import requests
 import streamlit as st
 from form.data.constants import PRIORITY_MODELS
-from difflib import get_close_matches
+from form.data.model_catalog import get_model_catalog
+from form.data.model_search import get_search_index
+
+# Selector entries that are not Hub IDs; they are searched along with the model catalog
+PINNED_SYSTEMS = (*PRIORITY_MODELS, "Other")
+
+def get_systems_search_index():
+    """Search index of the AI systems selectors: the whole model catalog, with PINNED_SYSTEMS first"""
+    return get_search_index(pinned=PINNED_SYSTEMS)
 
-@st.cache_data(ttl=3600) # Cache results for 1 hour
 def fetch_top_huggingface_models(limit=400, include_priority=True):
     """
-    Fetch the top models from Hugging Face based on downloads,
+    Get the top models from Hugging Face based on downloads,
     with priority models at the top of the list.
     
+    Models come from the on-disk catalog snapshot (see model_catalog), which a
+    background thread refreshes from the Hub, so this never waits on the network.
+    
     Args:
-        limit (int): Number of models to fetch (default: 400)
+        limit (int): Number of catalog models to include (default: 400)
         include_priority (bool): Whether to include priority models at the top
     
     Returns:
@@ -22,47 +31,19 @@ def fetch_top_huggingface_models(limit=400, include_priority=True):
     else:
         result_models = []
     
-    try:
-        api_url = "https://huggingface.co/api/models"
-        
-        params = {
-            "sort": "downloads",
-            "direction": "-1",
-            "limit": limit
-        }
-        
-        response = requests.get(api_url, params=params)
-        
-        if response.status_code == 200:
-            models_data = response.json()
-            
-            hf_model_names = [model["modelId"] for model in models_data]
-            
-            # Add models from Hugging Face that aren't already in priority list
-            for model in hf_model_names:
-                if model not in result_models:
-                    result_models.append(model)
-            
-            result_models.append("Other")
-            
-            return result_models
-        else:
-            st.warning(f"Failed to fetch models from Hugging Face API. Status code: {response.status_code}")
-            # Return priority models + default message in case of API failure
-            if include_priority:
-                result_models.append("Other")
-                return result_models
-            else:
-                return ["Failed to load models", "Other"]
-    
-    except Exception as e:
-        st.error(f"Error fetching models from Hugging Face: {str(e)}")
-        # Return priority models + error message in case of exception
-        if include_priority:
-            result_models.append("Other")
-            return result_models
-        else:
-            return ["Error loading models", "Other"]
+    seen = set(result_models)
+    for model in get_model_catalog().model_ids(limit):
+        # Add models from Hugging Face that aren't already in priority list
+        if model not in seen:
+            result_models.append(model)
+            seen.add(model)
+    
+    if not include_priority and not result_models:
+        return ["Failed to load models", "Other"]
+    
+    result_models.append("Other")
+    
+    return result_models
 
 def get_systems_options(use_api=True, include_priority=True):
     """
@@ -97,15 +78,18 @@ def get_systems_options(use_api=True, include_priority=True):
         from form.data.constants import SYSTEM_OPTIONS
         return SYSTEM_OPTIONS
     
-def searchable_model_selector(available_models, key_prefix="model", max_selections=10, help_text=None):
+def searchable_model_selector(available_models, key_prefix="model", max_selections=10, help_text=None,
+                              search_index=None):
     """
     An improved searchable model selector with better UI elements for dark theme
     
     Args:
-        available_models (list): List of available model options to choose from
+        available_models (list): Available model options (searched through search_index)
         key_prefix (str): Prefix for session state keys to avoid conflicts
         max_selections (int): Maximum number of models that can be selected
         help_text (str): Help text to display with the selector
+        search_index (ModelSearchIndex, optional): Index searched as the user types
+            (default: get_systems_search_index(), the whole model catalog)
     
     Returns:
         list: List of selected models (including any custom entries)
@@ -116,19 +100,10 @@ def searchable_model_selector(available_models, key_prefix="model", max_selectio
         st.session_state[f"{key_prefix}_current_input"] = current_input
         
         if current_input:
-            input_lower = current_input.lower()
-            
-            exact_matches = [model for model in available_models 
-                            if input_lower in model.lower() 
-                            and model not in st.session_state[f"{key_prefix}_selections"]]
-            
-            if not exact_matches:
-                close_matches = get_close_matches(current_input, available_models, n=5, cutoff=0.6)
-                
-                suggestions = [match for match in close_matches 
-                              if match not in st.session_state[f"{key_prefix}_selections"]]
-            else:
-                suggestions = sorted(exact_matches, key=lambda x: (len(x), x))[:5]
+            # Substring matches, or close matches when nothing contains the input
+            index = search_index if search_index is not None else get_systems_search_index()
+            suggestions = index.suggest(current_input, limit=5, cutoff=0.6,
+                                        exclude=set(st.session_state[f"{key_prefix}_selections"]))
             
             st.session_state[f"{key_prefix}_suggestions"] = suggestions
         else:
@@ -265,15 +240,20 @@ def searchable_select_with_other(available_models, key_prefix, title=None, capti
     
     return selected, other_text
 
-def searchable_dropdown_selector(available_models, key_prefix="model", max_selections=10, help_text=None):
+def searchable_dropdown_selector(available_models, key_prefix="model", max_selections=10, help_text=None,
+                                 search_index=None, label="Search AI systems", placeholder="Search AI systems..."):
     """
     A searchable dropdown selector where selected models appear as tags in the search bar
     
     Args:
-        available_models (list): List of available model options to choose from
+        available_models (list): Models suggested before anything is typed
         key_prefix (str): Prefix for session state keys to avoid conflicts
         max_selections (int): Maximum number of models that can be selected
         help_text (str): Help text to display with the selector
+        search_index (ModelSearchIndex, optional): Index searched as the user types
+            (default: get_systems_search_index(), the whole model catalog)
+        label (str): Accessible label of the search box (the field title is shown above it)
+        placeholder (str): Placeholder of the search box
     
     Returns:
         list: List of selected models
@@ -284,21 +264,10 @@ def searchable_dropdown_selector(available_models, key_prefix="model", max_selec
         st.session_state[f"{key_prefix}_current_input"] = current_input
         
         if current_input:
-            input_lower = current_input.lower()
-            
-            # Find exact matches first
-            exact_matches = [model for model in available_models 
-                            if input_lower in model.lower() 
-                            and model not in st.session_state[f"{key_prefix}_selections"]]
-            
-            if not exact_matches:
-                # Fall back to close matches if no exact matches
-                close_matches = get_close_matches(current_input, available_models, n=10, cutoff=0.4)
-                suggestions = [match for match in close_matches 
-                              if match not in st.session_state[f"{key_prefix}_selections"]]
-            else:
-                # Sort exact matches by length (shorter first) and alphabetically
-                suggestions = sorted(exact_matches, key=lambda x: (len(x), x))[:10]
+            # Substring matches ranked by popularity, falling back to close matches
+            index = search_index if search_index is not None else get_systems_search_index()
+            suggestions = index.suggest(current_input, limit=10, cutoff=0.4,
+                                        exclude=set(st.session_state[f"{key_prefix}_selections"]))
             
             st.session_state[f"{key_prefix}_suggestions"] = suggestions
         else:
@@ -307,20 +276,19 @@ def searchable_dropdown_selector(available_models, key_prefix="model", max_selec
                              if model not in st.session_state[f"{key_prefix}_selections"] and model != "Other"]
             st.session_state[f"{key_prefix}_suggestions"] = popular_models
     
+    # Button callbacks run before the script reruns, while the search box can still be reset
     def add_selection(model_name):
         if model_name and model_name not in st.session_state[f"{key_prefix}_selections"]:
             if len(st.session_state[f"{key_prefix}_selections"]) < max_selections:
                 st.session_state[f"{key_prefix}_selections"].append(model_name)
                 st.session_state[f"{key_prefix}_current_input"] = ""
                 st.session_state[f"{key_prefix}_text_input"] = ""
-                st.rerun()
-            else:
-                st.warning(f"Maximum of {max_selections} models can be selected.")
+                on_input_change()
     
     def remove_selection(index):
         if 0 <= index < len(st.session_state[f"{key_prefix}_selections"]):
             st.session_state[f"{key_prefix}_selections"].pop(index)
-            st.rerun()
+            on_input_change()
     
     # Initialize session state
     if f"{key_prefix}_selections" not in st.session_state:
@@ -329,6 +297,9 @@ def searchable_dropdown_selector(available_models, key_prefix="model", max_selec
     if f"{key_prefix}_current_input" not in st.session_state:
         st.session_state[f"{key_prefix}_current_input"] = ""
     
+    if f"{key_prefix}_text_input" not in st.session_state:
+        st.session_state[f"{key_prefix}_text_input"] = ""
+    
     if f"{key_prefix}_suggestions" not in st.session_state:
         # Show popular models initially
         popular_models = [model for model in available_models[:20] 
@@ -358,18 +329,18 @@ def searchable_dropdown_selector(available_models, key_prefix="model", max_selec
                                 use_container_width=True
                             )
                         with col2:
-                            if st.button("✕", key=f"{key_prefix}_remove_{i+j}", help="Remove"):
-                                remove_selection(i+j)
+                            st.button("✕", key=f"{key_prefix}_remove_{i+j}", help="Remove",
+                                      on_click=remove_selection, args=(i+j,))
         
         st.markdown("---")
     
     # Search input
-    search_placeholder = f"Search AI systems... ({len(st.session_state[f'{key_prefix}_selections'])}/{max_selections} selected)"
+    search_placeholder = f"{placeholder} ({len(st.session_state[f'{key_prefix}_selections'])}/{max_selections} selected)"
     
     current_input = st.text_input(
-        "",
+        label,
         key=f"{key_prefix}_text_input",
-        value=st.session_state[f"{key_prefix}_current_input"],
+        label_visibility="collapsed",
         on_change=on_input_change,
         placeholder=search_placeholder,
         help=help_text,
@@ -391,18 +362,19 @@ def searchable_dropdown_selector(available_models, key_prefix="model", max_selec
         
         # Display suggestions in a more compact dropdown-like format
         for i, suggestion in enumerate(suggestions[:8]):  # Limit to 8 suggestions
-            if st.button(
+            st.button(
                 f"➕ {suggestion}", 
                 key=f"{key_prefix}_suggestion_{i}",
-                use_container_width=True
-            ):
-                add_selection(suggestion)
+                use_container_width=True,
+                on_click=add_selection,
+                args=(suggestion,)
+            )
     
     elif current_input and not suggestions:
         st.write("No matching models found.")
         
         # Allow custom entry
-        if st.button(f"➕ Add '{current_input}' as custom entry", key=f"{key_prefix}_add_custom"):
-            add_selection(current_input)
+        st.button(f"➕ Add '{current_input}' as custom entry", key=f"{key_prefix}_add_custom",
+                  on_click=add_selection, args=(current_input,))
     
     return st.session_state[f"{key_prefix}_selections"]
\ No newline at end of file
@@ -0,0 +1,313 @@
+import re
+import sys
+import json
+import random
+import argparse
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pyld import jsonld
+from form.data.jsonld_loader import get_document_loader, jsonld_options
+
+# Keywords the direct compactor passes through or renames; any other keyword forces pyld
+_NODE_KEYWORDS = {"@id", "@type"}
+_JSONLD_KEYWORDS = {
+    "@base", "@container", "@context", "@direction", "@graph", "@id", "@import", "@included",
+    "@index", "@json", "@language", "@list", "@nest", "@none", "@prefix", "@propagate",
+    "@protected", "@reverse", "@set", "@type", "@value", "@version", "@vocab",
+}
+_ABSOLUTE_IRI = re.compile(r"^([A-Za-z][A-Za-z0-9+\-.]*|_):[^\s]*$")
+_GEN_DELIMS = (":", "/", "?", "#", "[", "]", "@")
+
+
+class CompactionUnsupported(Exception):
+    """Raised when a document uses JSON-LD features the direct compactor does not reproduce"""
+
+
+class DirectCompactor:
+    """
+    Compact JSON-LD documents without the pyld expand/compact round trip
+
+    Reproduces pyld's compaction for the documents built by serialize_to_jsonld:
+    property keys and @type values are expanded through the context and compacted
+    back to the preferred term, vocabulary-relative name or compact IRI; null
+    values and properties that do not expand to absolute IRIs are dropped;
+    single-element arrays are collapsed; properties are ordered by expanded IRI.
+    Anything outside that subset raises CompactionUnsupported so callers can fall
+    back to pyld.
+    """
+
+    def __init__(self, context: Any):
+        self.context = context
+        self.vocab: Optional[str] = None
+        self.terms: Dict[str, Tuple[str, Optional[str]]] = {}
+        self.prefixes: Dict[str, str] = {}
+        self.aliases: Dict[str, str] = {}
+
+        definitions: Dict[str, Any] = {}
+        for item in (context if isinstance(context, list) else [context]):
+            if isinstance(item, str):
+                item = get_document_loader()(item)["document"]["@context"]
+            if not isinstance(item, dict):
+                raise CompactionUnsupported("Unsupported @context entry")
+            if "@vocab" in item:
+                self.vocab = item["@vocab"]
+            for term, definition in item.items():
+                if term.startswith("@"):
+                    continue
+                definitions[term] = definition
+
+        self._resolve_definitions(definitions)
+        self._build_inverse()
+
+    def _resolve_definitions(self, definitions: Dict[str, Any]):
+        for term, definition in definitions.items():
+            if isinstance(definition, str) and definition.startswith("@"):
+                self.aliases[definition] = term
+                continue
+            if isinstance(definition, dict):
+                unsupported = set(definition) - {"@id", "@type"}
+                if unsupported:
+                    raise CompactionUnsupported(f"Term {term} uses {sorted(unsupported)}")
+                raw_iri, term_type = definition.get("@id", term), definition.get("@type")
+            else:
+                raw_iri, term_type = definition, None
+
+            iri = self._expand_definition_iri(raw_iri, definitions)
+            if term_type not in (None, "@id", "@vocab"):
+                term_type = self._expand_definition_iri(term_type, definitions)
+            self.terms[term] = (iri, term_type)
+            if isinstance(definition, str) and iri.endswith(_GEN_DELIMS):
+                self.prefixes[term] = iri
+
+    def _expand_definition_iri(self, value: str, definitions: Dict[str, Any]) -> str:
+        if ":" in value:
+            prefix, suffix = value.split(":", 1)
+            prefix_iri = definitions.get(prefix)
+            if isinstance(prefix_iri, str) and not suffix.startswith("//"):
+                return prefix_iri + suffix
+            return value
+        return (self.vocab or "") + value
+
+    def _build_inverse(self):
+        """Preferred term per (IRI, type mapping): shortest, then lexicographically least"""
+        self._inverse: Dict[Tuple[str, Optional[str]], str] = {}
+        for term in sorted(self.terms, key=lambda t: (len(t), t)):
+            self._inverse.setdefault(self.terms[term], term)
+        self.id_key = self.aliases.get("@id", "@id")
+        self.type_key = self.aliases.get("@type", "@type")
+
+    def expand_key(self, key: str) -> Tuple[Optional[str], Optional[str]]:
+        """Expand a property key to (IRI, type mapping); IRI is None if pyld would drop it"""
+        if key in self.terms:
+            return self.terms[key]
+        if ":" in key:
+            prefix, suffix = key.split(":", 1)
+            if prefix in self.prefixes and not suffix.startswith("//"):
+                iri = self.prefixes[prefix] + suffix
+            else:
+                iri = key
+        else:
+            iri = (self.vocab or "") + key
+        return (iri if _ABSOLUTE_IRI.match(iri) else None), None
+
+    def expand_vocab_iri(self, value: str) -> str:
+        iri, _ = self.expand_key(value)
+        if iri is None:
+            raise CompactionUnsupported(f"Cannot expand {value!r}")
+        return iri
+
+    def compact_iri(self, iri: str, vocab: bool, term_types: Tuple[Optional[str], ...] = (None,)) -> str:
+        """IRI compaction: preferred term, then vocabulary-relative name, then compact IRI"""
+        if vocab:
+            for term_type in term_types:
+                term = self._inverse.get((iri, term_type))
+                if term:
+                    return term
+            if self.vocab and iri.startswith(self.vocab) and len(iri) > len(self.vocab):
+                suffix = iri[len(self.vocab):]
+                if suffix not in self.terms:
+                    return suffix
+
+        candidates = []
+        for prefix, prefix_iri in self.prefixes.items():
+            if iri.startswith(prefix_iri) and len(iri) > len(prefix_iri):
+                candidate = f"{prefix}:{iri[len(prefix_iri):]}"
+                if candidate not in self.terms:
+                    candidates.append(candidate)
+        if candidates:
+            return min(candidates, key=lambda c: (len(c), c))
+
+        scheme = iri.split(":", 1)[0]
+        if scheme in self.terms:
+            raise CompactionUnsupported(f"IRI {iri} could be confused with a compact IRI")
+        return iri
+
+    def compact(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """Compact a document that carries this compactor's @context"""
+        node = self._compact_node(document, top_level=True)
+        return {"@context": self.context, **node}
+
+    def _compact_node(self, node: Dict[str, Any], top_level: bool = False) -> Dict[str, Any]:
+        entries = []
+        for key, value in node.items():
+            if key == "@context":
+                if not top_level:
+                    raise CompactionUnsupported("Embedded @context")
+                continue
+            if key.startswith("@"):
+                if key in _NODE_KEYWORDS:
+                    entries.append((key, key, value))
+                elif key in _JSONLD_KEYWORDS:
+                    raise CompactionUnsupported(f"Keyword {key}")
+                # Other @-prefixed keys are ignored by JSON-LD processors
+                continue
+            if value is None:
+                continue
+            iri, term_type = self.expand_key(key)
+            if iri is None:
+                continue
+            entries.append((iri, key, value))
+
+        iris = [iri for iri, _, _ in entries]
+        if len(iris) != len(set(iris)):
+            raise CompactionUnsupported("Two keys expand to the same IRI")
+
+        result = {}
+        for iri, key, value in sorted(entries, key=lambda entry: entry[0]):
+            if key == "@id":
+                if not isinstance(value, str) or not _ABSOLUTE_IRI.match(value):
+                    raise CompactionUnsupported(f"Unsupported @id {value!r}")
+                result[self.id_key] = self.compact_iri(value, vocab=False)
+            elif key == "@type":
+                types = value if isinstance(value, list) else [value]
+                compacted = [self.compact_iri(self.expand_vocab_iri(t), vocab=True) for t in types]
+                result[self.type_key] = compacted[0] if len(compacted) == 1 else compacted
+            else:
+                compacted_key, compacted_value = self._compact_property(iri, key, value)
+                if compacted_value is not _DROP:
+                    result[compacted_key] = compacted_value
+        return result
+
+    def _compact_property(self, iri: str, key: str, value: Any):
+        _, term_type = self.expand_key(key)
+        items = value if isinstance(value, list) else [value]
+        items = [item for item in items if item is not None]
+        if any(isinstance(item, list) for item in items):
+            raise CompactionUnsupported(f"Nested list under {key}")
+        if not isinstance(value, list) and not items:
+            return None, _DROP
+
+        has_nodes = any(isinstance(item, dict) for item in items)
+        has_scalars = any(not isinstance(item, dict) for item in items)
+
+        if not items:
+            # pyld selects the term for an empty array as it would for a node object
+            return self.compact_iri(iri, vocab=True, term_types=("@id", None)), []
+        if term_type in ("@id", "@vocab"):
+            if has_nodes or not all(isinstance(item, str) and _ABSOLUTE_IRI.match(item) for item in items):
+                raise CompactionUnsupported(f"IRI-valued term {key}")
+            out_key = self.compact_iri(iri, vocab=True, term_types=(term_type,))
+            values = [self.compact_iri(item, vocab=term_type == "@vocab") for item in items]
+        elif has_nodes:
+            if has_scalars or term_type is not None:
+                raise CompactionUnsupported(f"Mixed values under {key}")
+            out_key = self.compact_iri(iri, vocab=True, term_types=("@id", None))
+            values = [self._compact_node(item) for item in items]
+        elif term_type is not None:
+            # Scalars under a typed term (e.g. Date) expand to typed values and compact back unchanged
+            out_key = self.compact_iri(iri, vocab=True, term_types=(term_type,))
+            values = items
+        else:
+            out_key = self.compact_iri(iri, vocab=True)
+            values = items
+
+        return out_key, (values[0] if len(values) == 1 else values)
+
+
+_DROP = object()
+
+_compactors: Dict[str, DirectCompactor] = {}
+_compactors_lock = threading.Lock()
+
+
+def get_compactor(context: Any) -> DirectCompactor:
+    """Return a cached DirectCompactor for a @context value"""
+    key = json.dumps(context, sort_keys=True)
+    with _compactors_lock:
+        compactor = _compactors.get(key)
+        if compactor is None:
+            compactor = _compactors[key] = DirectCompactor(context)
+        return compactor
+
+
+def compact_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compact a JSON-LD document against its own @context
+
+    Uses the direct compactor and falls back to pyld for documents it does not support.
+    """
+    try:
+        return get_compactor(document["@context"]).compact(document)
+    except CompactionUnsupported:
+        return jsonld.compact(document, document["@context"], options=jsonld_options())
+
+
+def check_equivalence(documents: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Compare the direct compactor against pyld for each document
+
+    Returns:
+        Dict with counts of checked, matching and unsupported documents, and a list
+        of mismatches ({"id", "direct", "pyld"}); a match means identical JSON text,
+        including key order
+    """
+    summary = {"checked": 0, "matched": 0, "unsupported": 0, "mismatches": []}
+    for document in documents:
+        summary["checked"] += 1
+        expected = jsonld.compact(document, document["@context"], options=jsonld_options())
+        try:
+            direct = get_compactor(document["@context"]).compact(document)
+        except CompactionUnsupported:
+            summary["unsupported"] += 1
+            continue
+        if json.dumps(direct) == json.dumps(expected):
+            summary["matched"] += 1
+        else:
+            summary["mismatches"].append({"id": document.get("@id"), "direct": direct, "pyld": expected})
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from form.data.batch_jsonld import iter_form_records
+    from form.data.schema import process_raw_report, serialize_to_jsonld
+
+    parser = argparse.ArgumentParser(description="Check the direct JSON-LD compactor against pyld on stored reports")
+    parser.add_argument("source", help="JSON, JSONL or Parquet file, or a directory of report JSON files")
+    parser.add_argument("--sample", type=int, default=200, help="Number of reports to sample (0 = all)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    records = list(iter_form_records(args.source))
+    if args.sample and len(records) > args.sample:
+        records = random.Random(args.seed).sample(records, args.sample)
+
+    documents = []
+    for record in records:
+        try:
+            documents.append(serialize_to_jsonld(process_raw_report(record, trusted=True)))
+        except Exception as e:
+            print(f"skipping {record.get('Report ID')}: {e}", file=sys.stderr)
+
+    summary = check_equivalence(documents)
+    for mismatch in summary["mismatches"][:10]:
+        print(f"MISMATCH {mismatch['id']}", file=sys.stderr)
+        print("  direct:", json.dumps(mismatch["direct"], sort_keys=True), file=sys.stderr)
+        print("  pyld:  ", json.dumps(mismatch["pyld"], sort_keys=True), file=sys.stderr)
+    print(f"{summary['checked']} checked, {summary['matched']} identical, "
+          f"{summary['unsupported']} unsupported (pyld fallback), {len(summary['mismatches'])} mismatched")
+    return 1 if summary["mismatches"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+from pyld import jsonld
+from pyld.jsonld import JsonLdError
+
+CONTEXTS_DIR = Path(__file__).parent / "contexts"
+
+# Remote context URLs served from pinned local copies
+BUNDLED_CONTEXTS = {
+    "https://schema.org/": "schemaorg.jsonld",
+    "https://schema.org": "schemaorg.jsonld",
+    "http://schema.org/": "schemaorg.jsonld",
+    "http://schema.org": "schemaorg.jsonld",
+    "https://schema.org/docs/jsonldcontext.jsonld": "schemaorg.jsonld",
+    "https://schema.org/docs/jsonldcontext.json": "schemaorg.jsonld",
+}
+
+
+class OfflineDocumentLoader:
+    """
+    pyld document loader that serves bundled JSON-LD contexts from disk
+    Parsed documents are kept in memory, so each context file is read once per process
+    """
+
+    def __init__(self, contexts: Optional[Dict[str, str]] = None, allow_remote: bool = False):
+        self.contexts = contexts if contexts is not None else BUNDLED_CONTEXTS
+        self.allow_remote = allow_remote
+        self.stats = {"hits": 0, "misses": 0, "remote": 0}
+        self._documents: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._remote_loader = jsonld.requests_document_loader() if allow_remote else None
+
+    def __call__(self, url: str, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        file_name = self.contexts.get(url)
+        if file_name is None:
+            if self._remote_loader is None:
+                raise JsonLdError(
+                    f"Context {url} is not bundled and remote loading is disabled.",
+                    "jsonld.LoadDocumentError",
+                    {"url": url},
+                    code="loading document failed",
+                )
+            with self._lock:
+                self.stats["remote"] += 1
+            return self._remote_loader(url, options or {})
+
+        with self._lock:
+            document = self._documents.get(file_name)
+            if document is not None:
+                self.stats["hits"] += 1
+            else:
+                self.stats["misses"] += 1
+                with open(CONTEXTS_DIR / file_name, "r", encoding="utf-8") as f:
+                    document = json.load(f)
+                self._documents[file_name] = document
+
+        return {"contextUrl": None, "documentUrl": url, "document": document}
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return a copy of the cache hit/miss counters"""
+        with self._lock:
+            return dict(self.stats)
+
+
+_document_loader: Optional[OfflineDocumentLoader] = None
+_document_loader_lock = threading.Lock()
+
+
+def get_document_loader() -> OfflineDocumentLoader:
+    """Return the process-wide offline document loader"""
+    global _document_loader
+    with _document_loader_lock:
+        if _document_loader is None:
+            _document_loader = OfflineDocumentLoader()
+        return _document_loader
+
+
+def jsonld_options(**options) -> Dict[str, Any]:
+    """Build pyld options that resolve contexts through the offline loader"""
+    options.setdefault("documentLoader", get_document_loader())
+    return options
@@ -1,91 +1,66 @@
 import json
 from pathlib import Path
 from datetime import datetime, timezone
+from form.data.report_ir import ReportIR, parse_report
+from form.data.org_resolver import get_org_resolver
 
-def _load_any(obj):
-    """
-    Accepts dict, path to JSON file, or JSON string.
-    Returns a Python dict.
-    """
-    if isinstance(obj, dict):
-        return obj
-    if isinstance(obj, (str, Path)):
-        p = Path(str(obj))
-        if p.exists():
-            with open(p, "r", encoding="utf-8") as f:
-                return json.load(f)
-        try:
-            return json.loads(str(obj))
-        except json.JSONDecodeError as e:
-            raise TypeError(
-                "Input must be a dict, a path to a JSON file, or a JSON string."
-            ) from e
-    raise TypeError("Input must be a dict, a path to a JSON file, or a JSON string.")
+# Our impacts mapped to MITRE assurance categories, harm categories and impact types
+ASSURANCE_MAP = {
+    "Security": "Security",
+    "Privacy": "Privacy",
+    "Discrimination/Bias": "Equitability",
+    "Misinformation": "Reliability",
+    "Safety": "Robustness"
+}
 
-def _first(lst, default=None):
-    if isinstance(lst, list) and lst:
-        return lst[0]
-    return default
+HARM_MAP = {
+    "Discrimination/Bias": "Social",
+    "Privacy": "Privacy/Harassment",
+    "Misinformation": "Social",
+    "Security": "Financial/Reputational",
+    "Safety": "Physical/Environmental",
+    "Environmental": "Physical/Environmental"
+}
 
-def _get_list(data: dict, *keys):
-    for k in keys:
-        if k in data and isinstance(data[k], list):
-            return data[k]
-    return []
+IMPACT_MAP = {
+    "Privacy": "Confidentiality/Privacy",
+    "Security": "Integrity",
+    "Misinformation": "Integrity",
+    "Safety": "Availability"
+}
 
-def _get_str(data: dict, *keys, default=""):
-    for k in keys:
-        v = data.get(k)
-        if isinstance(v, str) and v.strip() != "":
-            return v
-    return default
+# Our severity mapped to the MITRE HarmSeverity enum
+SEVERITY_MAP = {
+    "Critical": "Severe",
+    "High": "Severe",
+    "Significant": "Moderate",
+    "Medium": "Moderate",
+    "Low": "Minor",
+    "Negligible": "Negligible"
+}
 
 def _map_impacts_to_mitre(impacts: list) -> dict:
     """
     Map our impacts to MITRE categories.
     Returns: {assurance_categories, harm_categories, impact_types}
     """
-    assurance_map = {
-        "Security": "Security",
-        "Privacy": "Privacy",
-        "Discrimination/Bias": "Equitability",
-        "Misinformation": "Reliability",
-        "Safety": "Robustness"
-    }
-    
-    harm_map = {
-        "Discrimination/Bias": "Social",
-        "Privacy": "Privacy/Harassment",
-        "Misinformation": "Social",
-        "Security": "Financial/Reputational",
-        "Safety": "Physical/Environmental",
-        "Environmental": "Physical/Environmental"
-    }
-    
-    impact_map = {
-        "Privacy": "Confidentiality/Privacy",
-        "Security": "Integrity",
-        "Misinformation": "Integrity",
-        "Safety": "Availability"
-    }
-    
     assurance_cats = []
     harm_cats = []
     impact_types = []
     
     for impact in impacts:
-        if impact in assurance_map:
-            cat = assurance_map[impact]
+        if impact in ASSURANCE_MAP:
+            cat = ASSURANCE_MAP[impact]
             if cat not in assurance_cats:
                 assurance_cats.append(cat)
         
-        if impact in harm_map:
-            cat = harm_map[impact]
+        if impact in HARM_MAP:
+            cat = HARM_MAP[impact]
             if cat not in harm_cats:
                 harm_cats.append(cat)
         
-        if impact in impact_map:
-            cat = impact_map[impact]
+        if impact in IMPACT_MAP:
+            cat = IMPACT_MAP[impact]
             if cat not in impact_types:
                 impact_types.append(cat)
     
@@ -105,15 +80,7 @@ def _map_impacts_to_mitre(impacts: list) -> dict:
 
 def _map_severity(severity: str) -> str:
     """Map our severity to MITRE HarmSeverity enum."""
-    severity_map = {
-        "Critical": "Severe",
-        "High": "Severe",
-        "Significant": "Moderate",
-        "Medium": "Moderate",
-        "Low": "Minor",
-        "Negligible": "Negligible"
-    }
-    return severity_map.get(severity, "Unknown")
+    return SEVERITY_MAP.get(severity, "Unknown")
 
 def _map_lifecycle_phase(report_types: list) -> str:
     """Map report types to MITRE LifecyclePhase."""
@@ -138,29 +105,30 @@ def _map_threat_actor_intent(report_types: list, attacker_objectives: list) -> l
 def convert_to_mitre_atlas(raw_or_path) -> dict:
     """
     Converts AI flaw report to MITRE ATLAS V1 format.
-    Accepts dict, path to JSON file, or JSON string.
+    Accepts dict, path to JSON file, JSON string, or a parsed ReportIR.
     """
-    data = _load_any(raw_or_path)
-    
-    report_id = _get_str(data, "Report ID", default=None)
-    title = _get_str(data, "Flaw Description", "Incident Description", default="AI Incident Report")
+    return mitre_from_ir(parse_report(raw_or_path))
+
+def mitre_from_ir(ir: ReportIR) -> dict:
+    """Builds the MITRE ATLAS report from a parsed report."""
+    report_id = ir.report_id
+    title = ir.first_text("flaw_description", "incident_description", default="AI Incident Report")
     if len(title) > 100:
         title = title[:97] + "..."
     
     # Description
-    description = _get_str(
-        data,
-        "Incident Description - Detailed",
-        "Flaw Description - Detailed",
-        "Incident Description",
-        "Flaw Description",
+    description = ir.first_text(
+        "incident_description_detailed",
+        "flaw_description_detailed",
+        "incident_description",
+        "flaw_description",
         default="No description provided"
     )
     description = description.replace("**Detailed Description:**\n", "").strip()
     
     # Dates
-    submission_timestamp = _get_str(data, "Submission Timestamp", default="")
-    flaw_timestamp = _get_str(data, "Flaw Timestamp Start", default="")
+    submission_timestamp = ir.submission_timestamp or ""
+    flaw_timestamp = ir.flaw_timestamp or ""
     
     if submission_timestamp:
         date = submission_timestamp
@@ -172,35 +140,26 @@ def convert_to_mitre_atlas(raw_or_path) -> dict:
     start_date = flaw_timestamp if flaw_timestamp else date
     end_date = start_date
     
-    report_types = _get_list(data, "Report Types")
-    impacts = _get_list(data, "Impacts")
-    specific_harms = _get_list(data, "Specific Harm Types")
+    report_types = ir.report_types
+    impacts = ir.impacts
     
     mitre_cats = _map_impacts_to_mitre(impacts)
     
     # Severity
-    severity = _get_str(data, "Severity", default="Unknown")
+    severity = ir.severity or "Unknown"
     harm_severity = _map_severity(severity)
     
     # Geographic location
-    incident_locations = _get_str(data, "Incident Location(s)", default=None)
+    incident_locations = ir.incident_locations
     geo_locations = [incident_locations] if incident_locations else None
     
     # Affected entity
-    systems = _get_list(data, "Systems")
+    systems = ir.systems
+    resolver = get_org_resolver()
     affected_entity = None
     if systems:
-        # This is a simplified mapping
-        vendor_map = {
-            "GPT-3.5-Turbo": "OpenAI",
-            "GPT-4": "OpenAI",
-            "Claude": "Anthropic",
-            "Gemini": "Google",
-            "LLaMA": "Meta",
-            "Copilot": "Microsoft"
-        }
         first_system = systems[0]
-        vendor = vendor_map.get(first_system, "Unknown")
+        vendor = resolver.resolve(first_system)["developer"]
         affected_entity = {
             "name": vendor,
             "primaryIndustry": "Technology",
@@ -211,7 +170,7 @@ def convert_to_mitre_atlas(raw_or_path) -> dict:
     affected_systems = []
     for system in systems:
         affected_systems.append({
-            "developer": vendor_map.get(system, "Unknown"),
+            "developer": resolver.resolve(system)["developer"],
             "name": system,
             "description": f"AI System: {system}",
             "technologyDomain": "Artificial Intelligence",
@@ -234,7 +193,7 @@ def convert_to_mitre_atlas(raw_or_path) -> dict:
     }
     
     # Affected users
-    stakeholders = _get_list(data, "Impacted Stakeholder(s)")
+    stakeholders = ir.stakeholders
     affected_users = None
     if stakeholders:
         affected_users = {
@@ -244,8 +203,8 @@ def convert_to_mitre_atlas(raw_or_path) -> dict:
         }
     
     # Detection details
-    detection_methods = _get_list(data, "Detection")
-    reporter_id = _get_str(data, "Reporter ID", default="Anonymous")
+    detection_methods = ir.detection_methods
+    reporter_id = ir.reporter_id or "Anonymous"
     
     detection = {
         "date": submission_timestamp if submission_timestamp else None,
@@ -270,9 +229,9 @@ def convert_to_mitre_atlas(raw_or_path) -> dict:
     }
     
     # Attack details
-    attacker_resources = _get_list(data, "Attacker Resources")
-    attacker_objectives = _get_list(data, "Attacker Objectives")
-    poc = _get_str(data, "Proof-of-Concept Exploit", default="")
+    attacker_resources = ir.attacker_resources
+    attacker_objectives = ir.attacker_objectives
+    poc = ir.proof_of_concept or ""
     
     attack_details = None
     if attacker_resources or attacker_objectives or poc:
@@ -293,7 +252,7 @@ def convert_to_mitre_atlas(raw_or_path) -> dict:
         
         attack_details = {
             "name": None,
-            "attackDescription": _get_str(data, "Harm Narrative", "Context Info", default=None),
+            "attackDescription": ir.first_text("harm_narrative", "context_info"),
             "attackTechnique": None,
             "attackMechanism": None,
             "stageOfLearning": stage_of_learning if stage_of_learning else None,
@@ -317,7 +276,7 @@ def convert_to_mitre_atlas(raw_or_path) -> dict:
     
     # External references
     external_refs = []
-    context_info = _get_str(data, "Context Info", default="")
+    context_info = ir.context_info
     if context_info:
         external_refs.append(context_info)
     
@@ -370,6 +329,7 @@ def convert_to_mitre_atlas(raw_or_path) -> dict:
 
 
 if __name__ == "__main__":
-    ai_flaw_example = "/Users/elainezhu/Downloads/ai_flaw_report_67120781-6f5a-4bdf-973b-e2355161a7bd.json"
-    mitre_report = convert_to_mitre_atlas(ai_flaw_example)
-    print(json.dumps(mitre_report, indent=4))
\ No newline at end of file
+    # Convert the report files given on the command line; use form.data.batch_convert for bulk exports
+    import sys
+    for report_path in sys.argv[1:]:
+        print(json.dumps(convert_to_mitre_atlas(Path(report_path)), indent=4))
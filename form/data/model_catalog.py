@@ -0,0 +1,396 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import zipfile
+import argparse
+import threading
+from itertools import chain, islice
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+import requests
+
+from form.data.model_index import CompactModelIndex
+
+try:
+    import fcntl
+except ImportError:
+    # Without flock (Windows) every process refreshes the snapshot on its own
+    fcntl = None
+
+HF_MODELS_URL = "https://huggingface.co/api/models"
+
+# Snapshot shipped with the app, used until a snapshot has been fetched (and when offline)
+BUNDLED_SNAPSHOT = Path(__file__).parent / "catalogs" / "hf_models.json"
+
+DEFAULT_REFRESH_INTERVAL = 3600.0
+DEFAULT_RETRY_INTERVAL = 300.0
+
+# Models per Hub listing page (the Hub caps pages at 1000) and models fetched per refresh
+HUB_PAGE_SIZE = 1000
+DEFAULT_MAX_MODELS = 500_000
+
+# (connect, read) timeouts in seconds for Hub requests
+REQUEST_TIMEOUT = (3.05, 15)
+
+# Retries per page on 429 / 5xx responses and connection errors, with exponential backoff
+PAGE_RETRIES = 4
+RETRY_BACKOFF = 2.0
+
+
+def default_snapshot_path() -> str:
+    """Snapshot location: $AIFR_MODEL_CATALOG, or <tempdir>/ai_flaw_catalog/hf_models.npz"""
+    return os.environ.get("AIFR_MODEL_CATALOG") or os.path.join(
+        tempfile.gettempdir(), "ai_flaw_catalog", "hf_models.npz"
+    )
+
+
+def _get_page(session: requests.Session, url: str, params: Optional[Dict[str, Any]], timeout) -> requests.Response:
+    """GET one listing page, retrying rate limits, transient server errors and dropped connections"""
+    attempt = 0
+    while True:
+        delay = RETRY_BACKOFF ** attempt
+        try:
+            response = session.get(url, params=params, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= PAGE_RETRIES:
+                raise
+        else:
+            if attempt >= PAGE_RETRIES or (response.status_code != 429 and response.status_code < 500):
+                response.raise_for_status()
+                return response
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                delay = int(retry_after)
+        time.sleep(delay)
+        attempt += 1
+
+
+def iter_hub_models(max_models: Optional[int] = DEFAULT_MAX_MODELS, page_size: int = HUB_PAGE_SIZE,
+                    timeout=REQUEST_TIMEOUT) -> Iterator[Dict[str, Any]]:
+    """
+    Page through the Hugging Face Hub model listing, most downloaded first
+
+    Pages are followed through the cursor in the response's Link header, so
+    the whole listing can be walked without offsets.
+
+    Args:
+        max_models: Stop after this many models (None for the whole listing)
+        page_size: Models per request
+        timeout: requests timeout for each page, so a slow Hub fails fast instead of hanging
+
+    Yields:
+        {"id", "downloads"} dicts
+    """
+    if max_models is not None:
+        page_size = min(page_size, max_models)
+    params = {"sort": "downloads", "direction": "-1", "limit": page_size}
+    url: Optional[str] = HF_MODELS_URL
+    count = 0
+    with requests.Session() as session:
+        while url:
+            response = _get_page(session, url, params, timeout)
+            for model in response.json():
+                yield {"id": model.get("modelId") or model.get("id"), "downloads": model.get("downloads")}
+                count += 1
+                if max_models is not None and count >= max_models:
+                    return
+            # The next link already carries the query string and cursor
+            url = response.links.get("next", {}).get("url")
+            params = None
+
+
+def fetch_hub_models(limit: int = 400, timeout=REQUEST_TIMEOUT) -> List[Dict[str, Any]]:
+    """
+    Fetch the most downloaded models from the Hugging Face Hub
+
+    Args:
+        limit: Number of models to fetch; more than one page is fetched page by page
+        timeout: requests timeout, so a slow Hub fails fast instead of hanging
+
+    Returns:
+        List of {"id", "downloads"} dicts, most downloaded first
+    """
+    return list(iter_hub_models(limit, timeout=timeout))
+
+
+def _read_snapshot(path) -> Optional[CompactModelIndex]:
+    """
+    Load a snapshot as a CompactModelIndex, or None if it is missing or unreadable
+
+    .npz files are compact indexes written by write_snapshot; .json files use
+    the {"version", "source", "fetched_at", "models"} layout of the bundled
+    snapshot and are indexed on load.
+    """
+    path = Path(path)
+    try:
+        if path.suffix != ".json":
+            return CompactModelIndex.load(path)
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        return None
+    if not isinstance(snapshot, dict) or not isinstance(snapshot.get("models"), list):
+        return None
+    meta = {key: value for key, value in snapshot.items() if key != "models"}
+    return CompactModelIndex.build(snapshot["models"], meta)
+
+
+def write_snapshot(path, models, source: str = "hub") -> CompactModelIndex:
+    """
+    Atomically write a catalog snapshot, so readers never see a partial file
+
+    Args:
+        path: Snapshot file; a .json path writes the plain JSON layout (used for the
+            bundled snapshot), anything else a compact .npz index
+        models: Iterable of {"id", "downloads"} dicts
+        source: Recorded as the snapshot source
+
+    Returns:
+        The CompactModelIndex of the snapshot
+    """
+    path = Path(path)
+    meta = {"version": 2, "source": source, "fetched_at": datetime.now(timezone.utc).isoformat()}
+    if path.suffix != ".json":
+        index = CompactModelIndex.build(models, meta)
+        index.save(path)
+        return index
+
+    models = list(models)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(dict(meta, version=1, models=models), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return CompactModelIndex.build(models, meta)
+
+
+def _fetched_at(meta: Dict[str, Any]) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(meta["fetched_at"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class ModelCatalog:
+    """
+    Catalog of Hugging Face model IDs served from a snapshot on disk
+
+    Reads never touch the network: they return the in-memory copy of the
+    last snapshot, falling back to the bundled snapshot when none has been
+    fetched yet. Snapshots are CompactModelIndex files, so the full Hub
+    listing (hundreds of thousands of models) loads in well under a second
+    and stays in the tens of MB. A background thread refreshes the snapshot every
+    refresh_interval seconds (stale-while-revalidate); a failed refresh keeps
+    serving the old snapshot and is retried after retry_interval seconds.
+    Snapshots written by other processes are picked up by the refresher.
+    """
+
+    def __init__(self, snapshot_path: Optional[str] = None, bundled_path=BUNDLED_SNAPSHOT,
+                 refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+                 retry_interval: float = DEFAULT_RETRY_INTERVAL, limit: Optional[int] = DEFAULT_MAX_MODELS):
+        self.snapshot_path = Path(snapshot_path or default_snapshot_path())
+        self.bundled_path = Path(bundled_path)
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.limit = limit
+        self.last_error: Optional[str] = None
+        self.last_refresh_attempt: Optional[float] = None
+
+        self._refresh_lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+        self._index = CompactModelIndex.build([], {"source": "empty", "fetched_at": None})
+        self._snapshot_mtime: Optional[float] = None
+
+        if not self._load_from_disk():
+            bundled = _read_snapshot(self.bundled_path)
+            if bundled:
+                bundled.meta["source"] = "bundled"
+                self._set_snapshot(bundled)
+
+    def _set_snapshot(self, index: CompactModelIndex):
+        # A single reference swap; readers keep whichever index they already hold
+        self._index = index
+
+    @property
+    def index(self) -> CompactModelIndex:
+        """The CompactModelIndex of the current snapshot"""
+        return self._index
+
+    def _load_from_disk(self) -> bool:
+        """Load the on-disk snapshot if it exists and changed since it was last loaded"""
+        try:
+            mtime = self.snapshot_path.stat().st_mtime
+        except OSError:
+            return False
+        if mtime == self._snapshot_mtime:
+            return True
+
+        snapshot = _read_snapshot(self.snapshot_path)
+        if not snapshot:
+            return False
+        self._set_snapshot(snapshot)
+        self._snapshot_mtime = mtime
+        return True
+
+    @property
+    def source(self) -> str:
+        """Where the current snapshot came from: hub, bundled or empty"""
+        return self._index.meta.get("source", "unknown")
+
+    @property
+    def age(self) -> Optional[float]:
+        """Seconds since the current snapshot was fetched, or None if unknown"""
+        fetched_at = _fetched_at(self._index.meta)
+        return time.time() - fetched_at if fetched_at is not None else None
+
+    def is_stale(self) -> bool:
+        age = self.age
+        # A first-page snapshot left by a refresh that never finished is retried sooner
+        interval = self.retry_interval if self._index.meta.get("partial") else self.refresh_interval
+        return age is None or age >= interval
+
+    def model_ids(self, limit: Optional[int] = None) -> List[str]:
+        """The first limit model IDs in the current snapshot, most downloaded first; never blocks on the Hub"""
+        return self._index.top(limit)
+
+    def models(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """{"id", "downloads", "org"} dicts in the current snapshot, most downloaded first"""
+        index = self._index
+        return [index.entry(i) for i in index.rank[:limit].tolist()]
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, model_id: str) -> bool:
+        return model_id in self._index
+
+    def get(self, model_id: str) -> Optional[Dict[str, Any]]:
+        """{"id", "downloads", "org"} for a model ID, or None if the catalog does not know it"""
+        return self._index.get(model_id)
+
+    def _publish(self, index: CompactModelIndex):
+        index.save(self.snapshot_path)
+        self._snapshot_mtime = self.snapshot_path.stat().st_mtime
+        self._set_snapshot(index)
+
+    def _lock_refresh(self):
+        """
+        Take the cross-process refresh lock, so processes sharing a snapshot walk the Hub once
+
+        Returns:
+            The open lock file (closing it releases the lock), or None if another process holds it
+        """
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        lock_file = open(f"{self.snapshot_path}.lock", "a")
+        if fcntl is None:
+            return lock_file
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return lock_file
+        except OSError:
+            lock_file.close()
+            return None
+
+    def refresh(self) -> bool:
+        """
+        Fetch the catalog from the Hub and replace the snapshot
+
+        While the catalog only holds the bundled seed (or an unfinished listing),
+        the first page of the listing is published as soon as it arrives, so the
+        most downloaded models are served while the rest is fetched. If another
+        process is already refreshing the shared snapshot, this returns False and
+        the refresher picks up that process's snapshot from disk.
+
+        Returns:
+            True if a new snapshot was written
+        """
+        with self._refresh_lock:
+            self.last_refresh_attempt = time.monotonic()
+            try:
+                lock_file = self._lock_refresh()
+            except OSError as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                return False
+            if lock_file is None:
+                return False
+
+            try:
+                with lock_file:
+                    meta = {"version": 2, "source": "hub", "fetched_at": datetime.now(timezone.utc).isoformat()}
+                    models = iter_hub_models(self.limit)
+                    first_page = list(islice(models, HUB_PAGE_SIZE))
+                    if not first_page:
+                        raise ValueError("Hub returned an empty model list")
+                    if self.source != "hub" or self._index.meta.get("partial"):
+                        self._publish(CompactModelIndex.build(first_page, dict(meta, partial=True)))
+
+                    # A failed page aborts the rest of the refresh, so a partial listing never
+                    # replaces a complete snapshot
+                    self._publish(CompactModelIndex.build(chain(first_page, models), meta))
+                self.last_error = None
+                return True
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                return False
+
+    def start_refresher(self):
+        """Start the background thread that keeps the snapshot fresh"""
+        if self._refresher and self._refresher.is_alive():
+            return
+
+        def refresher():
+            while True:
+                self._load_from_disk()
+                if self.is_stale() and not self.refresh():
+                    time.sleep(self.retry_interval)
+                    continue
+                # Sleep until the snapshot turns stale (another process may refresh it first)
+                time.sleep(max(self.refresh_interval - (self.age or 0.0), 1.0))
+
+        self._refresher = threading.Thread(target=refresher, name="hf-model-catalog", daemon=True)
+        self._refresher.start()
+
+
+_catalog: Optional[ModelCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_model_catalog(start_refresher: bool = True) -> ModelCatalog:
+    """Return the process-wide model catalog, starting its background refresher"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = ModelCatalog()
+        if start_refresher:
+            _catalog.start_refresher()
+        return _catalog
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Fetch the Hugging Face model catalog snapshot")
+    parser.add_argument("-o", "--output", default=None,
+                        help=f"Snapshot file to write (default: {default_snapshot_path()}); "
+                             f"pass {BUNDLED_SNAPSHOT} to update the bundled snapshot")
+    parser.add_argument("--limit", type=int, default=DEFAULT_MAX_MODELS,
+                        help="Number of models to fetch (0 for the whole listing)")
+    parser.add_argument("--page-size", type=int, default=HUB_PAGE_SIZE, help="Models per Hub request")
+    args = parser.parse_args(argv)
+
+    output = args.output or default_snapshot_path()
+    try:
+        models = list(iter_hub_models(args.limit or None, page_size=args.page_size))
+    except Exception as e:
+        print(f"Could not fetch models from the Hub: {e}", file=sys.stderr)
+        return 1
+    index = write_snapshot(output, models)
+    print(f"Wrote {len(index)} models to {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
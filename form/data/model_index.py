@@ -0,0 +1,189 @@
+import io
+import os
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import numpy as np
+
+
+def _pack_strings(values: List[bytes]):
+    """Concatenate byte strings into one buffer plus an offsets array (len(values) + 1 entries)"""
+    lengths = np.fromiter((len(v) for v in values), dtype=np.int64, count=len(values))
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return b"".join(values), offsets
+
+
+class CompactModelIndex:
+    """
+    Memory-compact catalog of model IDs with download counts and organizations
+
+    IDs are stored once, as a single UTF-8 buffer sorted by byte order with
+    an offsets array, instead of one Python string per model. Organizations
+    (the part before "/") are interned in a small table and referenced by
+    index. A permutation array keeps the download ranking. Hundreds of
+    thousands of models fit in a few tens of MB; exact lookups are a binary
+    search over the buffer and the top-N list decodes only N IDs.
+    """
+
+    def __init__(self, blob: bytes, offsets: np.ndarray, downloads: np.ndarray, org_index: np.ndarray,
+                 orgs: List[str], rank: np.ndarray, meta: Optional[Dict[str, Any]] = None):
+        self._blob = blob
+        self.offsets = offsets
+        self.downloads = downloads
+        self.org_index = org_index
+        self.orgs = orgs
+        self.rank = rank
+        self.meta = meta or {}
+
+    @classmethod
+    def build(cls, models: Iterable[Dict[str, Any]], meta: Optional[Dict[str, Any]] = None) -> "CompactModelIndex":
+        """
+        Build an index from {"id", "downloads"} dicts
+
+        Duplicate IDs keep their highest download count. Models without a
+        download count rank after all counted models, in input order.
+        """
+        best: Dict[bytes, List[int]] = {}
+        for position, model in enumerate(models):
+            model_id = model.get("id") if isinstance(model, dict) else None
+            if not model_id:
+                continue
+            key = model_id.encode("utf-8")
+            downloads = model.get("downloads")
+            downloads = int(downloads) if downloads is not None else -1
+            if key not in best:
+                best[key] = [downloads, position]
+            elif downloads > best[key][0]:
+                best[key][0] = downloads
+
+        keys = sorted(best)
+        blob, offsets = _pack_strings(keys)
+        values = np.array([best[k] for k in keys], dtype=np.int64).reshape(-1, 2)
+        downloads, positions = values[:, 0].copy(), values[:, 1]
+
+        # setdefault hands out the next org number the first time an org is seen
+        org_ids: Dict[bytes, int] = {}
+        org_index = np.array(
+            [org_ids.setdefault(k.partition(b"/")[0] if b"/" in k else b"", len(org_ids)) for k in keys],
+            dtype=np.uint32,
+        )
+        orgs = [org.decode("utf-8") for org in org_ids]
+
+        # Most downloads first; ties (and uncounted models) keep input order
+        rank = np.lexsort((positions, -downloads)).astype(np.uint32)
+        return cls(blob, offsets, downloads, org_index, orgs, rank, meta)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def _key_at(self, i: int) -> bytes:
+        return self._blob[self.offsets[i]:self.offsets[i + 1]]
+
+    def id_at(self, i: int) -> str:
+        """Decode the ID at sorted position i"""
+        return self._key_at(i).decode("utf-8")
+
+    def _bisect(self, key: bytes) -> int:
+        """First sorted position whose ID is >= key"""
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, model_id: str) -> Optional[int]:
+        """Sorted position of an exact model ID, or None"""
+        key = model_id.encode("utf-8")
+        i = self._bisect(key)
+        if i < len(self) and self._key_at(i) == key:
+            return i
+        return None
+
+    def __contains__(self, model_id: str) -> bool:
+        return self.find(model_id) is not None
+
+    def get(self, model_id: str) -> Optional[Dict[str, Any]]:
+        """{"id", "downloads", "org"} for a model ID, or None if it is not in the catalog"""
+        i = self.find(model_id)
+        if i is None:
+            return None
+        return self.entry(i)
+
+    def entry(self, i: int) -> Dict[str, Any]:
+        downloads = int(self.downloads[i])
+        return {
+            "id": self.id_at(i),
+            "downloads": downloads if downloads >= 0 else None,
+            "org": self.orgs[self.org_index[i]] or None,
+        }
+
+    def top(self, n: Optional[int] = None) -> List[str]:
+        """Model IDs ranked by downloads; only the first n are decoded"""
+        return [self.id_at(i) for i in self.rank[:n].tolist()]
+
+    def iter_ids(self) -> Iterator[str]:
+        """All model IDs in sorted order"""
+        for i in range(len(self)):
+            yield self.id_at(i)
+
+    def with_prefix(self, prefix: str, limit: int = 10) -> List[str]:
+        """Model IDs starting with prefix (byte order), e.g. every model of one organization"""
+        key = prefix.encode("utf-8")
+        i = self._bisect(key)
+        results = []
+        while i < len(self) and len(results) < limit and self._key_at(i).startswith(key):
+            results.append(self.id_at(i))
+            i += 1
+        return results
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the index buffers"""
+        return (len(self._blob) + self.offsets.nbytes + self.downloads.nbytes
+                + self.org_index.nbytes + self.rank.nbytes + sum(len(o) for o in self.orgs))
+
+    def save(self, path):
+        """Atomically write the index as an uncompressed .npz file"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        org_blob, org_offsets = _pack_strings([o.encode("utf-8") for o in self.orgs])
+
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            blob=np.frombuffer(self._blob, dtype=np.uint8),
+            offsets=self.offsets,
+            downloads=self.downloads,
+            org_index=self.org_index,
+            org_blob=np.frombuffer(org_blob, dtype=np.uint8),
+            org_offsets=org_offsets,
+            rank=self.rank,
+            meta=np.frombuffer(json.dumps(self.meta).encode("utf-8"), dtype=np.uint8),
+        )
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(buffer.getbuffer())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path) -> "CompactModelIndex":
+        """Load an index written by save"""
+        with np.load(path, allow_pickle=False) as data:
+            org_blob = data["org_blob"].tobytes()
+            org_offsets = data["org_offsets"].tolist()
+            orgs = [org_blob[org_offsets[i]:org_offsets[i + 1]].decode("utf-8") for i in range(len(org_offsets) - 1)]
+            return cls(
+                data["blob"].tobytes(),
+                data["offsets"],
+                data["downloads"],
+                data["org_index"],
+                orgs,
+                data["rank"],
+                json.loads(data["meta"].tobytes() or b"{}"),
+            )
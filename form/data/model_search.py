@@ -0,0 +1,392 @@
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Collection, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+
+from form.data.model_catalog import get_model_catalog
+from form.data.model_index import CompactModelIndex
+
+# Candidates filtered and verified per numpy batch while collecting substring matches; batches
+# double in size up to the maximum while a query keeps turning up too few matches
+VERIFY_BATCH = 512
+MAX_VERIFY_BATCH = 8192
+
+# Candidate batches are narrowed with this many of the query's other (rarest) trigrams before
+# the remaining candidates are checked with bytes.find
+FILTER_POSTINGS = 3
+
+# Short (1-2 character) queries that would merge more posting entries than this scan the
+# ranking instead; such queries are common enough that the scan stops after a few candidates
+SHORT_QUERY_MAX_POSTINGS = 8192
+
+# Fuzzy matching only considers the most downloaded entries of each query trigram...
+FUZZY_POSTING_CAP = 1024
+# ...and scores this many of the candidates sharing the most trigrams with the query
+FUZZY_CANDIDATES = 24
+
+# Lists passed to get_search_index are indexed once and kept for every session
+LIST_CACHE_SIZE = 8
+
+
+def _trigram_codes(text: bytes) -> np.ndarray:
+    """Unique 24-bit codes of the byte trigrams of text"""
+    data = np.frombuffer(text, dtype=np.uint8).astype(np.uint32)
+    if len(data) < 3:
+        return np.empty(0, dtype=np.uint32)
+    return np.unique((data[:-2] << 16) | (data[1:-1] << 8) | data[2:])
+
+
+class ModelSearchIndex:
+    """
+    Typeahead index over a model catalog
+
+    Entries are kept in download order, so every posting list below is also
+    sorted by downloads and matches can be collected most popular first,
+    stopping as soon as enough suggestions are found.
+
+    - Substring search: each lowercased ID is split into byte trigrams (padded
+      with two NULs so every 1-2 character query is a trigram prefix). A
+      query's candidates are the posting list of its rarest trigram, checked
+      in batches against the lowercased buffer with bytes.find.
+    - Fuzzy search, used when nothing contains the query: entries sharing the
+      most trigrams with the query are shortlisted, then scored with the same
+      SequenceMatcher ratio difflib.get_close_matches uses, after its cheap
+      length-based upper bounds.
+
+    Matches are ranked exact ID first, then IDs and model names (the part
+    after "/") starting with the query, then other matches, each tier by
+    downloads.
+    """
+
+    def __init__(self, catalog: CompactModelIndex):
+        self.catalog = catalog
+        # Sorted catalog position of each entry, in download order
+        self._order = catalog.rank.astype(np.int64)
+
+        lowered = [catalog.id_at(i).lower().encode("utf-8") for i in self._order.tolist()]
+        self._blob = b"".join(lowered)
+        lengths = np.fromiter((len(name) for name in lowered), dtype=np.int64, count=len(lowered))
+        self._offsets = np.zeros(len(lowered) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self._offsets[1:])
+        self._build_trigrams(lowered, lengths)
+
+    def _build_trigrams(self, lowered: List[bytes], lengths: np.ndarray):
+        padded = np.frombuffer(b"".join(name + b"\0\0" for name in lowered), dtype=np.uint8)
+        if len(padded) < 3:
+            self._tri_codes = np.empty(0, dtype=np.uint32)
+            self._tri_starts = np.zeros(1, dtype=np.int64)
+            self._postings = np.empty(0, dtype=np.uint32)
+            return
+
+        codes = padded[:-2].astype(np.uint32) << 16
+        codes |= padded[1:-1].astype(np.uint32) << 8
+        codes |= padded[2:]
+        owners = np.repeat(np.arange(len(lowered), dtype=np.uint32), lengths + 2)[:-2]
+        # Trigrams starting on an entry's padding would straddle into the next entry
+        padded_ends = np.cumsum(lengths + 2)[:-1]
+        valid = np.ones(len(codes), dtype=bool)
+        valid[padded_ends - 2] = False
+        valid[padded_ends - 1] = False
+        # (trigram, entry) keys sorted in place: grouped by trigram, each group in download order
+        keys = codes[valid].astype(np.uint64)
+        del codes
+        keys <<= np.uint64(32)
+        keys |= owners[valid]
+        del owners, valid
+        keys.sort()
+        keep = np.ones(len(keys), dtype=bool)
+        np.not_equal(keys[1:], keys[:-1], out=keep[1:])
+        keys = keys[keep]
+
+        self._postings = (keys & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+        codes = (keys >> np.uint64(32)).astype(np.uint32)
+        del keys
+        self._tri_codes, starts = np.unique(codes, return_index=True)
+        self._tri_starts = np.append(starts, len(codes)).astype(np.int64)
+
+    @classmethod
+    def from_names(cls, names: Iterable[str]) -> "ModelSearchIndex":
+        """Index a list of names; list order is used as the download ranking"""
+        return cls(CompactModelIndex.build({"id": name} for name in names))
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def _name(self, entry: int) -> str:
+        return self.catalog.id_at(int(self._order[entry]))
+
+    def _posting(self, code: int) -> np.ndarray:
+        i = np.searchsorted(self._tri_codes, code)
+        if i == len(self._tri_codes) or self._tri_codes[i] != code:
+            return self._postings[:0]
+        return self._postings[self._tri_starts[i]:self._tri_starts[i + 1]]
+
+    def _posting_range(self, low: int, high: int) -> Tuple[int, int]:
+        """Span of the postings array covering trigram codes in [low, high)"""
+        lo, hi = np.searchsorted(self._tri_codes, [low, high])
+        return int(self._tri_starts[lo]), int(self._tri_starts[hi])
+
+    def _candidate_batches(self, query: bytes, want: int) -> Iterator[Tuple[np.ndarray, bool]]:
+        """
+        Batches of entries that may contain query, in download order
+
+        Yields (entries, verify) pairs; verify is False when every entry is
+        known to contain the query.
+        """
+        if len(query) >= 3:
+            postings = sorted((self._posting(int(code)) for code in _trigram_codes(query)), key=len)
+            rarest, others = postings[0], postings[1:1 + FILTER_POSTINGS]
+            batch_start, batch_size = 0, VERIFY_BATCH
+            while batch_start < len(rarest):
+                batch = rarest[batch_start:batch_start + batch_size]
+                batch_start += batch_size
+                batch_size = min(batch_size * 2, MAX_VERIFY_BATCH)
+                # Drop entries missing one of the other trigrams (every posting list is sorted)
+                for posting in others:
+                    found = np.searchsorted(posting, batch)
+                    found[found == len(posting)] = 0
+                    batch = batch[posting[found] == batch]
+                    if not len(batch):
+                        break
+                # Trigrams can all occur without the query itself, unless the query is one trigram
+                # ("zzzz" has the single trigram "zzz", which "zzz" contains)
+                yield batch, len(query) > 3
+            return
+
+        shift = 8 * (3 - len(query))
+        prefix = int.from_bytes(query, "big") << shift
+        lo, hi = np.searchsorted(self._tri_codes, [prefix, prefix + (1 << shift)])
+        starts = self._tri_starts[lo:hi]
+        counts = np.minimum(self._tri_starts[lo + 1:hi + 1] - starts, want)
+        if counts.sum() > SHORT_QUERY_MAX_POSTINGS:
+            # Contained in many entries: scanning the ranking finds enough of them quickly
+            for batch_start in range(0, len(self), VERIFY_BATCH):
+                yield np.arange(batch_start, min(batch_start + VERIFY_BATCH, len(self)), dtype=np.uint32), True
+            return
+        # The first `want` entries of every trigram starting with the query hold the first
+        # `want` entries containing it, and every one of them is a match
+        heads = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        yield np.unique(self._postings[heads])[:want], False
+
+    def _collect_substring(self, query: bytes, want: int, exclude: Collection[str]) -> List[Tuple[int, str]]:
+        blob = self._blob
+        matches = []
+        for batch, verify in self._candidate_batches(query, want + len(exclude)):
+            batch = batch.astype(np.int64)
+            starts = self._offsets[batch].tolist()
+            ends = self._offsets[batch + 1].tolist()
+            for entry, start, end in zip(batch.tolist(), starts, ends):
+                if verify and blob.find(query, start, end) == -1:
+                    continue
+                name = self._name(entry)
+                if name in exclude:
+                    continue
+                matches.append((self._tier(query, start, end), entry, name))
+                if len(matches) >= want:
+                    return [(tier, name) for tier, _, name in sorted(matches)]
+        return [(tier, name) for tier, _, name in sorted(matches)]
+
+    def _tier(self, query: bytes, start: int, end: int) -> int:
+        blob = self._blob
+        if end - start == len(query) and blob.startswith(query, start):
+            return 0
+        if blob.startswith(query, start):
+            return 1
+        slash = blob.rfind(b"/", start, end)
+        if slash != -1 and blob.startswith(query, slash + 1):
+            return 2
+        return 3
+
+    def substring_matches(self, query: str, limit: int = 10, exclude: Collection[str] = ()) -> List[str]:
+        """
+        Entries containing query (case-insensitive), best matches first
+
+        The first limit * 4 matches in download order are ranked, so a
+        low-ranked prefix match can lose out to popular substring matches.
+        """
+        query_bytes = query.strip().lower().encode("utf-8")
+        if not query_bytes or limit <= 0:
+            return []
+        matches = self._collect_substring(query_bytes, limit * 4, exclude)
+        return [name for _, name in matches[:limit]]
+
+    def close_matches(self, query: str, limit: int = 5, cutoff: float = 0.6,
+                      exclude: Collection[str] = ()) -> List[str]:
+        """
+        Entries similar to query, like difflib.get_close_matches but over a trigram shortlist
+
+        Ties on similarity go to the more downloaded entry.
+        """
+        query_lower = query.strip().lower()
+        codes = _trigram_codes(query_lower.encode("utf-8"))
+        if not len(codes) or limit <= 0:
+            return []
+
+        postings = [self._posting(int(code))[:FUZZY_POSTING_CAP] for code in codes]
+        postings = [p for p in postings if len(p)]
+        if not postings:
+            return []
+        entries, shared = np.unique(np.concatenate(postings), return_counts=True)
+        if len(entries) > FUZZY_CANDIDATES:
+            keep = np.argpartition(-shared, FUZZY_CANDIDATES)[:FUZZY_CANDIDATES]
+            entries = entries[keep]
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(query_lower)
+        scored = []
+        for entry in entries.tolist():
+            start, end = self._offsets[entry], self._offsets[entry + 1]
+            matcher.set_seq1(self._blob[start:end].decode("utf-8"))
+            if matcher.real_quick_ratio() < cutoff or matcher.quick_ratio() < cutoff:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= cutoff:
+                name = self._name(entry)
+                if name not in exclude:
+                    scored.append((-ratio, entry, name))
+        return [name for _, _, name in sorted(scored)[:limit]]
+
+    def suggest(self, query: str, limit: int = 10, exclude: Collection[str] = (),
+                cutoff: float = 0.6) -> List[str]:
+        """Substring matches for query, or close matches when nothing contains it"""
+        return (self.substring_matches(query, limit, exclude)
+                or self.close_matches(query, limit, cutoff, exclude))
+
+    def top(self, limit: int = 10, exclude: Collection[str] = ()) -> List[str]:
+        """Most downloaded entries, for an empty query"""
+        results = []
+        for entry in range(len(self)):
+            if len(results) >= limit:
+                break
+            name = self._name(entry)
+            if name not in exclude:
+                results.append(name)
+        return results
+
+
+class PinnedSearchIndex:
+    """
+    A catalog index searched together with a short pinned list
+
+    Pinned names (e.g. priority models and "Other", which are not Hub IDs)
+    rank ahead of catalog IDs in the same match tier; names in both are only
+    returned once.
+    """
+
+    def __init__(self, pinned: ModelSearchIndex, catalog: ModelSearchIndex):
+        self.pinned = pinned
+        self.catalog = catalog
+        self._indexes = (pinned, catalog)
+
+    def __len__(self) -> int:
+        return len(self.pinned) + len(self.catalog)
+
+    def substring_matches(self, query: str, limit: int = 10, exclude: Collection[str] = ()) -> List[str]:
+        """Entries containing query (case-insensitive), best matches first"""
+        query_bytes = query.strip().lower().encode("utf-8")
+        if not query_bytes or limit <= 0:
+            return []
+        matches = []
+        seen = set()
+        for source, index in enumerate(self._indexes):
+            for tier, name in index._collect_substring(query_bytes, limit * 4, exclude):
+                if name not in seen:
+                    seen.add(name)
+                    matches.append((tier, source, len(matches), name))
+        return [name for _, _, _, name in sorted(matches)[:limit]]
+
+    def close_matches(self, query: str, limit: int = 5, cutoff: float = 0.6,
+                      exclude: Collection[str] = ()) -> List[str]:
+        """Entries similar to query; ties on similarity go to pinned names"""
+        names = []
+        for index in self._indexes:
+            names.extend(name for name in index.close_matches(query, limit, cutoff, exclude) if name not in names)
+        matcher = SequenceMatcher()
+        matcher.set_seq2(query.strip().lower())
+        scored = []
+        for position, name in enumerate(names):
+            matcher.set_seq1(name.lower())
+            scored.append((-matcher.ratio(), position, name))
+        return [name for _, _, name in sorted(scored)[:limit]]
+
+    def suggest(self, query: str, limit: int = 10, exclude: Collection[str] = (),
+                cutoff: float = 0.6) -> List[str]:
+        """Substring matches for query, or close matches when nothing contains it"""
+        return (self.substring_matches(query, limit, exclude)
+                or self.close_matches(query, limit, cutoff, exclude))
+
+    def top(self, limit: int = 10, exclude: Collection[str] = ()) -> List[str]:
+        """Pinned names, then the most downloaded catalog entries"""
+        results = self.pinned.top(limit, exclude)
+        return results + self.catalog.top(limit - len(results), set(exclude) | set(results))
+
+
+_list_indexes: "OrderedDict[Tuple[str, ...], ModelSearchIndex]" = OrderedDict()
+_catalog_index: Optional[Tuple[CompactModelIndex, ModelSearchIndex]] = None
+_catalog_builder: Optional[threading.Thread] = None
+_search_lock = threading.Lock()
+
+
+def _list_index(key: Tuple[str, ...]) -> ModelSearchIndex:
+    index = _list_indexes.get(key)
+    if index is None:
+        index = ModelSearchIndex.from_names(key)
+        _list_indexes[key] = index
+        while len(_list_indexes) > LIST_CACHE_SIZE:
+            _list_indexes.popitem(last=False)
+    else:
+        _list_indexes.move_to_end(key)
+    return index
+
+
+def _build_catalog_index(catalog: CompactModelIndex):
+    global _catalog_index, _catalog_builder
+    try:
+        index = ModelSearchIndex(catalog)
+        with _search_lock:
+            _catalog_index = (catalog, index)
+    finally:
+        with _search_lock:
+            _catalog_builder = None
+
+
+def _catalog_search_index() -> ModelSearchIndex:
+    """
+    The index of the current catalog snapshot
+
+    Only the very first index is built on the caller's thread. When the
+    catalog swaps in a new snapshot, its index is built in the background
+    and the previous one keeps answering until it is ready.
+    """
+    global _catalog_index, _catalog_builder
+    catalog = get_model_catalog().index
+    if _catalog_index is None:
+        _catalog_index = (catalog, ModelSearchIndex(catalog))
+    elif _catalog_index[0] is not catalog and _catalog_builder is None:
+        _catalog_builder = threading.Thread(target=_build_catalog_index, args=(catalog,),
+                                            name="model-search-index", daemon=True)
+        _catalog_builder.start()
+    return _catalog_index[1]
+
+
+def get_search_index(models: Optional[Iterable[str]] = None, pinned: Optional[Iterable[str]] = None):
+    """
+    Return a search index shared by every session
+
+    Args:
+        models: Options in ranking order; None indexes the whole model catalog,
+            rebuilt when the catalog picks up a new snapshot
+        pinned: With models=None, names searched along with the catalog and
+            ranked ahead of it (pass a tuple, which is indexed once)
+
+    Returns:
+        A ModelSearchIndex, or a PinnedSearchIndex when pinned is given
+    """
+    with _search_lock:
+        if models is not None:
+            return _list_index(tuple(models))
+        index = _catalog_search_index()
+        if pinned:
+            return PinnedSearchIndex(_list_index(tuple(pinned)), index)
+        return index
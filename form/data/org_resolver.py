@@ -0,0 +1,287 @@
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from form.data.schema import AIFlawKnowledgeBase, get_knowledge_base
+from form.data.system_resolver import normalize_name
+
+# Organizations behind AI systems. A system name is matched against each organization's
+# aliases (anywhere in the normalized name) and word_aliases (whole words only), and its
+# Hugging Face owner against hub_orgs. Earlier entries win when several organizations match.
+ORGANIZATIONS = [
+    {
+        "name": "OpenAI",
+        "aliases": ["openai", "gpt", "dall e", "whisper"],
+        "word_aliases": ["o1", "o3"],
+        "hub_orgs": ["openai", "openai-community"],
+        "policy_links": [
+            "• [OpenAI Usage Policies](https://openai.com/policies/usage-policies/)",
+            "• [OpenAI Terms of Use](https://openai.com/policies/terms-of-use/)"
+        ],
+        "disclosure": "https://openai.com/security/vulnerability-reporting",
+    },
+    {
+        "name": "Anthropic",
+        "aliases": ["anthropic", "claude"],
+        "hub_orgs": ["anthropic"],
+        "policy_links": [
+            "• [Anthropic Usage Policy](https://www.anthropic.com/legal/aup)",
+            "• [Anthropic Bug Bounty](https://hackerone.com/anthropic-vdp?type=team)",
+            "• [Anthropic Disclosure Policy](https://www.anthropic.com/responsible-disclosure-policy)"
+        ],
+        "disclosure": "https://www.anthropic.com/security",
+    },
+    {
+        "name": "Google",
+        "aliases": ["google", "gemini"],
+        "word_aliases": ["palm", "bard"],
+        "hub_orgs": ["google", "google-bert", "google-t5"],
+        "policy_links": [
+            "• [Google AI Use Policy](https://policies.google.com/terms/generative-ai/use-policy)",
+            "• [Google Terms of Service](https://policies.google.com/terms)"
+        ],
+        "disclosure": "https://bughunters.google.com/",
+    },
+    {
+        "name": "Meta",
+        "aliases": ["llama"],
+        "word_aliases": ["meta"],
+        "hub_orgs": ["meta-llama", "facebook", "facebookai"],
+        "policy_links": [
+            "• [Meta AI Responsible Use](https://ai.meta.com/static-resource/responsible-use-guide/)",
+            "• [Meta Terms of Service](https://www.facebook.com/terms/)"
+        ],
+        "disclosure": "https://www.facebook.com/whitehat",
+    },
+    {
+        "name": "Microsoft",
+        "aliases": ["microsoft", "copilot"],
+        "hub_orgs": ["microsoft"],
+        "policy_links": [
+            "• [Microsoft Responsible AI](https://www.microsoft.com/en-us/ai/responsible-ai)",
+            "• [Microsoft Services Agreement](https://www.microsoft.com/en-us/servicesagreement)"
+        ],
+    },
+    {
+        "name": "Midjourney Inc",
+        "aliases": ["midjourney"],
+    },
+    {
+        "name": "Stability AI",
+        "aliases": ["stable diffusion", "stablediffusion", "stability ai"],
+        "hub_orgs": ["stabilityai"],
+    },
+]
+
+# Exact system names whose developer and deployer differ from the matched organization
+SYSTEM_OVERRIDES = {
+    "BERT": {"developer": "Google", "deployer": "HuggingFace"},
+    "bert-base-uncased": {"developer": "Google", "deployer": "HuggingFace"},
+}
+
+UNKNOWN = "Unknown"
+
+
+class AhoCorasick:
+    """
+    Multi-pattern substring matcher
+
+    All patterns are compiled into one automaton, so scanning a text for
+    every pattern takes a single pass over the text.
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, Any]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+        for pattern, value in patterns:
+            self._add(pattern, value)
+        self._link()
+
+    def _add(self, pattern: str, value: Any):
+        if not pattern:
+            return
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        self._out[state].append((len(pattern), value))
+
+    def _link(self):
+        """Compute failure links breadth-first and merge the outputs they reach"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+                queue.append(next_state)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, Any]]:
+        """Yield (start offset, value) for every pattern occurrence in text"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, value in out[state]:
+                yield position - length + 1, value
+
+
+class OrgResolver:
+    """
+    Resolve AI system names to the organizations behind them
+
+    A name is resolved, in order, by an exact SYSTEM_OVERRIDES entry, by the
+    Hugging Face owner of "org/model" IDs, by an exact knowledge base system
+    (through its publisher), and finally by the aliases of ORGANIZATIONS and
+    of knowledge base organizations, all matched in one Aho-Corasick pass
+    over the normalized name. Results are memoized per name in a bounded
+    LRU, so bulk conversion and recipient routing pay for each distinct
+    name once.
+    """
+
+    def __init__(self, organizations: List[Dict[str, Any]] = ORGANIZATIONS,
+                 overrides: Dict[str, Dict[str, str]] = SYSTEM_OVERRIDES,
+                 knowledge_base: Optional[AIFlawKnowledgeBase] = None, cache_size: int = 8192):
+        self.knowledge_base = knowledge_base
+        self.organizations: Dict[str, Dict[str, Any]] = {}
+        self._overrides = {normalize_name(name): vendor for name, vendor in overrides.items()}
+        self._hub_orgs: Dict[str, str] = {}
+
+        # (pattern, (priority, organization name)); lower priority wins
+        patterns: List[Tuple[str, Tuple[int, str]]] = []
+        for priority, org in enumerate(organizations):
+            self.organizations[org["name"]] = org
+            for alias in org.get("aliases", []):
+                patterns.append((normalize_name(alias), (priority, org["name"])))
+            # Names are padded with spaces, so padded aliases only match whole words
+            for alias in org.get("word_aliases", []):
+                patterns.append((f" {normalize_name(alias)} ", (priority, org["name"])))
+            for hub_org in org.get("hub_orgs", []):
+                self._hub_orgs[hub_org.lower()] = org["name"]
+
+        # Knowledge base organizations named like a table entry share its links and contacts
+        self._canonical = {normalize_name(name): name for name in self.organizations}
+        if knowledge_base is not None:
+            for org in knowledge_base.organizations_data.get("@graph", []):
+                name = org.get("name")
+                if not name:
+                    continue
+                canonical = self._canonical.get(normalize_name(name), name)
+                self.organizations.setdefault(canonical, {"name": canonical})
+                slug = org.get("_aifr_internal", {}).get("slug")
+                for alias in (name, slug):
+                    if alias and normalize_name(alias):
+                        patterns.append((f" {normalize_name(alias)} ", (len(organizations), canonical)))
+                if slug:
+                    self._hub_orgs.setdefault(slug.lower(), canonical)
+
+        self._matcher = AhoCorasick(patterns)
+        self._cached_resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def resolve(self, name: str) -> Dict[str, Any]:
+        """
+        Resolve a system name
+
+        Args:
+            name: System name as entered by the reporter or stored in a report
+
+        Returns:
+            {"organization", "developer", "deployer", "policy_links", "disclosure",
+            "source"} dict; organization and disclosure are None and developer and
+            deployer are "Unknown" when nothing matched
+        """
+        return dict(self._cached_resolve(name or ""))
+
+    def organization(self, name: str) -> Optional[str]:
+        """Name of the organization behind a system, or None"""
+        return self._cached_resolve(name or "")["organization"]
+
+    def policy_links(self, organization: str) -> List[str]:
+        """Policy links of an organization"""
+        return list(self.organizations.get(organization, {}).get("policy_links", []))
+
+    def cache_info(self):
+        """Hit/miss statistics of the per-name memo"""
+        return self._cached_resolve.cache_info()
+
+    def _result(self, organization: Optional[str], source: Optional[str],
+                developer: Optional[str] = None, deployer: Optional[str] = None) -> Dict[str, Any]:
+        org = self.organizations.get(organization, {})
+        return {
+            "organization": organization,
+            "developer": developer or organization or UNKNOWN,
+            "deployer": deployer or organization or UNKNOWN,
+            "policy_links": tuple(org.get("policy_links", ())),
+            "disclosure": org.get("disclosure"),
+            "source": source,
+        }
+
+    def _resolve(self, name: str) -> Dict[str, Any]:
+        normalized = normalize_name(name)
+        if not normalized:
+            return self._result(None, None)
+
+        override = self._overrides.get(normalized)
+        if override:
+            developer = override.get("developer")
+            organization = developer if developer in self.organizations else None
+            return self._result(organization, "override", developer, override.get("deployer"))
+
+        if "/" in name:
+            organization = self._hub_orgs.get(name.split("/", 1)[0].strip().lower())
+            if organization:
+                return self._result(organization, "hub")
+
+        if self.knowledge_base is not None:
+            organization = self._knowledge_base_publisher(name)
+            if organization:
+                return self._result(organization, "knowledge-base")
+
+        best = None
+        for start, match in self._matcher.iter_matches(f" {normalized} "):
+            if best is None or (match[0], start) < best:
+                best = (match[0], start, match[1])
+        if best:
+            return self._result(best[2], "alias")
+        return self._result(None, None)
+
+    def _knowledge_base_publisher(self, name: str) -> Optional[str]:
+        kb = self.knowledge_base
+        system = kb.slug_map.get(name) or kb.resolver.exact_match(name)
+        if not system:
+            return None
+        publisher_id = (system.get("publisher") or {}).get("@id")
+        org = kb.find_organization_by_id(publisher_id) if publisher_id else None
+        if not org or not org.get("name"):
+            return None
+        return self._canonical.get(normalize_name(org["name"]), org["name"])
+
+
+_resolvers: Dict[str, Tuple[Any, OrgResolver]] = {}
+_resolvers_lock = threading.Lock()
+
+
+def get_org_resolver(kb_path: str = "knowledge-base") -> OrgResolver:
+    """Return the shared resolver for kb_path, rebuilt when the knowledge base reloads"""
+    kb = get_knowledge_base(kb_path)
+    cached = _resolvers.get(kb_path)
+    # The knowledge base swaps in a new system resolver on every reload
+    if cached is None or cached[0] is not kb.resolver:
+        with _resolvers_lock:
+            cached = _resolvers.get(kb_path)
+            if cached is None or cached[0] is not kb.resolver:
+                cached = _resolvers[kb_path] = (kb.resolver, OrgResolver(knowledge_base=kb))
+    return cached[1]
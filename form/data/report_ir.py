@@ -0,0 +1,156 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+LOAD_ERROR = "Input must be a dict, a path to a JSON file, or a JSON string."
+
+def load_report(obj: Union[dict, str, Path]) -> dict:
+    """
+    Accept a dict, a path to a JSON file, or a JSON string and return a dict
+
+    Strings that look like JSON are parsed without touching the filesystem;
+    only other strings are treated as paths.
+    """
+    if isinstance(obj, dict):
+        return obj
+    if isinstance(obj, (str, Path)):
+        text = str(obj)
+        if isinstance(obj, Path) or not text.lstrip().startswith(("{", "[")):
+            p = Path(text)
+            if p.exists():
+                with open(p, "r", encoding="utf-8") as f:
+                    return json.load(f)
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as e:
+            raise TypeError(LOAD_ERROR) from e
+    raise TypeError(LOAD_ERROR)
+
+def _first(lst, default=None):
+    if isinstance(lst, list) and lst:
+        return lst[0]
+    return default
+
+def _get_list(data: dict, *keys):
+    for k in keys:
+        if k in data and isinstance(data[k], list):
+            return data[k]
+    return []
+
+def _get_str(data: dict, *keys, default=""):
+    for k in keys:
+        v = data.get(k)
+        if isinstance(v, str) and v.strip() != "":
+            return v
+    return default
+
+def _get_from_nested(data: dict, path: list, default=None):
+    cur = data
+    for key in path:
+        if isinstance(cur, dict) and key in cur:
+            cur = cur[key]
+        else:
+            return default
+    return cur
+
+class ReportIR:
+    """
+    A report parsed and normalized once, shared by every output format
+
+    Accepts the raw form shape as well as the JSON-LD shape: each field reads
+    the form key first and falls back to its JSON-LD alias. Text fields are
+    None when absent, list fields are empty lists. The source dict is kept as
+    `data` for format-specific fields.
+    """
+
+    def __init__(self, data: dict):
+        self.data = data
+
+        self.form_report_id: Optional[str] = _get_str(data, "Report ID", default=None)
+        report_id = _get_str(data, "Report ID", "identifier", default=None)
+        if not report_id:
+            # JSON-LD puts the ID at the end of @id, e.g. "https://.../reports/<id>"
+            atid = data.get("@id", "")
+            if isinstance(atid, str) and atid.rsplit("/", 1)[-1]:
+                report_id = atid.rsplit("/", 1)[-1]
+        self.report_id: Optional[str] = report_id
+
+        self.systems: List[Any] = _get_list(data, "Systems")
+        self.product_name: Optional[str] = None
+        self.product_version: Optional[str] = None
+        self.publisher_name: Optional[str] = None
+        if self.systems:
+            self.product_name = self.systems[0]
+        elif "aiSystem" in data:
+            sys0 = _first(data.get("aiSystem", []), {})
+            if isinstance(sys0, dict):
+                self.product_name = sys0.get("name")
+                self.product_version = sys0.get("version")
+                pub = sys0.get("publisher") or sys0.get("schema:publisher")
+                if isinstance(pub, dict):
+                    self.publisher_name = pub.get("name")
+
+        self.report_types: List[str] = _get_list(data, "Report Types", "reportType")
+        self.impacts: List[str] = _get_list(data, "Impacts", "impacts")
+        self.specific_harms: List[str] = _get_list(data, "Specific Harm Types", "aifr:specificHarmTypes")
+        self.stakeholders: List[str] = _get_list(data, "Impacted Stakeholder(s)", "aifr:impactedStakeholders")
+        self.detection_methods: List[str] = _get_list(data, "Detection", "aifr:detectionMethods")
+        self.attacker_resources: List[str] = _get_list(data, "Attacker Resources")
+        self.attacker_objectives: List[str] = _get_list(data, "Attacker Objectives")
+
+        self.flaw_description: Optional[str] = _get_str(data, "Flaw Description", default=None)
+        self.incident_description: Optional[str] = _get_str(data, "Incident Description", default=None)
+        self.flaw_description_detailed: Optional[str] = _get_str(data, "Flaw Description - Detailed", default=None)
+        self.incident_description_detailed: Optional[str] = _get_str(
+            data, "Incident Description - Detailed", default=None
+        )
+        self.jsonld_description: Optional[str] = _get_str(data, "description", default=None)
+
+        self.severity: Optional[str] = _get_str(data, "Severity", "severity", default=None)
+        self.prevalence: Optional[str] = _get_str(data, "Prevalence", "prevalence", default=None)
+        self.proof_of_concept = (
+            _get_str(data, "Proof-of-Concept Exploit", default=None)
+            or _get_from_nested(data, ["aifr:vulnerability", "aifr:proofOfConcept"], default=None)
+        )
+        self.context_info: Optional[str] = _get_str(data, "Context Info", "aifr:contextInfo", default=None)
+        self.harm_narrative: Optional[str] = _get_str(data, "Harm Narrative", default=None)
+        self.reporter_id: Optional[str] = _get_str(data, "Reporter ID", default=None)
+        self.submitter_relationship: Optional[str] = _get_str(data, "Submitter Relationship", default=None)
+        self.submission_timestamp: Optional[str] = _get_str(data, "Submission Timestamp", "dateCreated", default=None)
+        self.flaw_timestamp: Optional[str] = _get_str(data, "Flaw Timestamp Start", default=None)
+        self.incident_locations: Optional[str] = _get_str(data, "Incident Location(s)", default=None)
+        self.disclosure_intent = (
+            _get_str(data, "Disclosure Intent", default=None)
+            or _get_from_nested(data, ["aifr:disclosure", "aifr:intent"], default=None)
+        )
+        self.disclosure_timeline = (
+            _get_str(data, "Disclosure Timeline", default=None)
+            or _get_from_nested(data, ["aifr:disclosure", "aifr:timeline"], default=None)
+        )
+
+    def first_text(self, *fields: str, default: Optional[str] = None) -> Optional[str]:
+        """Return the first of the named text fields that is set"""
+        for field in fields:
+            value = getattr(self, field)
+            if value:
+                return value
+        return default
+
+    @property
+    def is_jsonld(self) -> bool:
+        """True if the source is already a JSON-LD document rather than raw form data"""
+        return "@context" in self.data
+
+def parse_report(raw_or_path: Union["ReportIR", dict, str, Path]) -> ReportIR:
+    """
+    Parse a report into its intermediate representation
+
+    Args:
+        raw_or_path: A ReportIR (returned as is), a dict, a path to a JSON file, or a JSON string
+
+    Returns:
+        The ReportIR for the report
+    """
+    if isinstance(raw_or_path, ReportIR):
+        return raw_or_path
+    return ReportIR(load_report(raw_or_path))
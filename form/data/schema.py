@@ -1,11 +1,18 @@
+import os
 import json
-import hashlib
+import time
+import threading
 from datetime import datetime, timezone
 from typing import Dict, Any, List, Optional, Union
 from pathlib import Path
+from types import SimpleNamespace
 from pydantic import BaseModel, Field, validator
 import pyld
 from pyld import jsonld
+from form.data.jsonld_loader import jsonld_options
+from form.data.jsonld_compact import compact_document
+from form.data.system_resolver import SystemResolver
+from form.utils.hashing import content_hash
 
 class UnknownAISystem(BaseModel):
     """Schema for unknown AI systems described by users."""
@@ -95,6 +102,7 @@ class AISystem(BaseModel):
     system_type: str = Field(default="known", description="'known' or 'unknown'")
     description: Optional[str] = Field(None, description="For unknown systems")
     publisher_info: Optional[Dict[str, Any]] = Field(None, description="Publisher/organization data")
+    match_confidence: Optional[float] = Field(None, description="Name resolver score for known systems")
 
 class ProcessedAIFlawReport(BaseModel):
     """Fully processed flaw report with enriched data - fields ordered to match form flow"""
@@ -136,19 +144,63 @@ class ProcessedAIFlawReport(BaseModel):
     raw_data: Optional[Dict[str, Any]] = Field(default=None, repr=False)
 
 
-def process_raw_report(raw_data: Dict[str, Any]) -> ProcessedAIFlawReport:
-    """Convert raw form data to processed report by resolving AI systems"""
+# Set AIFR_VERIFY_TRUSTED=1 to check every trusted fast-path result against full validation
+VERIFY_TRUSTED_PATH = os.environ.get("AIFR_VERIFY_TRUSTED", "").lower() in ("1", "true", "yes")
+
+# (field name, alias, default) of every RawAIFlawReport field, computed once for the trusted fast path
+_RAW_REPORT_FIELDS = [
+    (name, field.alias or name, field.default) for name, field in RawAIFlawReport.model_fields.items()
+]
+
+def _trusted_raw_report(raw_data: Dict[str, Any]) -> SimpleNamespace:
+    """
+    Read raw report data that already passed validation without validating it again
     
-    raw_report = RawAIFlawReport.model_validate(raw_data)
-    kb = AIFlawKnowledgeBase()
+    Exposes the fields the way RawAIFlawReport does (by alias, then field name,
+    then the field default); list defaults are fresh lists, like pydantic's
+    copied defaults.
+    """
+    values = {}
+    for name, alias, default in _RAW_REPORT_FIELDS:
+        if alias in raw_data:
+            values[name] = raw_data[alias]
+        elif name in raw_data:
+            values[name] = raw_data[name]
+        else:
+            values[name] = list(default) if isinstance(default, list) else default
+    return SimpleNamespace(**values)
+
+def process_raw_report(raw_data: Dict[str, Any], trusted: bool = False) -> ProcessedAIFlawReport:
+    """
+    Convert raw form data to processed report by resolving AI systems
+    
+    Pass trusted=True only for data that already passed validation (e.g. reports we
+    stored ourselves): the raw fields are then read directly instead of being
+    validated into a RawAIFlawReport. Form input must always go through the
+    default, fully validated path.
+    """
+    if trusted and VERIFY_TRUSTED_PATH:
+        mismatch = verify_trusted_fast_path(raw_data)
+        if mismatch:
+            raise AssertionError(f"Trusted fast path diverged from validation: {mismatch}")
+    
+    return _process_raw_report(raw_data, trusted)
+
+def _process_raw_report(raw_data: Dict[str, Any], trusted: bool) -> ProcessedAIFlawReport:
+    if trusted:
+        raw_report = _trusted_raw_report(raw_data)
+    else:
+        raw_report = RawAIFlawReport.model_validate(raw_data)
+    kb = get_knowledge_base()
     
-    report_id = raw_data.get("Report ID") or f"AFL-{hashlib.md5(json.dumps(raw_data, sort_keys=True).encode()).hexdigest()[:8]}"
+    report_id = raw_data.get("Report ID") or f"AFL-{content_hash(raw_data)[:8]}"
     
     ai_systems = []
     systems_list = raw_report.systems or []
     for system_name in systems_list:
-        system_data = kb.find_system_by_name_or_slug(system_name)
-        if system_data:
+        match = kb.resolve_system(system_name)
+        if match:
+            system_data = match["system"]
             internal_data = system_data.get("_aifr_internal", {})
             ai_system = AISystem(
                 id=system_data.get("@id", f"https://aiflawreports.org/systems/{system_name}"),
@@ -156,7 +208,8 @@ def process_raw_report(raw_data: Dict[str, Any]) -> ProcessedAIFlawReport:
                 version=system_data.get("version", ""),
                 slug=internal_data.get("slug", system_name),
                 display_name=internal_data.get("displayName", system_name),
-                system_type="known"
+                system_type="known",
+                match_confidence=match["score"]
             )
         else:
             ai_system = AISystem(
@@ -251,6 +304,19 @@ def process_raw_report(raw_data: Dict[str, Any]) -> ProcessedAIFlawReport:
     processed_report.raw_data = raw_data
     return processed_report
 
+def verify_trusted_fast_path(raw_data: Dict[str, Any]) -> Optional[str]:
+    """
+    Compare the trusted fast path against full validation for one report
+    Returns None if both produce the same processed report, otherwise a description of the difference
+    """
+    validated = _process_raw_report(raw_data, trusted=False).model_dump(exclude={"created_at"})
+    trusted = _process_raw_report(raw_data, trusted=True).model_dump(exclude={"created_at"})
+    
+    if validated == trusted:
+        return None
+    differing = sorted(k for k in set(validated) | set(trusted) if validated.get(k) != trusted.get(k))
+    return f"fields differ: {differing}"
+
 
 def clean_internal_fields(data: Dict[str, Any]) -> Dict[str, Any]:
     """Remove fields starting with underscore for clean JSON-LD output."""
@@ -269,72 +335,109 @@ class AIFlawKnowledgeBase:
         self.systems_data = None
         self.organizations_data = None
         self.slug_map = {}
+        self.resolver = SystemResolver([])
+        self.organization_index = {}
+        self._file_mtimes = None
+        self._last_reload_check = time.monotonic()
+        self._lock = threading.Lock()
         self._load_knowledge_base()
     
+    def _current_mtimes(self):
+        """Modification times of the knowledge base files (None for missing files)"""
+        mtimes = []
+        for file_name in ("ai-systems.jsonld", "organizations.jsonld"):
+            try:
+                mtimes.append((self.kb_path / file_name).stat().st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+    
+    def reload_if_changed(self, min_interval: float = 0.0) -> bool:
+        """
+        Reload the knowledge base if either file changed on disk since the last load
+        Files are not checked again until min_interval seconds after the previous check
+        """
+        now = time.monotonic()
+        if now - self._last_reload_check < min_interval:
+            return False
+        self._last_reload_check = now
+        if self._current_mtimes() == self._file_mtimes:
+            return False
+        with self._lock:
+            if self._current_mtimes() == self._file_mtimes:
+                return False
+            self._load_knowledge_base()
+            return True
+    
     def _load_knowledge_base(self):
         """Load knowledge base files or create minimal fallback data"""
+        mtimes = self._current_mtimes()
         try:
             if (self.kb_path / "ai-systems.jsonld").exists():
                 with open(self.kb_path / "ai-systems.jsonld") as f:
-                    self.systems_data = json.load(f)
+                    systems_data = json.load(f)
             else:
-                self.systems_data = {"@graph": []}
+                systems_data = {"@graph": []}
                 
             if (self.kb_path / "organizations.jsonld").exists():
                 with open(self.kb_path / "organizations.jsonld") as f:
-                    self.organizations_data = json.load(f)
+                    organizations_data = json.load(f)
             else:
-                self.organizations_data = {"@graph": []}
+                organizations_data = {"@graph": []}
                 
         except (FileNotFoundError, json.JSONDecodeError):
-            self.systems_data = {"@graph": []}
-            self.organizations_data = {"@graph": []}
+            systems_data = {"@graph": []}
+            organizations_data = {"@graph": []}
         
+        self.systems_data = systems_data
+        self.organizations_data = organizations_data
         self._build_slug_map()
+        self._build_indexes()
+        self._file_mtimes = mtimes
         
     
     def _build_slug_map(self):
         """Build slug to system/org mapping"""
-        self.slug_map = {}
+        slug_map = {}
         
         if self.systems_data:
             for system in self.systems_data.get("@graph", []):
                 slug = system.get("_aifr_internal", {}).get("slug")
                 if slug:
-                    self.slug_map[slug] = system
+                    slug_map[slug] = system
         
         if self.organizations_data:
             for org in self.organizations_data.get("@graph", []):
                 slug = org.get("_aifr_internal", {}).get("slug")
                 if slug:
-                    self.slug_map[slug] = org
-    
-    def find_system_by_name_or_slug(self, identifier: str) -> Optional[Dict[str, Any]]:
-        """Find system by name or slug with fuzzy matching"""
-        # Direct slug match
-        if identifier in self.slug_map:
-            return self.slug_map[identifier]
+                    slug_map[slug] = org
         
-        # Search by name (case-insensitive partial match)
-        identifier_lower = identifier.lower()
-        for system in self.systems_data.get("@graph", []):
-            name = system.get("name", "").lower()
-            display_name = system.get("_aifr_internal", {}).get("displayName", "").lower()
-            
-            if (identifier_lower in name or 
-                identifier_lower in display_name or
-                name in identifier_lower or
-                display_name in identifier_lower):
-                return system
+        self.slug_map = slug_map
+    
+    def _build_indexes(self):
+        """Build the system name resolver and the organization @id index"""
+        organization_index = {}
+        for org in reversed(self.organizations_data.get("@graph", [])):
+            if org.get("@id"):
+                organization_index[org["@id"]] = org
         
-        return None
+        self.resolver = SystemResolver(self.systems_data.get("@graph", []))
+        self.organization_index = organization_index
+    
+    def resolve_system(self, identifier: str) -> Optional[Dict[str, Any]]:
+        """Resolve a system name to a {"system", "score", "match"} candidate, or None"""
+        if identifier in self.slug_map:
+            return {"system": self.slug_map[identifier], "score": 1.0, "match": "exact"}
+        return self.resolver.resolve(identifier)
+    
+    def find_system_by_name_or_slug(self, identifier: str) -> Optional[Dict[str, Any]]:
+        """Find system by slug, @id or name using the ranked name resolver"""
+        match = self.resolve_system(identifier)
+        return match["system"] if match else None
     
     def find_organization_by_id(self, org_id: str) -> Optional[Dict[str, Any]]:
         """Find organization by @id URI"""
-        for org in self.organizations_data.get("@graph", []):
-            if org.get("@id") == org_id:
-                return org
-        return None
+        return self.organization_index.get(org_id)
     
     def get_system_jsonld(self, identifier: str) -> Optional[Dict[str, Any]]:
         """Get clean JSON-LD representation of system with full publisher data"""
@@ -358,6 +461,26 @@ class AIFlawKnowledgeBase:
         
         return jsonld_system
 
+# Seconds between file checks in get_knowledge_base; stat-ing both files for every
+# report would dominate bulk processing
+KB_RELOAD_CHECK_INTERVAL = 1.0
+
+_knowledge_bases: Dict[str, AIFlawKnowledgeBase] = {}
+_knowledge_bases_lock = threading.Lock()
+
+def get_knowledge_base(kb_path: str = "knowledge-base") -> AIFlawKnowledgeBase:
+    """Return the shared knowledge base for kb_path, reloading it if its files changed"""
+    # Keyed by the path as given, so the common case is one dictionary lookup without the lock
+    kb = _knowledge_bases.get(kb_path)
+    if kb is None:
+        with _knowledge_bases_lock:
+            kb = _knowledge_bases.get(kb_path)
+            if kb is None:
+                kb = _knowledge_bases[kb_path] = AIFlawKnowledgeBase(kb_path)
+                return kb
+    kb.reload_if_changed(KB_RELOAD_CHECK_INTERVAL)
+    return kb
+
 def _normalized_description(text: Optional[str]) -> str:
     if not text:
         return "No description provided"
@@ -368,7 +491,7 @@ def _normalized_description(text: Optional[str]) -> str:
     return t
 
 def serialize_to_jsonld(processed_report: ProcessedAIFlawReport) -> Dict[str, Any]:
-    kb = AIFlawKnowledgeBase()
+    kb = get_knowledge_base()
 
     jsonld_systems, system_names = [], []
     for system in processed_report.ai_systems:
@@ -499,21 +622,35 @@ def serialize_to_jsonld(processed_report: ProcessedAIFlawReport) -> Dict[str, An
 
 
 
+def build_jsonld_document(form_data: Dict[str, Any], trusted: bool = False) -> Dict[str, Any]:
+    """
+    Generate the compacted JSON-LD document of a report as a dict, raising if the report cannot be processed
+    Set trusted=True only for stored reports that already passed validation
+    """
+    processed_report = process_raw_report(form_data, trusted=trusted)
+    
+    jsonld_report = serialize_to_jsonld(processed_report)
+    
+    try:
+        # Direct compaction matches pyld's output; unsupported documents still go through pyld
+        return compact_document(jsonld_report)
+    except Exception:
+        return jsonld_report
+
+def build_machine_readable_output(form_data: Dict[str, Any], trusted: bool = False) -> str:
+    """
+    Generate compacted JSON-LD for a report, raising if the report cannot be processed
+    Set trusted=True only for stored reports that already passed validation
+    """
+    return json.dumps(build_jsonld_document(form_data, trusted=trusted), indent=2)
+
 def generate_machine_readable_output(form_data: Dict[str, Any]) -> str:
     """
     Main function to replace the original manual JSON-LD generation
     Uses Pydantic validation, knowledge base enrichment, and proper JSON-LD structure
     """
     try:
-        processed_report = process_raw_report(form_data)
-        
-        jsonld_report = serialize_to_jsonld(processed_report)
-        
-        try:
-            compacted = jsonld.compact(jsonld_report, jsonld_report["@context"])
-            return json.dumps(compacted, indent=2)
-        except Exception:
-            return json.dumps(jsonld_report, indent=2)
+        return build_machine_readable_output(form_data)
             
     except Exception as e:
         return json.dumps({
@@ -536,13 +673,14 @@ def validate_jsonld_output(jsonld_string: str) -> tuple[bool, Optional[str]]:
         
         if "@context" not in data:
             return False, "Missing @context"
-        if "@type" not in data:
+        # The schema.org context aliases @type/@id as type/id, so compacted output uses those
+        if "@type" not in data and "type" not in data:
             return False, "Missing @type"
-        if "@id" not in data:
+        if "@id" not in data and "id" not in data:
             return False, "Missing @id"
         
         try:
-            expanded = jsonld.expand(data)
+            expanded = jsonld.expand(data, options=jsonld_options())
             return True, None
         except Exception as e:
             return False, f"JSON-LD expansion error: {e}"
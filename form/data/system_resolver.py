@@ -0,0 +1,161 @@
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def normalize_name(value: str) -> str:
+    """Lowercase a name and collapse punctuation and whitespace runs to single spaces"""
+    return re.sub(r"[^0-9a-z]+", " ", value.casefold()).strip()
+
+
+def _trigrams(normalized: str) -> set:
+    """Character trigrams of a normalized name, padded so short names still get n-grams"""
+    padded = f"  {normalized.replace(' ', '')} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SystemResolver:
+    """
+    Resolve free-text AI system names against knowledge base systems
+
+    Every system is indexed under its @id, slug, name and display name.
+    Exact matches (raw, normalized or with spaces removed) score 1.0.
+    Other names are scored against candidates that share character
+    trigrams or tokens, combining trigram Dice similarity and token
+    overlap. Results are memoized per name, so resolving the same names
+    across a large batch of reports costs a dictionary lookup each.
+    """
+
+    def __init__(self, systems: Iterable[Dict[str, Any]], min_score: float = 0.7,
+                 ambiguity_margin: float = 0.05, cache_size: int = 8192):
+        self.systems = list(systems)
+        self.min_score = min_score
+        self.ambiguity_margin = ambiguity_margin
+
+        self._exact: Dict[str, int] = {}
+        self._keys: List[tuple] = []
+        self._trigram_postings: Dict[str, set] = defaultdict(set)
+        self._token_postings: Dict[str, set] = defaultdict(set)
+
+        # Reversed so that the first system in the graph wins on duplicate exact keys
+        for system_idx in reversed(range(len(self.systems))):
+            system = self.systems[system_idx]
+            internal = system.get("_aifr_internal", {})
+            for key in (system.get("@id"), internal.get("slug")):
+                if key:
+                    self._exact[key] = system_idx
+            for name in (system.get("name"), internal.get("displayName"), internal.get("slug")):
+                if name:
+                    self._add_name(system_idx, name)
+
+        self._cached_candidates = lru_cache(maxsize=cache_size)(self._compute_candidates)
+
+    def _add_name(self, system_idx: int, name: str):
+        normalized = normalize_name(name)
+        if not normalized:
+            return
+
+        self._exact[normalized] = system_idx
+        self._exact[normalized.replace(" ", "")] = system_idx
+
+        key_idx = len(self._keys)
+        trigrams = _trigrams(normalized)
+        tokens = frozenset(normalized.split())
+        self._keys.append((system_idx, trigrams, tokens))
+        for trigram in trigrams:
+            self._trigram_postings[trigram].add(key_idx)
+        for token in tokens:
+            self._token_postings[token].add(key_idx)
+
+    def candidates(self, name: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Rank knowledge base systems for a name
+
+        Args:
+            name: Free-text system name as entered by the reporter
+            limit: Maximum number of candidates to return
+
+        Returns:
+            List of {"system", "score", "match"} dicts, best first; match is
+            "exact" or "fuzzy"
+        """
+        if not name:
+            return []
+        return [dict(candidate) for candidate in self._cached_candidates(name)[:limit]]
+
+    def resolve(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the best candidate, or None if no candidate is confident and unambiguous
+
+        Args:
+            name: Free-text system name as entered by the reporter
+
+        Returns:
+            The best {"system", "score", "match"} dict or None
+        """
+        ranked = self.candidates(name, limit=2)
+        if not ranked:
+            return None
+
+        best = ranked[0]
+        if best["match"] == "exact":
+            return best
+        if best["score"] < self.min_score:
+            return None
+        if len(ranked) > 1 and ranked[1]["score"] >= best["score"] - self.ambiguity_margin:
+            return None
+        return best
+
+    def exact_match(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the system indexed under name (raw, normalized or with spaces removed), or None
+
+        Unlike resolve, this never scores fuzzy candidates.
+        """
+        if not name:
+            return None
+        normalized = normalize_name(name)
+        for key in (name, normalized, normalized.replace(" ", "")):
+            if key in self._exact:
+                return self.systems[self._exact[key]]
+        return None
+
+    def cache_info(self):
+        """Hit/miss statistics of the per-name memo"""
+        return self._cached_candidates.cache_info()
+
+    def _compute_candidates(self, name: str) -> tuple:
+        system = self.exact_match(name)
+        if system is not None:
+            return ({"system": system, "score": 1.0, "match": "exact"},)
+
+        normalized = normalize_name(name)
+        if not normalized:
+            return ()
+
+        query_trigrams = _trigrams(normalized)
+        query_tokens = frozenset(normalized.split())
+
+        shared_trigrams: Dict[int, int] = defaultdict(int)
+        for trigram in query_trigrams:
+            for key_idx in self._trigram_postings.get(trigram, ()):
+                shared_trigrams[key_idx] += 1
+        candidate_keys = set(shared_trigrams)
+        for token in query_tokens:
+            candidate_keys.update(self._token_postings.get(token, ()))
+
+        best_by_system: Dict[int, float] = {}
+        for key_idx in candidate_keys:
+            system_idx, trigrams, tokens = self._keys[key_idx]
+            dice = 2 * shared_trigrams.get(key_idx, 0) / (len(query_trigrams) + len(trigrams))
+            overlap = len(query_tokens & tokens) / len(query_tokens | tokens)
+            score = round(0.7 * dice + 0.3 * overlap, 4)
+            if score > best_by_system.get(system_idx, 0.0):
+                best_by_system[system_idx] = score
+
+        ranked = sorted(best_by_system.items(), key=lambda item: (-item[1], item[0]))
+        return tuple(
+            {"system": self.systems[system_idx], "score": score, "match": "fuzzy"}
+            for system_idx, score in ranked[:10]
+        )
@@ -13,6 +13,7 @@ class InputType(Enum):
     DATE = auto()
     SELECT_SLIDER = auto()
     SEGMENTED_CONTROL = auto()
+    SEARCHABLE_MULTISELECT = auto()
 
 class FormEntry:
     """
@@ -178,6 +179,17 @@ class FormEntry:
                 **{k: v for k, v in self.extra_params.items() if k != "key"}
             )
         
+        elif self.input_type == InputType.SEARCHABLE_MULTISELECT:
+            # Typeahead over a search index, for option lists too long to render (e.g. the
+            # whole model catalog); options only seed the suggestions shown before typing
+            from form.data.hf_get_models import searchable_dropdown_selector
+            result = searchable_dropdown_selector(
+                available_models=self.options or [],
+                key_prefix=self.extra_params.get("key", self.name),
+                label=self.title,
+                **{k: v for k, v in self.extra_params.items() if k != "key"}
+            )
+        
         else:
             raise ValueError(f"Unsupported input type: {self.input_type}")
             
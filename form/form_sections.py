@@ -1,6 +1,6 @@
 import streamlit as st
 from form.utils.helpers import handle_other_option
-from form.data.hf_get_models import get_systems_options
+from form.data.hf_get_models import get_systems_options, get_systems_search_index
 from form.data.form_entries import form_entries
 from form.report_type_logic import determine_report_types
 from form.data.policy_mappings import display_policy_links
@@ -21,9 +21,11 @@ def display_basic_information():
             
             systems_options = get_systems_options(use_api=use_api)
             
+            # Any model in the catalog can be found by typing; the options are the popular picks
             form_entries["ai_systems"].options = systems_options
             form_entries["ai_systems"].extra_params = {
-                "key": "systems_selections",
+                "key": "systems",
+                "search_index": get_systems_search_index(),
                 "placeholder": "Choose AI systems..."
             }
             
@@ -0,0 +1,119 @@
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Form fields that change on every submission without changing the report
+VOLATILE_FIELDS = ("Submission Timestamp",)
+
+RDF_HASH_CACHE_SIZE = 4096
+
+_rdf_hash_cache = OrderedDict()
+_rdf_hash_lock = threading.Lock()
+
+def canonical_json(data):
+    """Serialize data to a canonical JSON string
+    
+    Keys are sorted and separators are fixed, so equal data always produces
+    the same string regardless of dict insertion order.
+    
+    Args:
+        data: JSON-serializable data (non-JSON values are converted with str)
+        
+    Returns:
+        Canonical JSON string
+    """
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+def content_hash(data, exclude=()):
+    """Compute the SHA-256 hash of the canonical JSON form of data
+    
+    Args:
+        data: JSON-serializable data
+        exclude: Top-level keys to leave out (e.g. volatile timestamps)
+        
+    Returns:
+        Hex digest string
+    """
+    if exclude and isinstance(data, dict):
+        data = {k: v for k, v in data.items() if k not in exclude}
+    return hashlib.sha256(canonical_json(data).encode("utf-8")).hexdigest()
+
+def rdf_hash(document):
+    """Compute the SHA-256 hash of the URDNA2015-normalized N-Quads of a JSON-LD document
+    
+    Unlike content_hash, this is stable across compaction choices, key order
+    and aliases, since it hashes the RDF graph itself. Normalization is
+    expensive, so results are memoized by the document's canonical JSON and
+    each distinct document is normalized once per process.
+    
+    Args:
+        document: JSON-LD document as a dict or JSON string
+        
+    Returns:
+        Hex digest string
+    """
+    if isinstance(document, str):
+        document = json.loads(document)
+    key = content_hash(document)
+    
+    with _rdf_hash_lock:
+        digest = _rdf_hash_cache.get(key)
+        if digest is not None:
+            _rdf_hash_cache.move_to_end(key)
+            return digest
+    
+    from pyld import jsonld
+    from form.data.jsonld_loader import jsonld_options
+    
+    nquads = jsonld.normalize(document, jsonld_options(algorithm="URDNA2015", format="application/n-quads"))
+    digest = hashlib.sha256(nquads.encode("utf-8")).hexdigest()
+    
+    with _rdf_hash_lock:
+        _rdf_hash_cache[key] = digest
+        if len(_rdf_hash_cache) > RDF_HASH_CACHE_SIZE:
+            _rdf_hash_cache.popitem(last=False)
+    return digest
+
+def report_hashes(form_data, machine_readable=None):
+    """Compute the fingerprints stored next to each report
+    
+    Submit paths leave out machine_readable: normalizing it takes tens of
+    milliseconds and never hits the memo there (every new document carries a
+    new dateCreated), so the rdf_hash is filled in later by fill_rdf_hash.
+    
+    Args:
+        form_data: Raw form data of the report
+        machine_readable: JSON-LD output of the report, if any
+        
+    Returns:
+        Dict with "content_hash" (canonical JSON of the form data, without
+        VOLATILE_FIELDS) and "rdf_hash" (None if there is no valid JSON-LD
+        or none was given)
+    """
+    hashes = {"content_hash": content_hash(form_data, exclude=VOLATILE_FIELDS), "rdf_hash": None}
+    if machine_readable:
+        try:
+            hashes["rdf_hash"] = rdf_hash(machine_readable)
+        except Exception:
+            pass
+    return hashes
+
+def fill_rdf_hash(report_data):
+    """Compute the rdf_hash of a stored report record in place if it is missing
+    
+    Called off the request path: by the spool flushers before publishing,
+    by the local provider's background hasher, by index rebuilds and by exports.
+    
+    Args:
+        report_data: Report record with "machine_readable" and optionally "rdf_hash"
+        
+    Returns:
+        The same report_data
+    """
+    if report_data.get("rdf_hash") is None and report_data.get("machine_readable"):
+        try:
+            report_data["rdf_hash"] = rdf_hash(report_data["machine_readable"])
+        except Exception:
+            pass
+    return report_data
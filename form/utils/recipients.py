@@ -1,4 +1,31 @@
+import os
+import sys
+import json
+import logging
+import argparse
+import threading
+from itertools import chain
+from pathlib import Path
+import numpy as np
+import pandas as pd
 import streamlit as st
+from form.data.org_resolver import get_org_resolver
+
+# Routing rules; recipients can be added or changed there without code changes
+RULES_PATH = Path(__file__).resolve().parent.parent / "data" / "catalogs" / "recipient_rules.json"
+
+# Rule conditions and the report fields they test; organizations are resolved from the systems
+DIMENSIONS = {
+    "organizations": None,
+    "harm_types": "Experienced Harm Types",
+    "severities": "Severity",
+    "report_types": "Report Types",
+}
+
+RECIPIENT_FIELDS = ("name", "type", "contact", "reason")
+
+logger = logging.getLogger(__name__)
+
 class ReportRecipient:
     """Class representing a recipient of a flaw report"""
     
@@ -35,7 +62,7 @@ class ReportRecipient:
         
         Args:
             report_data (dict): The report data to submit
-            
+        
         Returns:
             bool: True if submission was successful, False otherwise
         """
@@ -53,73 +80,315 @@ class ReportRecipient:
             status=data.get("status", "pending")
         )
 
+def _as_list(value):
+    """Normalize a report field (list, array, single string or missing) to a list"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, (list, tuple, np.ndarray, pd.Series)):
+        return list(value)
+    if isinstance(value, float) and np.isnan(value):
+        return []
+    return [value]
+
+def _report_systems(form_data):
+    systems = form_data.get("Implicated Systems")
+    if systems is None:
+        systems = form_data.get("Systems")
+    return _as_list(systems)
+
+def load_routing_rules(path=RULES_PATH):
+    """
+    Load and check routing rules
+    
+    Each rule is {"id", "recipient": {"name", "type", "contact", "reason"}, "when": {...}}.
+    "when" maps any of DIMENSIONS to a list of accepted values; a rule matches when
+    every listed dimension has at least one accepted value, and a missing dimension
+    accepts anything. Rules with "for_each": "organization" emit one recipient per
+    resolved organization that has a disclosure contact, with {organization} and
+    {disclosure} filled into the recipient fields.
+    
+    Args:
+        path (str): Rules JSON file
+    
+    Returns:
+        list: The rules, in routing order
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        rules = json.load(f).get("rules", [])
+    
+    for position, rule in enumerate(rules):
+        rule_id = rule.get("id", position)
+        recipient = rule.get("recipient") or {}
+        missing = [field for field in ("name", "type", "contact") if not recipient.get(field)]
+        if missing:
+            raise ValueError(f"Routing rule {rule_id}: recipient is missing {', '.join(missing)}")
+        unknown = set(rule.get("when") or {}) - set(DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Routing rule {rule_id}: unknown conditions {sorted(unknown)}")
+        if rule.get("for_each") not in (None, "organization"):
+            raise ValueError(f"Routing rule {rule_id}: unknown for_each {rule['for_each']!r}")
+    return rules
+
+class RecipientRouter:
+    """
+    Routing rules compiled into an indexed decision table
+    
+    Rule i is bit i of a mask. For every dimension the table maps each
+    accepted value to the mask of rules accepting it, plus a wildcard mask of
+    the rules without a condition on that dimension. A report matches the
+    AND over dimensions of (wildcard | OR of its values' masks), so routing
+    costs one dictionary lookup per report value however many rules there
+    are. route_frame does the same with numpy over a whole DataFrame.
+    """
+    
+    def __init__(self, rules, resolver=None):
+        """
+        Args:
+            rules (list): Rules as returned by load_routing_rules
+            resolver (OrgResolver, optional): Resolver for system organizations
+                (default: the shared one)
+        """
+        self.rules = list(rules)
+        self.resolver = resolver or get_org_resolver()
+        self._all_rules = (1 << len(self.rules)) - 1
+        self._wildcard = {dimension: 0 for dimension in DIMENSIONS}
+        self._value_masks = {dimension: {} for dimension in DIMENSIONS}
+        
+        for bit, rule in enumerate(self.rules):
+            when = rule.get("when") or {}
+            for dimension in DIMENSIONS:
+                values = when.get(dimension)
+                if not values:
+                    self._wildcard[dimension] |= 1 << bit
+                    continue
+                masks = self._value_masks[dimension]
+                for value in values:
+                    masks[value] = masks.get(value, 0) | 1 << bit
+        
+        # The same table as (values, words) uint64 arrays for route_frame
+        self._words = max(1, (len(self.rules) + 63) // 64)
+        self._wildcard_words = {dimension: self._to_words(mask) for dimension, mask in self._wildcard.items()}
+        self._value_codes = {}
+        self._value_words = {}
+        for dimension, masks in self._value_masks.items():
+            self._value_codes[dimension] = {value: code for code, value in enumerate(masks)}
+            self._value_words[dimension] = np.array(
+                [self._to_words(mask) for mask in masks.values()], dtype=np.uint64
+            ).reshape(len(masks), self._words)
+    
+    def _to_words(self, mask):
+        return [(mask >> (64 * word)) & 0xFFFFFFFFFFFFFFFF for word in range(self._words)]
+    
+    def _organizations(self, systems):
+        """Distinct (organization, disclosure contact) pairs of the systems, in order"""
+        organizations = {}
+        for system in systems:
+            if not isinstance(system, str):
+                continue
+            vendor = self.resolver.resolve(system)
+            if vendor["organization"]:
+                organizations.setdefault(vendor["organization"], vendor["disclosure"])
+        return list(organizations.items())
+    
+    def _expand(self, rule, organizations):
+        """Recipient field dicts a matching rule emits for a report's organizations"""
+        recipient = rule["recipient"]
+        if rule.get("for_each") != "organization":
+            return [recipient]
+        
+        accepted = (rule.get("when") or {}).get("organizations")
+        expanded = []
+        for organization, disclosure in organizations:
+            if not disclosure or (accepted and organization not in accepted):
+                continue
+            values = {"organization": organization, "disclosure": disclosure}
+            expanded.append({field: str(recipient.get(field) or "").format_map(values)
+                             for field in RECIPIENT_FIELDS})
+        return expanded
+    
+    def matching_rules(self, form_data, organizations=None):
+        """
+        Indexes of the rules matching one report
+        
+        Args:
+            form_data (dict): Report form data
+            organizations (list, optional): Precomputed _organizations of the report's systems
+        
+        Returns:
+            list: Rule indexes in routing order
+        """
+        if organizations is None:
+            organizations = self._organizations(_report_systems(form_data))
+        features = {
+            "organizations": [organization for organization, _ in organizations],
+            "harm_types": _as_list(form_data.get(DIMENSIONS["harm_types"])),
+            "severities": _as_list(form_data.get(DIMENSIONS["severities"])),
+            "report_types": _as_list(form_data.get(DIMENSIONS["report_types"])),
+        }
+        
+        matched = self._all_rules
+        for dimension, values in features.items():
+            masks = self._value_masks[dimension]
+            dimension_mask = self._wildcard[dimension]
+            for value in values:
+                if isinstance(value, str):
+                    dimension_mask |= masks.get(value, 0)
+            matched &= dimension_mask
+        return [bit for bit in range(len(self.rules)) if matched >> bit & 1]
+    
+    def route(self, form_data):
+        """
+        Recipients for one report
+        
+        Args:
+            form_data (dict): Report form data
+        
+        Returns:
+            list: ReportRecipient objects in rule order, without duplicates
+        """
+        organizations = self._organizations(_report_systems(form_data))
+        recipients = []
+        seen = set()
+        for bit in self.matching_rules(form_data, organizations):
+            for fields in self._expand(self.rules[bit], organizations):
+                key = (fields["name"], fields["type"], fields["contact"])
+                if key in seen:
+                    continue
+                seen.add(key)
+                recipients.append(ReportRecipient(
+                    name=fields["name"],
+                    recipient_type=fields["type"],
+                    contact=fields["contact"],
+                    reason=fields.get("reason")
+                ))
+        return recipients
+    
+    def _dimension_words(self, dimension, rows, values, count):
+        """OR the value masks of (row, value) pairs into per-report mask words"""
+        words = np.tile(np.array(self._wildcard_words[dimension], dtype=np.uint64), (count, 1))
+        codes_by_value = self._value_codes[dimension]
+        if len(values) and codes_by_value:
+            codes = pd.Series(values, dtype=object).map(codes_by_value)
+            known = codes.notna().to_numpy()
+            if known.any():
+                np.bitwise_or.at(words, rows[known], self._value_words[dimension][codes.to_numpy()[known].astype(np.int64)])
+        return words
+    
+    def route_frame(self, reports):
+        """
+        Route a whole DataFrame of reports at once
+        
+        Args:
+            reports (pd.DataFrame): One report per row, with the form data columns
+                ("Systems" or "Implicated Systems", "Experienced Harm Types",
+                "Severity", "Report Types"); missing columns count as empty
+        
+        Returns:
+            pd.DataFrame: One row per (report, recipient) with columns report (the
+            index label of the report), rule, name, type, contact and reason, in
+            report order and then the order route would return
+        """
+        count = len(reports)
+        
+        def pairs(column):
+            if column not in reports:
+                return np.empty(0, dtype=np.int64), []
+            lists = reports[column].map(_as_list)
+            lengths = lists.map(len).to_numpy(dtype=np.int64)
+            return np.repeat(np.arange(count), lengths), list(chain.from_iterable(lists))
+        
+        # Systems -> organizations, resolving each distinct system once
+        if "Implicated Systems" in reports:
+            systems = reports["Implicated Systems"].where(reports["Implicated Systems"].notna(),
+                                                          reports.get("Systems"))
+        else:
+            systems = reports.get("Systems", pd.Series([None] * count, index=reports.index))
+        lists = systems.map(_as_list)
+        system_rows = np.repeat(np.arange(count), lists.map(len).to_numpy(dtype=np.int64))
+        system_values = pd.Series(list(chain.from_iterable(lists)), dtype=object)
+        vendors = {system: self.resolver.resolve(system) for system in system_values.unique()
+                   if isinstance(system, str)}
+        organizations = pd.DataFrame({
+            "row": system_rows,
+            "organization": system_values.map(lambda s: vendors[s]["organization"] if s in vendors else None),
+            "disclosure": system_values.map(lambda s: vendors[s]["disclosure"] if s in vendors else None),
+        }).dropna(subset=["organization"]).drop_duplicates(["row", "organization"])
+        org_rows = organizations["row"].to_numpy(dtype=np.int64)
+        
+        matched = np.full((count, self._words), np.uint64(0xFFFFFFFFFFFFFFFF), dtype=np.uint64)
+        matched &= self._dimension_words("organizations", org_rows, organizations["organization"].tolist(), count)
+        for dimension in ("harm_types", "severities", "report_types"):
+            rows, values = pairs(DIMENSIONS[dimension])
+            matched &= self._dimension_words(dimension, rows, values, count)
+        
+        frames = []
+        for bit, rule in enumerate(self.rules):
+            word, shift = divmod(bit, 64)
+            hit = ((matched[:, word] >> np.uint64(shift)) & np.uint64(1)).astype(bool)
+            if rule.get("for_each") == "organization":
+                selected = organizations[hit[org_rows] & organizations["disclosure"].notna().to_numpy()]
+                accepted = (rule.get("when") or {}).get("organizations")
+                if accepted:
+                    selected = selected[selected["organization"].isin(accepted)]
+                expanded = {organization: self._expand(rule, [(organization, disclosure)])[0]
+                            for organization, disclosure in selected[["organization", "disclosure"]]
+                            .drop_duplicates("organization").itertuples(index=False)}
+                frame = pd.DataFrame({"row": selected["row"].to_numpy(), "rule": bit})
+                for field in RECIPIENT_FIELDS:
+                    frame[field] = selected["organization"].map(lambda o: expanded[o][field]).to_numpy()
+            else:
+                frame = pd.DataFrame({"row": np.nonzero(hit)[0], "rule": bit})
+                for field in RECIPIENT_FIELDS:
+                    frame[field] = rule["recipient"].get(field)
+            frames.append(frame)
+        
+        columns = ["report", "rule", *RECIPIENT_FIELDS]
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        routed = pd.concat(frames, ignore_index=True)
+        routed = routed.sort_values(["row", "rule"], kind="stable")
+        routed = routed.drop_duplicates(["row", "name", "type", "contact"])
+        routed["rule"] = [self.rules[bit].get("id", bit) for bit in routed["rule"]]
+        routed.insert(0, "report", reports.index[routed["row"].to_numpy()])
+        return routed[columns].reset_index(drop=True)
+
+_routers = {}
+_routers_lock = threading.Lock()
+
+def get_recipient_router(rules_path=None):
+    """
+    Return the shared router for a rules file, recompiled when the file or the knowledge base changes
+    
+    Args:
+        rules_path (str, optional): Rules file (default: $AIFR_RECIPIENT_RULES or RULES_PATH)
+    
+    Returns:
+        RecipientRouter: The compiled router
+    """
+    path = str(rules_path or os.environ.get("AIFR_RECIPIENT_RULES") or RULES_PATH)
+    resolver = get_org_resolver()
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        mtime = None
+    
+    with _routers_lock:
+        cached = _routers.get(path)
+        if cached is None or cached[0] != mtime or cached[1].resolver is not resolver:
+            try:
+                cached = _routers[path] = (mtime, RecipientRouter(load_routing_rules(path), resolver))
+            except (OSError, ValueError) as e:
+                if cached is None:
+                    raise
+                # Keep routing with the last good rules while the file is being fixed
+                logger.warning("Could not reload routing rules from %s: %s", path, e)
+        return cached[1]
+
 def determine_report_recipients(form_data):
-    """Determine appropriate recipients for the report based on form data"""
-    recipients = []
-    seen_recipients = set()
-    
-    systems = form_data.get("Implicated Systems", form_data.get("Systems", []))
-    
-    for system in systems:
-        recipient_info = None
-        
-        if "OpenAI" in system or "GPT" in system:
-            recipient_info = ("OpenAI", "Developer", "https://openai.com/security/vulnerability-reporting")
-        elif "Anthropic" in system or "Claude" in system:
-            recipient_info = ("Anthropic", "Developer", "https://www.anthropic.com/security")
-        elif "Google" in system or "Gemini" in system or "Bard" in system:
-            recipient_info = ("Google", "Developer", "https://bughunters.google.com/")
-        elif "Meta" in system or "Llama" in system:
-            recipient_info = ("Meta", "Developer", "https://www.facebook.com/whitehat")
-        
-        if recipient_info and recipient_info not in seen_recipients:
-            name, recipient_type, contact = recipient_info
-            recipients.append(ReportRecipient(
-                name=name,
-                recipient_type=recipient_type,
-                contact=contact,
-                reason="This AI developer was selected as an affected system"
-            ))
-            seen_recipients.add(recipient_info)
-    
-    if "Child sexual-abuse material (CSAM)" in form_data.get("Experienced Harm Types", []):
-        recipients.append(ReportRecipient(
-            name="National Center for Missing & Exploited Children (NCMEC)",
-            recipient_type="Authority",
-            contact="https://report.cybertip.org/",
-            reason="This authority should be notified for incidents involving CSAM"
-        ))
-        recipients.append(ReportRecipient(
-            name="Internet Watch Foundation (IWF)",
-            recipient_type="Authority",
-            contact="https://report.iwf.org.uk/",
-            reason="This international authority handles reports of CSAM"
-        ))
-    
-    if form_data.get("Severity") in ["Critical", "High"]:
-        if "Security Incident Report" in form_data.get("Report Types", []):
-            recipients.append(ReportRecipient(
-                name="CERT Coordination Center",
-                recipient_type="Authority",
-                contact="https://www.kb.cert.org/vuls/report/",
-                reason="This authority should be notified of high-severity security incidents"
-            ))
-            recipients.append(ReportRecipient(
-                name="CISA",
-                recipient_type="Authority",
-                contact="https://www.cisa.gov/report",
-                reason="U.S. Cybersecurity & Infrastructure Security Agency handles critical security incidents"
-            ))
-    
-    if "Real-World Incidents" in form_data.get("Report Types", []):
-        recipients.append(ReportRecipient(
-            name="AI Incident Database",
-            recipient_type="Database",
-            contact="https://incidentdatabase.ai/submit",
-            reason="This database catalogs real-world AI incidents for research purposes"
-        ))
-    
-    return recipients
+    """Determine appropriate recipients for the report based on form data (see recipient_rules.json)"""
+    return get_recipient_router().route(form_data)
 
 def display_submission_table(recipients):
     """Display submission options in a table format with checkboxes"""
@@ -167,7 +436,7 @@ def display_submission_table(recipients):
                 plural_type = f"{recipient_type}es"
             else:
                 plural_type = f"{recipient_type}s"
-                
+            
             st.write(f"**{plural_type}:**")
             
             for i, recipient in enumerate(recipients_list):
@@ -194,5 +463,26 @@ def display_submission_table(recipients):
                 cols[2].write(recipient.reason if hasattr(recipient, 'reason') and recipient.reason else "Relevant to your report type")
                 
                 cols[3].checkbox("", value=st.session_state[checkbox_key], key=checkbox_key)
-                
-            st.markdown("---")
\ No newline at end of file
+            
+            st.markdown("---")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Route stored or exported reports to recipients in bulk")
+    parser.add_argument("source", help='JSON, JSONL/NDJSON or Parquet file, a directory of report JSON files, '
+                                       'or "-" for JSONL on stdin')
+    parser.add_argument("-o", "--output", default="-", help="CSV file to write (default: stdout)")
+    parser.add_argument("--rules", default=None, help="Routing rules file (default: the bundled rules)")
+    args = parser.parse_args(argv)
+    
+    from form.data.batch_jsonld import iter_form_records
+    
+    reports = pd.DataFrame.from_records(list(iter_form_records(args.source)))
+    routed = get_recipient_router(args.rules).route_frame(reports)
+    if "Report ID" in reports:
+        routed.insert(0, "report_id", reports["Report ID"].reindex(routed["report"]).to_numpy())
+    routed.to_csv(sys.stdout if args.output == "-" else args.output, index=False)
+    print(f"Routed {len(reports)} reports to {len(routed)} recipients", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+import os
+import io
+import sys
+import json
+import gzip
+import argparse
+from form.utils.hashing import content_hash, fill_rdf_hash, VOLATILE_FIELDS
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+FORMATS = ["ndjson", "jsonld"]
+COMPRESSIONS = ["none", "gzip", "zstd"]
+
+def infer_compression(path):
+    """Pick the compression from the output file extension"""
+    if path.endswith(".gz"):
+        return "gzip"
+    if path.endswith(".zst"):
+        return "zstd"
+    return "none"
+
+def open_export_file(path, mode, compression="none"):
+    """
+    Open an export file as text, compressing or decompressing on the fly
+    
+    Args:
+        path (str): Path of the export file
+        mode (str): "r", "w" or "a"; appending to a compressed file adds a new
+            gzip member or zstd frame, which readers decode as one stream
+        compression (str): One of COMPRESSIONS
+    
+    Returns:
+        file: A text file object
+    """
+    if compression == "gzip":
+        return gzip.open(path, f"{mode}t", encoding="utf-8")
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd compression requires the zstandard package (pip install zstandard)")
+        return zstandard.open(path, f"{mode}t", encoding="utf-8")
+    if compression != "none":
+        raise ValueError(f"Unknown compression: {compression}")
+    return open(path, mode, encoding="utf-8")
+
+def scan_export(path, compression="none"):
+    """
+    Find the report ID of the last complete record of an NDJSON export
+    
+    The stream is read line by line, so this works on exports of any size.
+    
+    Args:
+        path (str): Path of the export file
+        compression (str): One of COMPRESSIONS
+    
+    Returns:
+        tuple: (last report ID or None, True if the file ends on a complete record)
+    """
+    if not os.path.exists(path):
+        return None, True
+    
+    last_id = None
+    try:
+        with open_export_file(path, "r", compression) as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    return last_id, False
+                try:
+                    last_id = json.loads(line)["report_id"]
+                except (ValueError, KeyError, TypeError):
+                    return last_id, False
+    except (EOFError, OSError):
+        # A compressed stream cut short by an interrupted run
+        return last_id, False
+    return last_id, True
+
+def _drop_partial_line(path):
+    """Truncate an uncompressed export after its last complete line"""
+    with open(path, "rb+") as f:
+        f.seek(0, io.SEEK_END)
+        size = f.tell()
+        position = size
+        while position > 0:
+            step = min(65536, position)
+            f.seek(position - step)
+            chunk = f.read(step)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                f.truncate(position - step + newline + 1)
+                return
+            position -= step
+        f.truncate(0)
+
+def _jsonld_node(report_data):
+    """Get the JSON-LD document of a stored report as a dict, or None if it has none"""
+    machine_readable = report_data.get("machine_readable")
+    if not machine_readable:
+        return None
+    if isinstance(machine_readable, str):
+        machine_readable = json.loads(machine_readable)
+    return machine_readable
+
+class ReportExporter:
+    """
+    Stream every report of a storage provider to an NDJSON or JSON-LD file
+    
+    Reports are pulled from StorageProvider.iter_reports one batch at a time
+    and written as they arrive, so memory use stays flat however large the
+    store is. NDJSON exports can be resumed: records are ordered by report
+    ID, and a resumed run continues after the last complete line.
+    
+    NDJSON lines hold {"report_id", "timestamp", "content_hash", "rdf_hash",
+    "form_data", "machine_readable"}.
+    JSON-LD exports are a single {"@context": ..., "@graph": [...]} document
+    whose context is taken from the first report; reports with a different
+    context keep their own.
+    """
+    
+    def __init__(self, provider, output_path, format="ndjson", compression=None, batch_size=500):
+        """
+        Args:
+            provider (StorageProvider): Provider to read reports from
+            output_path (str): Path of the export file
+            format (str): One of FORMATS
+            compression (str, optional): One of COMPRESSIONS (default: from the file extension)
+            batch_size (int): Number of reports read from the provider at a time
+        """
+        if format not in FORMATS:
+            raise ValueError(f"Unknown export format: {format}")
+        
+        self.provider = provider
+        self.output_path = output_path
+        self.format = format
+        self.compression = compression or infer_compression(output_path)
+        self.batch_size = batch_size
+        self.exported = 0
+        self.skipped = 0
+        self.last_report_id = None
+    
+    def export(self, after_report_id=None, resume=False, progress=None):
+        """
+        Write the export file
+        
+        Args:
+            after_report_id (str, optional): Only export reports with a greater report ID
+            resume (bool): Append to an existing NDJSON export after its last record
+            progress (callable, optional): Called with the number of exported reports
+                after every batch_size reports
+        
+        Returns:
+            int: Number of reports written
+        """
+        mode = "w"
+        if resume:
+            if self.format != "ndjson":
+                raise ValueError("Only NDJSON exports can be resumed")
+            
+            last_id, complete = scan_export(self.output_path, self.compression)
+            if not complete and self.compression != "none":
+                raise ValueError(
+                    f"{self.output_path} ends in a truncated {self.compression} stream; "
+                    f"export into a new file with --after {last_id}"
+                )
+            if last_id is not None:
+                if not complete:
+                    _drop_partial_line(self.output_path)
+                after_report_id = max(after_report_id or "", last_id)
+                mode = "a"
+            elif os.path.exists(self.output_path) and os.path.getsize(self.output_path):
+                raise ValueError(f"Cannot resume {self.output_path}: no complete record found")
+        
+        reports = self.provider.iter_reports(after_report_id=after_report_id, batch_size=self.batch_size)
+        with open_export_file(self.output_path, mode, self.compression) as f:
+            if self.format == "ndjson":
+                self._write_ndjson(f, reports, progress)
+            else:
+                self._write_jsonld(f, reports, progress)
+        
+        return self.exported
+    
+    def _record_progress(self, report_id, progress):
+        self.exported += 1
+        self.last_report_id = report_id
+        if progress and self.exported % self.batch_size == 0:
+            progress(self.exported)
+    
+    def _write_ndjson(self, f, reports, progress):
+        for report_id, report_data in reports:
+            record = {
+                "report_id": report_id,
+                "timestamp": report_data.get("timestamp"),
+                "content_hash": report_data.get("content_hash")
+                or content_hash(report_data.get("form_data") or {}, exclude=VOLATILE_FIELDS),
+                # Reports saved since submits stopped hashing inline get their rdf_hash here
+                "rdf_hash": fill_rdf_hash(report_data).get("rdf_hash"),
+                "form_data": report_data.get("form_data"),
+                "machine_readable": report_data.get("machine_readable")
+            }
+            try:
+                record["machine_readable"] = _jsonld_node(report_data)
+            except ValueError:
+                # Keep a stored document that is not valid JSON as it is
+                pass
+            f.write(json.dumps(record, default=str) + "\n")
+            self._record_progress(report_id, progress)
+    
+    def _write_jsonld(self, f, reports, progress):
+        context = None
+        for report_id, report_data in reports:
+            try:
+                node = _jsonld_node(report_data)
+            except ValueError:
+                node = None
+            if node is None:
+                self.skipped += 1
+                continue
+            
+            if self.exported == 0:
+                context = node.get("@context")
+                f.write('{"@context": ' + json.dumps(context) + ', "@graph": [\n')
+            else:
+                f.write(",\n")
+            
+            if node.get("@context") == context:
+                node = {k: v for k, v in node.items() if k != "@context"}
+            f.write(json.dumps(node, default=str))
+            self._record_progress(report_id, progress)
+        
+        if self.exported == 0:
+            f.write('{"@graph": []}\n')
+        else:
+            f.write("\n]}\n")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export stored AI flaw reports as NDJSON or a JSON-LD @graph")
+    parser.add_argument("output", help="Export file; a .gz or .zst extension selects compression")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("-c", "--compression", choices=COMPRESSIONS, default=None,
+                        help="Output compression (default: from the file extension)")
+    parser.add_argument("--after", default=None, help="Only export reports with a greater report ID")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted NDJSON export")
+    parser.add_argument("--batch-size", type=int, default=500, help="Reports read from storage at a time")
+    args = parser.parse_args(argv)
+    
+    from storage.storage_interface import get_storage_provider
+    
+    exporter = ReportExporter(get_storage_provider(), args.output, args.format, args.compression, args.batch_size)
+    exporter.export(
+        after_report_id=args.after,
+        resume=args.resume,
+        progress=lambda count: print(f"{count} reports exported", file=sys.stderr)
+    )
+    
+    print(f"Exported {exporter.exported} reports to {args.output}"
+          f"{f' ({exporter.skipped} without JSON-LD skipped)' if exporter.skipped else ''}"
+          f"{f', last report ID {exporter.last_report_id}' if exporter.last_report_id else ''}",
+          file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,43 @@
 import os
 import json
 import io
-import tempfile
+import uuid
+import time
+import hashlib
+import random
+import threading
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import streamlit as st
 import pandas as pd
-from huggingface_hub import HfApi, create_repo, hf_hub_download, list_repo_files
+from huggingface_hub import HfApi, CommitOperationAdd, CommitOperationDelete, create_repo, hf_hub_download
+from huggingface_hub.hf_api import RepoFile
+from huggingface_hub.utils import EntryNotFoundError, HfHubHTTPError
 from storage.storage_interface import StorageProvider
+from storage.spool import get_report_spool
+from storage.query_engine import build_report_row, get_query_engine
+from storage.read_cache import get_read_cache
+from form.utils.hashing import report_hashes, fill_rdf_hash
+
+def _is_stale_parent_error(error):
+    """Check whether a commit was rejected because its parent commit is no longer HEAD"""
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) in (409, 412)
+
+def _git_blob_id(data):
+    """Compute the git object ID of file contents, as reported by the Hub for non-LFS files"""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+def _latest_rows(df):
+    """Keep only the most recent row for each report ID"""
+    df = df.sort_values("submission_timestamp", kind="stable")
+    return df.drop_duplicates(subset="report_id", keep="last").reset_index(drop=True)
 
 class HuggingFaceStorageProvider(StorageProvider):
     """
     A storage provider that works directly with Hugging Face Hub API
-    (without using the datasets library or local caching)
+    (without using the datasets library), reading through a local cache
+    keyed by commit SHA
     """
     
     def __init__(self, hf_token=None, repo_id=None):
@@ -21,6 +47,29 @@ class HuggingFaceStorageProvider(StorageProvider):
         self.initialized = False
         self.api = None
         self.parquet_file = "reports.parquet"
+        self.manifest_file = "reports_manifest.json"
+        self.shard_root = "reports"
+        self.compaction_threshold = 32
+        self.max_commit_attempts = 5
+        self.retry_base_delay = 0.5
+        self.retry_max_delay = 8.0
+        self.max_fetch_workers = 16
+        self.fetch_errors = 0
+        # Whether the pre-shard reports.parquet exists; nothing writes it anymore, so
+        # the answer never changes once known
+        self._legacy_parquet_exists = None
+        self.healthy = None
+        self.last_health_check = None
+        self.health_error = None
+        self._health_monitor = None
+        self.commit_stats = {"commits": 0, "conflicts": 0, "retries": 0, "exhausted": 0}
+        self._stats_lock = threading.Lock()
+        self.spool = get_report_spool("huggingface")
+        self.read_cache = get_read_cache(self.repo_id)
+        
+        # Replay submissions left in the spool by a previous process
+        if len(self.spool):
+            self._start_flusher()
     
     def _get_token(self):
         """Get HF token from environment variables, secrets, or a fallback method"""
@@ -36,7 +85,7 @@ class HuggingFaceStorageProvider(StorageProvider):
                     token = st.secrets[secret_name]
                     # st.sidebar.success(f"Successfully loaded HF token from Streamlit secrets using key '{secret_name}'")
                     return token
-            
+        
         if os.getenv("SPACE_ID"):
             token = os.getenv("HF_TOKEN_READ")
             if token:
@@ -61,8 +110,8 @@ class HuggingFaceStorageProvider(StorageProvider):
                     repo_id = st.secrets[secret_name]
                     # st.sidebar.success(f"Successfully loaded repo ID from Streamlit secrets using key '{secret_name}': {repo_id}")
                     return repo_id
-
-            
+        
+        
         if os.getenv("SPACE_ID"):
             space_id = os.getenv("SPACE_ID")
             if space_id:
@@ -112,13 +161,65 @@ class HuggingFaceStorageProvider(StorageProvider):
             
             self.initialized = True
             return True
-            
+        
         except Exception as e:
             # st.sidebar.error(f"Error initializing Hugging Face provider: {str(e)}")
             return False
     
+    def check_health(self):
+        """
+        Check that the repository is reachable and refresh the cached HEAD commit
+        
+        Returns:
+            bool: True if the repository is reachable
+        """
+        try:
+            if not self.ensure_initialized(force=True):
+                raise RuntimeError("Hugging Face storage provider is not initialized")
+            
+            self._get_head_revision(force=True)
+            self.healthy = True
+            self.health_error = None
+        except Exception as e:
+            self.healthy = False
+            self.health_error = str(e)
+        
+        self.last_health_check = datetime.now().isoformat()
+        return self.healthy
+    
+    def start_health_monitor(self, interval=300.0):
+        """
+        Start a background thread that initializes the provider and re-checks its health
+        
+        Initialization happens off the request path, so the first page render
+        does not wait for the Hub.
+        
+        Args:
+            interval (float): Seconds between health checks
+        """
+        if self._health_monitor and self._health_monitor.is_alive():
+            return
+        
+        def monitor():
+            while True:
+                self.check_health()
+                time.sleep(interval)
+        
+        self._health_monitor = threading.Thread(target=monitor, name="hf-storage-health", daemon=True)
+        self._health_monitor.start()
+    
     def save_report(self, form_data):
-        """Save a report to the Hugging Face repository"""
+        """
+        Save a report to the Hugging Face repository
+        
+        The report is appended to the durable local spool and this returns as
+        soon as it is fsynced. A background flusher publishes spooled reports to
+        the repository in batches, retrying until the Hub is reachable.
+        
+        Returns:
+            tuple: ("spool:report_<id>" while the report is queued, or
+                   "session_state:<key>" if it could not be spooled, machine_readable_output)
+        """
         # Generate a report ID if not provided
         report_id = form_data.get("Report ID")
         if not report_id:
@@ -127,67 +228,28 @@ class HuggingFaceStorageProvider(StorageProvider):
         
         # st.sidebar.info(f"Attempting to save report with ID: {report_id}")
         
-        if not self.initialized:
-            # st.sidebar.warning("Storage provider not initialized. Initializing now...")
-            if not self.initialize():
-                # Store in session state as fallback
-                session_key = f"report_{report_id}"
-                st.session_state[session_key] = {
-                    "form_data": form_data,
-                    "timestamp": datetime.now().isoformat()
-                }
-                # st.sidebar.warning(f"Fallback: Report stored in session state due to initialization failure.")
-                return f"session_state:{session_key}", None
-        
+        # Generate machine readable output
+        machine_readable_output = None
         try:
-            # Generate machine readable output
-            machine_readable_output = None
             from form.data.schema import generate_machine_readable_output
             machine_readable_output = generate_machine_readable_output(form_data)
             
             report_data = {
                 "form_data": form_data,
                 "machine_readable": machine_readable_output,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": datetime.now().isoformat(),
+                # The rdf_hash is computed by the flusher, off the request path
+                **report_hashes(form_data)
             }
             
-            report_json = json.dumps(report_data, indent=2)
+            self.spool.append(report_id, report_data)
+            self._start_flusher()
             
-            report_path = f"reports/{report_id}.json"
-            
-            files = list_repo_files(
-                    repo_id=self.repo_id,
-                    repo_type="dataset",
-                    token=self.hf_token
-                )
-                
-            if not any(f.startswith("reports/") for f in files):
-                    self.api.upload_file(
-                        path_or_fileobj=io.BytesIO(b""),
-                        path_in_repo="reports/.gitkeep",
-                        repo_id=self.repo_id,
-                        repo_type="dataset",
-                        commit_message="Create reports directory"
-                    )
-                    # st.sidebar.info("Created reports directory in repository")
-            
-            self.api.upload_file(
-                path_or_fileobj=io.BytesIO(report_json.encode()),
-                path_in_repo=report_path,
-                repo_id=self.repo_id,
-                repo_type="dataset",
-                commit_message=f"Add/update report {report_id}"
-            )
-            
-            # st.sidebar.success(f"Successfully saved JSON report to {self.repo_id}/{report_path}")
-            
-            self._update_index_file(report_id, form_data)
-            
-            self._update_parquet_file(report_id, form_data, machine_readable_output)
-
-            
-            return f"huggingface:{self.repo_id}/{report_path}", machine_readable_output
+            # st.sidebar.success(f"Report {report_id} queued for {self.repo_id}")
             
+            # The report only reaches reports/{report_id}.json once the flusher has published it
+            return f"spool:report_{report_id}", machine_readable_output
+        
         except Exception as e:
             # st.sidebar.error(f"Error saving report to Hugging Face: {str(e)}")
             
@@ -202,128 +264,465 @@ class HuggingFaceStorageProvider(StorageProvider):
             
             return f"session_state:{session_key}", machine_readable_output
     
-    def _update_index_file(self, report_id, form_data):
-        """Update the index file with the new report information"""
-        index_path = "reports_index.json"
+    def _start_flusher(self):
+        """Start draining the spool to the repository in the background"""
+        return self.spool.start_flusher(self._publish_spooled_reports)
+    
+    def _publish_spooled_reports(self, entries):
+        """
+        Publish a batch of spooled reports as a single commit
+        
+        Args:
+            entries (list): Spool records to publish
+        
+        Raises:
+            RuntimeError: If the provider cannot be initialized yet
+        """
+        if not self.ensure_initialized():
+            raise RuntimeError("Hugging Face storage provider is not available")
+        
+        # Only the latest version of a report re-submitted within one batch is published
+        reports = {}
+        for entry in entries:
+            reports[entry["report_id"]] = fill_rdf_hash(entry["report"])
         
-        index_data = []
-        existing_index = hf_hub_download(
+        self._commit_reports(list(reports.items()))
+    
+    def _commit_reports(self, reports):
+        """
+        Publish report artifacts as one commit using optimistic concurrency
+        
+        The manifest is read at a pinned HEAD revision and the commit
+        is created with that revision as its parent. If another session commits
+        in between, the Hub rejects the commit as stale; the artifacts are then
+        rebuilt on top of the new HEAD and the commit is retried with bounded
+        exponential backoff.
+        
+        Args:
+            reports (list): (report_id, report_data) pairs to publish
+        """
+        if len(reports) == 1:
+            commit_message = f"Add/update report {reports[0][0]}"
+        else:
+            commit_message = f"Add/update {len(reports)} reports"
+        
+        for attempt in range(self.max_commit_attempts):
+            # Trust the cached HEAD on the first attempt; a stale one just causes a retry
+            parent_commit = self._get_head_revision(force=attempt > 0)
+            
+            # Build every artifact in memory and publish them as one commit so the
+            # reports and the Parquet shards can never drift apart. Report summaries
+            # are read from the shards, so no repository-wide index is rewritten here
+            operations = [
+                CommitOperationAdd(
+                    path_in_repo=f"reports/{report_id}.json",
+                    path_or_fileobj=json.dumps(report_data, indent=2).encode()
+                )
+                for report_id, report_data in reports
+            ]
+            operations.extend(self._build_parquet_operations(reports, parent_commit))
+            
+            try:
+                commit_info = self.api.create_commit(
                     repo_id=self.repo_id,
-                    filename=index_path,
                     repo_type="dataset",
-                    token=self.hf_token
+                    operations=operations,
+                    commit_message=commit_message,
+                    parent_commit=parent_commit
                 )
+                self._record_commit_stat("commits")
+                self._cache_committed_files(commit_info.oid, operations)
+                return
+            except HfHubHTTPError as e:
+                if not _is_stale_parent_error(e):
+                    raise
                 
-        with open(existing_index, "r") as f:
-                    index_data = json.load(f)
+                self._record_commit_stat("conflicts")
+                if attempt == self.max_commit_attempts - 1:
+                    self._record_commit_stat("exhausted")
+                    raise
                 
-                # st.sidebar.info(f"Downloaded existing index with {len(index_data)} reports")
+                # st.sidebar.info(f"Commit was stale, retrying")
+                self._record_commit_stat("retries")
+                time.sleep(self._retry_delay(attempt))
+    
+    def _get_head_revision(self, force=False):
+        """
+        Get the commit SHA currently at HEAD of the dataset repository
+        
+        The HEAD is revalidated against the Hub at most once per cache TTL
+        unless force is set.
+        """
+        return self.read_cache.head(
+            lambda: self.api.repo_info(repo_id=self.repo_id, repo_type="dataset").sha,
+            force=force
+        )
+    
+    def _download(self, path, revision=None, blob_id=None):
+        """
+        Get a local copy of a repository file through the read cache
+        
+        Args:
+            path (str): Path of the file in the repository
+            revision (str, optional): Commit SHA to read at (default: HEAD)
+            blob_id (str, optional): Hash of the file's contents, so unchanged files
+                are shared across commits instead of downloaded again
+        
+        Returns:
+            str: Local path of the file
+        """
+        return self.read_cache.get(revision or self._get_head_revision(), path, self._download_to, blob_id)
+    
+    def _download_to(self, revision, path, local_dir):
+        """Download a file at a commit into local_dir"""
+        return hf_hub_download(
+            repo_id=self.repo_id,
+            filename=path,
+            repo_type="dataset",
+            token=self.hf_token,
+            revision=revision,
+            local_dir=local_dir
+        )
+    
+    def _cache_committed_files(self, revision, operations):
+        """
+        Write the files we just committed through to the read cache
+        
+        Shards are keyed by the SHA-256 recorded in the manifest and report
+        files by their git object ID, matching what readers look them up by.
+        """
+        self.read_cache.set_head(revision)
+        for operation in operations:
+            if isinstance(operation, CommitOperationAdd) and isinstance(operation.path_or_fileobj, bytes):
+                data = operation.path_or_fileobj
+                if operation.path_in_repo.endswith(".parquet"):
+                    blob_id = hashlib.sha256(data).hexdigest()
+                elif operation.path_in_repo != self.manifest_file:
+                    blob_id = _git_blob_id(data)
+                else:
+                    blob_id = None
+                self.read_cache.put(revision, operation.path_in_repo, data, blob_id)
+    
+    def _retry_delay(self, attempt):
+        """Exponential backoff with full jitter for commit retries"""
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * (2 ** attempt)))
+    
+    def _record_commit_stat(self, name):
+        """Increment one of the commit counters"""
+        with self._stats_lock:
+            self.commit_stats[name] += 1
+    
+    def get_commit_stats(self):
+        """
+        Get counters describing commit activity
+        
+        Returns:
+            dict: Number of successful commits, stale-parent conflicts,
+                  retries, attempts that gave up after exhausting retries and
+                  spooled reports that failed permanently ("dead_lettered")
+        """
+        with self._stats_lock:
+            stats = dict(self.commit_stats)
+        stats["dead_lettered"] = self.spool.dead_letter_count()
+        return stats
+    
+    def _build_parquet_operations(self, reports, revision=None):
+        """
+        Build the commit operations that append reports to the partitioned Parquet layout
+        
+        Each commit appends a small shard per partition under
+        reports/year=YYYY/month=MM/ and registers it in the manifest. Once a
+        partition accumulates enough small shards they are merged, together
+        with the partition's compacted shard, into a new compacted shard in the
+        same commit. A partition therefore never holds more than one compacted
+        shard and compaction_threshold - 1 small ones, and a compaction only
+        rewrites one month of reports.
+        
+        Args:
+            reports (list): (report_id, report_data) pairs being published
+            revision (str, optional): Commit SHA to read the manifest and shards at
+        
+        Returns:
+            list: Commit operations for the new shards, compaction and manifest
+        """
+        manifest = self._load_manifest(revision)
+        
+        operations = []
+        now = datetime.now()
+        for partition, rows in self._partition_rows(reports).items():
+            new_df = pd.DataFrame(rows)
+            # st.sidebar.info(f"Prepared new Parquet shard with {len(rows)} reports")
+            
+            partition_shards = [shard for shard in manifest["shards"] if shard.get("partition") == partition]
+            small_shards = [shard for shard in partition_shards if not shard.get("compacted")]
+            
+            if len(small_shards) + 1 >= self.compaction_threshold:
+                # Compacted shards come first so the newer small shards win ties in _latest_rows
+                merged_shards = sorted(partition_shards, key=lambda shard: not shard.get("compacted"))
+                frames = [self._read_parquet_shard(shard, revision) for shard in merged_shards]
+                shard_df = _latest_rows(pd.concat([*frames, new_df], ignore_index=True))
+                shard_prefix = "compacted"
+                
+                for shard in merged_shards:
+                    operations.append(CommitOperationDelete(path_in_repo=shard["path"]))
+                merged_paths = {shard["path"] for shard in merged_shards}
+                manifest["shards"] = [s for s in manifest["shards"] if s["path"] not in merged_paths]
+                # st.sidebar.info(f"Compacting {len(merged_shards)} shards in {partition}")
+            else:
+                shard_df = new_df
+                shard_prefix = "part"
+            
+            operations.append(self._add_shard(manifest, partition, shard_df, shard_prefix == "compacted", now))
+        
+        manifest["updated_at"] = now.isoformat()
+        operations.append(CommitOperationAdd(
+            path_in_repo=self.manifest_file,
+            path_or_fileobj=json.dumps(manifest, indent=2).encode()
+        ))
+        
+        return operations
+    
+    def _partition_rows(self, reports):
+        """
+        Group the Parquet rows of reports by their year/month partition
+        
+        Args:
+            reports (list): (report_id, report_data) pairs
+        
+        Returns:
+            dict: Partition path mapped to the list of rows it receives
+        """
+        partitions = {}
+        for report_id, report_data in reports:
+            submitted = datetime.fromisoformat(report_data["timestamp"])
+            partition = f"{self.shard_root}/year={submitted:%Y}/month={submitted:%m}"
+            partitions.setdefault(partition, []).append(self._build_parquet_row(report_id, report_data))
+        return partitions
+    
+    def _add_shard(self, manifest, partition, shard_df, compacted, now):
+        """
+        Serialize a shard and register it in the manifest
+        
+        Args:
+            manifest (dict): The manifest being built for the commit
+            partition (str): Partition path of the shard
+            shard_df (DataFrame): Rows of the shard
+            compacted (bool): Whether the shard replaces the partition's small shards
+            now (datetime): Time of the commit, used in the shard name
+        
+        Returns:
+            CommitOperationAdd: The operation that uploads the shard
+        """
+        shard_prefix = "compacted" if compacted else "part"
+        shard_path = f"{partition}/{shard_prefix}-{now:%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}.parquet"
+        buffer = io.BytesIO()
+        shard_df.to_parquet(buffer, index=False)
+        data = buffer.getvalue()
+        
+        manifest["shards"].append({
+            "path": shard_path,
+            "partition": partition,
+            "rows": len(shard_df),
+            "compacted": compacted,
+            "created_at": now.isoformat(),
+            "sha256": hashlib.sha256(data).hexdigest()
+        })
+        return CommitOperationAdd(path_in_repo=shard_path, path_or_fileobj=data)
+    
+    def _build_parquet_row(self, report_id, report_data):
+        """Build the Parquet row stored for a report"""
+        return build_report_row(report_id, report_data)
+    
+    def _load_manifest(self, revision=None):
+        """
+        Load the shard manifest, creating an empty one if it does not exist yet
+        
+        A pre-existing monolithic reports.parquet is registered as a legacy
+        shard so readers keep seeing the reports it contains. Whether that file
+        exists is only asked of the Hub once per provider.
+        
+        Args:
+            revision (str, optional): Commit SHA to read the manifest at
+        
+        Returns:
+            dict: The manifest with a "shards" list
+        """
+        try:
+            downloaded_manifest = self._download(self.manifest_file, revision)
             
-        index_data = [r for r in index_data if r.get("report_id") != report_id]
+            with open(downloaded_manifest, "r") as f:
+                return json.load(f)
+        except EntryNotFoundError:
+            # st.sidebar.info("No shard manifest found, creating new one")
+            manifest = {"version": 1, "shards": []}
             
-        index_data.append({
-                "report_id": report_id,
-                "report_status": form_data.get("Report Status", "Unknown"),
-                "report_types": form_data.get("Report Types", []),
-                "reporter_id": form_data.get("Reporter ID", "Anonymous"),
-                "submission_timestamp": datetime.now().isoformat(),
-                "file_path": f"reports/{report_id}.json"
-            })
+            if self._legacy_parquet_exists is None:
+                self._legacy_parquet_exists = self.api.file_exists(
+                    repo_id=self.repo_id, filename=self.parquet_file, repo_type="dataset", revision=revision
+                )
             
-            # Sort by newest first
-        index_data.sort(key=lambda x: x.get("submission_timestamp", ""), reverse=True)
+            if self._legacy_parquet_exists:
+                manifest["shards"].append({
+                    "path": self.parquet_file,
+                    "partition": None,
+                    "rows": None,
+                    "compacted": True,
+                    "legacy": True
+                })
             
-        index_json = json.dumps(index_data, indent=2)
-        self.api.upload_file(
-                path_or_fileobj=io.BytesIO(index_json.encode()),
-                path_in_repo=index_path,
+            return manifest
+    
+    def _download_parquet_shard(self, shard, revision=None):
+        """Download the Parquet shard of a manifest entry and return its local path"""
+        # Shards written before the manifest recorded hashes are cached per commit
+        return self._download(shard["path"], revision, shard.get("sha256"))
+    
+    def _read_parquet_shard(self, shard, revision=None):
+        """Download and read the Parquet shard of a manifest entry"""
+        return pd.read_parquet(self._download_parquet_shard(shard, revision))
+    
+    def _read_parquet_reports(self):
+        """
+        Read every Parquet shard listed in the manifest
+        
+        Returns:
+            DataFrame: One row per report, keeping the latest version of each
+        """
+        manifest = self._load_manifest()
+        frames = [self._read_parquet_shard(shard) for shard in manifest["shards"]]
+        if not frames:
+            raise FileNotFoundError("No Parquet shards found in manifest")
+        
+        return _latest_rows(pd.concat(frames, ignore_index=True))
+    
+    def _list_report_files(self, revision=None):
+        """
+        List the report JSON files in the repository
+        
+        Returns:
+            dict: Repository path of each report file mapped to its blob ID
+        """
+        try:
+            entries = self.api.list_repo_tree(
                 repo_id=self.repo_id,
+                path_in_repo=self.shard_root,
                 repo_type="dataset",
-                commit_message=f"Update index with report {report_id}"
+                revision=revision
             )
-            
-            # st.sidebar.success(f"Updated index file with {len(index_data)} reports")
-    
-    def _update_parquet_file(self, report_id, form_data, machine_readable_output):
-        """Update the Parquet file with the new report data"""
-        try:
-            report_row = {
-                "report_id": report_id,
-                "report_status": form_data.get("Report Status", "Unknown"),
-                "report_types": json.dumps(form_data.get("Report Types", [])),
-                "reporter_id": form_data.get("Reporter ID", "Anonymous"),
-                "submission_timestamp": datetime.now().isoformat(),
-                "form_data": json.dumps(form_data),
-                "machine_readable": json.dumps(machine_readable_output) if machine_readable_output else ""
+            return {
+                entry.path: entry.lfs.sha256 if entry.lfs else entry.blob_id
+                for entry in entries
+                if isinstance(entry, RepoFile) and entry.path.endswith(".json")
             }
+        except EntryNotFoundError:
+            return {}
+    
+    def _fetch_reports(self, report_files, revision=None):
+        """
+        Download and parse report files concurrently
+        
+        Downloads run on a bounded thread pool through the read cache and
+        reports are yielded as soon as each one is parsed, in completion
+        order. Files that fail to download or parse are skipped and counted
+        in self.fetch_errors, so a partial failure still yields partial results.
+        
+        Args:
+            report_files (dict): Repository paths of report JSON files mapped to their blob IDs
+            revision (str, optional): Commit SHA to read at (default: HEAD)
+        
+        Yields:
+            tuple: (report_id, report_data)
+        """
+        revision = revision or self._get_head_revision()
+        self.fetch_errors = 0
+        
+        def fetch(file_path):
+            with open(self._download(file_path, revision, report_files[file_path]), "r") as f:
+                return json.load(f)
+        
+        with ThreadPoolExecutor(max_workers=self.max_fetch_workers) as executor:
+            futures = {executor.submit(fetch, file_path): file_path for file_path in report_files}
+            for future in as_completed(futures):
+                file_path = futures[future]
+                try:
+                    report_data = future.result()
+                except Exception as e:
+                    # st.sidebar.warning(f"Could not read {file_path}: {str(e)}")
+                    self.fetch_errors += 1
+                    continue
+                
+                yield file_path.replace("reports/", "").replace(".json", ""), report_data
+    
+    def rebuild_index(self):
+        """
+        Rebuild the Parquet shards and manifest from the report files in the repository
+        
+        Every partition is rewritten as one compacted shard and the shards
+        listed in the previous manifest are deleted in the same commit.
+        
+        Returns:
+            int: Number of reports in the rebuilt shards
+        """
+        if not self.ensure_initialized():
+            raise RuntimeError("Hugging Face storage provider is not available")
+        
+        for attempt in range(self.max_commit_attempts):
+            parent_commit = self._get_head_revision(force=True)
             
-            new_df = pd.DataFrame([report_row])
-            # st.sidebar.info(f"Prepared new row for Parquet file for report {report_id}")
+            reports = []
+            for report_id, report_data in self._fetch_reports(self._list_report_files(parent_commit), parent_commit):
+                try:
+                    datetime.fromisoformat(report_data["timestamp"])
+                except (KeyError, TypeError, ValueError):
+                    # Without a submission time a report has no partition
+                    self.fetch_errors += 1
+                    continue
+                reports.append((report_id, fill_rdf_hash(report_data)))
+            
+            old_manifest = self._load_manifest(parent_commit)
+            operations = [CommitOperationDelete(path_in_repo=shard["path"]) for shard in old_manifest["shards"]]
+            
+            now = datetime.now()
+            manifest = {"version": 1, "shards": [], "updated_at": now.isoformat()}
+            for partition, rows in self._partition_rows(reports).items():
+                operations.append(self._add_shard(manifest, partition, _latest_rows(pd.DataFrame(rows)), True, now))
+            operations.append(CommitOperationAdd(
+                path_in_repo=self.manifest_file,
+                path_or_fileobj=json.dumps(manifest, indent=2).encode()
+            ))
             
             try:
-                with tempfile.TemporaryDirectory() as tmp_dir:
-                    parquet_path = os.path.join(tmp_dir, self.parquet_file)
-                    
-                    try:
-                        downloaded_file = hf_hub_download(
-                            repo_id=self.repo_id,
-                            filename=self.parquet_file,
-                            repo_type="dataset",
-                            token=self.hf_token,
-                            local_dir=tmp_dir,
-                            local_dir_use_symlinks=False
-                        )
-                        
-                        existing_df = pd.read_parquet(downloaded_file)
-                        # st.sidebar.success(f"Downloaded existing Parquet file with {len(existing_df)} rows")
-                        
-                        existing_df = existing_df[existing_df["report_id"] != report_id]
-                        
-                        updated_df = pd.concat([existing_df, new_df], ignore_index=True)
-                        
-                    except Exception as e:
-                        # st.sidebar.info(f"No existing Parquet file found, creating new one: {str(e)}")
-                        updated_df = new_df
-                    
-                    updated_df.to_parquet(parquet_path, index=False)
-                    
-                    with open(parquet_path, "rb") as f:
-                        self.api.upload_file(
-                            path_or_fileobj=f,
-                            path_in_repo=self.parquet_file,
-                            repo_id=self.repo_id,
-                            repo_type="dataset",
-                            commit_message=f"Update Parquet file with report {report_id}"
-                        )
-                    
-                    # st.sidebar.success(f"Updated Parquet file with {len(updated_df)} reports")
-            
-            except Exception as download_error:
-                # st.sidebar.warning(f"Error handling Parquet file: {str(download_error)}")
+                commit_info = self.api.create_commit(
+                    repo_id=self.repo_id,
+                    repo_type="dataset",
+                    operations=operations,
+                    commit_message=f"Rebuild Parquet shards with {len(reports)} reports",
+                    parent_commit=parent_commit
+                )
+                self._record_commit_stat("commits")
+                self._cache_committed_files(commit_info.oid, operations)
+                self._legacy_parquet_exists = False
+                return len(reports)
+            except HfHubHTTPError as e:
+                if not _is_stale_parent_error(e):
+                    raise
                 
-                with tempfile.TemporaryDirectory() as tmp_dir:
-                    parquet_path = os.path.join(tmp_dir, self.parquet_file)
-                    new_df.to_parquet(parquet_path, index=False)
-                    
-                    with open(parquet_path, "rb") as f:
-                        self.api.upload_file(
-                            path_or_fileobj=f,
-                            path_in_repo=self.parquet_file,
-                            repo_id=self.repo_id,
-                            repo_type="dataset",
-                            commit_message=f"Create new Parquet file with report {report_id}"
-                        )
-                    
-                    # st.sidebar.success(f"Created new Parquet file with report {report_id}")
-        
-        except Exception as e:
-            # st.sidebar.error(f"Error updating Parquet file: {str(e)}")
-            raise
+                self._record_commit_stat("conflicts")
+                if attempt == self.max_commit_attempts - 1:
+                    self._record_commit_stat("exhausted")
+                    raise
+                
+                self._record_commit_stat("retries")
+                time.sleep(self._retry_delay(attempt))
     
     def get_report(self, report_id):
         """Retrieve a report from the Hugging Face repository"""
+        spooled_report = self.spool.get(report_id)
+        if spooled_report:
+            return spooled_report
+        
         if not self.initialized:
-            if not self.initialize():
+            if not self.ensure_initialized():
                 session_key = f"report_{report_id}"
                 if session_key in st.session_state:
                     return st.session_state[session_key]
@@ -332,19 +731,14 @@ class HuggingFaceStorageProvider(StorageProvider):
         try:
             report_path = f"reports/{report_id}.json"
             
-            downloaded_file = hf_hub_download(
-                repo_id=self.repo_id,
-                filename=report_path,
-                repo_type="dataset",
-                token=self.hf_token
-            )
+            downloaded_file = self._download(report_path)
             
             with open(downloaded_file, "r") as f:
                 report_data = json.load(f)
             
             # st.sidebar.success(f"Successfully retrieved report {report_id}")
             return report_data
-            
+        
         except Exception as e:
             # st.sidebar.warning(f"Could not retrieve report from Hugging Face: {str(e)}")
             
@@ -359,175 +753,155 @@ class HuggingFaceStorageProvider(StorageProvider):
         """Update an existing report"""
         # Just use save_report since it will overwrite the existing file
         result, _ = self.save_report(form_data)
-        return result.startswith("huggingface:")
+        return result.startswith("spool:")
+    
+    def _spooled_report_summaries(self):
+        """Summaries of reports that are spooled but not yet published"""
+        summaries = {}
+        for entry in self.spool.pending():
+            report_data = entry["report"]
+            form_data = report_data.get("form_data", {})
+            
+            summaries[entry["report_id"]] = {
+                "report_id": entry["report_id"],
+                "report_status": form_data.get("Report Status", "Unknown"),
+                "report_types": form_data.get("Report Types", []),
+                "reporter_id": form_data.get("Reporter ID", "Anonymous"),
+                "submission_timestamp": report_data.get("timestamp", "Unknown")
+            }
+        return list(summaries.values())
     
     def list_reports(self, limit=100):
-        """List all reports in the repository"""
-        reports = []
+        """
+        List the newest reports in the repository
         
-        if not self.initialized:
-            if not self.initialize():
-                for key in st.session_state:
-                    if key.startswith("report_"):
-                            report_id = key.replace("report_", "")
-                            data = st.session_state[key]
-                            form_data = data.get("form_data", {})
-                            
-                            reports.append({
-                                "report_id": report_id,
-                                "report_status": form_data.get("Report Status", "Unknown"),
-                                "report_types": form_data.get("Report Types", []),
-                                "reporter_id": form_data.get("Reporter ID", "Anonymous"),
-                                "submission_timestamp": data.get("timestamp", "Unknown")
-                            })
-                
-                return reports[:limit]
+        Summaries are read by the query engine straight from the Parquet shards
+        in the manifest, together with reports still waiting in the spool.
+        Repositories without shards fall back to scanning the report files.
+        """
+        # Reports kept in session state after a failed save
+        session_reports = {}
+        for key in st.session_state:
+            if key.startswith("report_"):
+                data = st.session_state[key]
+                form_data = data.get("form_data", {})
+                session_reports[key.replace("report_", "")] = {
+                    "report_id": key.replace("report_", ""),
+                    "report_status": form_data.get("Report Status", "Unknown"),
+                    "report_types": form_data.get("Report Types", []),
+                    "reporter_id": form_data.get("Reporter ID", "Anonymous"),
+                    "submission_timestamp": data.get("timestamp", "Unknown")
+                }
         
+        reports = {}
         try:
-            try:
-                index_path = "reports_index.json"
-                
-                # Download the index
-                downloaded_index = hf_hub_download(
-                    repo_id=self.repo_id,
-                    filename=index_path,
-                    repo_type="dataset",
-                    token=self.hf_token
-                )
-                
-                with open(downloaded_index, "r") as f:
-                    reports = json.load(f)
-                
-                # st.sidebar.success(f"Retrieved {len(reports)} reports from index file")
+            if self.ensure_initialized() and not self._load_manifest()["shards"]:
+                # st.sidebar.info("Scanning repository for report files")
+                revision = self._get_head_revision()
+                for report_id, report_data in self._fetch_reports(self._list_report_files(revision), revision):
+                    form_data = report_data.get("form_data", {})
+                    reports[report_id] = {
+                        "report_id": report_id,
+                        "report_status": form_data.get("Report Status", "Unknown"),
+                        "report_types": form_data.get("Report Types", []),
+                        "reporter_id": form_data.get("Reporter ID", "Anonymous"),
+                        "submission_timestamp": report_data.get("timestamp", "Unknown")
+                    }
                 
-            except Exception as index_error:
-                # st.sidebar.info(f"Could not use index file, trying Parquet file: {str(index_error)}")
-                
-                try:
-                    with tempfile.TemporaryDirectory() as tmp_dir:
-                        try:
-                            downloaded_file = hf_hub_download(
-                                repo_id=self.repo_id,
-                                filename=self.parquet_file,
-                                repo_type="dataset",
-                                token=self.hf_token,
-                                local_dir=tmp_dir,
-                                local_dir_use_symlinks=False
-                            )
-                            
-                            df = pd.read_parquet(downloaded_file)
-                            # st.sidebar.success(f"Retrieved {len(df)} reports from Parquet file")
-                            
-                            for _, row in df.iterrows():
-                                    if isinstance(row["report_types"], str):
-                                        report_types = json.loads(row["report_types"])
-                                    else:
-                                        report_types = row["report_types"]
-                                        
-                                    reports.append({
-                                        "report_id": row["report_id"],
-                                        "report_status": row["report_status"],
-                                        "report_types": report_types,
-                                        "reporter_id": row["reporter_id"],
-                                        "submission_timestamp": row["submission_timestamp"]
-                                    })
-                            
-                        except Exception as parquet_error:
-                            # st.sidebar.info(f"Could not use Parquet file, scanning repository: {str(parquet_error)}")
-                            raise
-                        
-                except Exception:
-                    # st.sidebar.info("Scanning repository for report files")
-                    
-                    files = list_repo_files(
-                        repo_id=self.repo_id,
-                        repo_type="dataset",
-                        token=self.hf_token
-                    )
-                    
-                    report_files = [f for f in files if f.startswith("reports/") and f.endswith(".json")]
-                    
-                    # st.sidebar.info(f"Found {len(report_files)} report files in repository")
-                    
-                    for file_path in report_files[:limit]:
-                            report_id = file_path.replace("reports/", "").replace(".json", "")
-                            
-                            downloaded_file = hf_hub_download(
-                                repo_id=self.repo_id,
-                                filename=file_path,
-                                repo_type="dataset",
-                                token=self.hf_token
-                            )
-                            
-                            with open(downloaded_file, "r") as f:
-                                report_data = json.load(f)
-                            
-                            form_data = report_data.get("form_data", {})
-                            
-                            reports.append({
-                                "report_id": report_id,
-                                "report_status": form_data.get("Report Status", "Unknown"),
-                                "report_types": form_data.get("Report Types", []),
-                                "reporter_id": form_data.get("Reporter ID", "Anonymous"),
-                                "submission_timestamp": report_data.get("timestamp", "Unknown")
-                            })
-            
-            # Add any reports from session state that aren't already in the list
-            for key in st.session_state:
-                if key.startswith("report_"):
-                        report_id = key.replace("report_", "")
-                        
-                        # Skip if this report is already in the list
-                        if any(r.get("report_id") == report_id for r in reports):
-                            continue
-                            
-                        data = st.session_state[key]
-                        form_data = data.get("form_data", {})
-                        
-                        reports.append({
-                            "report_id": report_id,
-                            "report_status": form_data.get("Report Status", "Unknown"),
-                            "report_types": form_data.get("Report Types", []),
-                            "reporter_id": form_data.get("Reporter ID", "Anonymous"),
-                            "submission_timestamp": data.get("timestamp", "Unknown")
-                        })
-            
-            # Sort by newest first
-            reports.sort(key=lambda x: x.get("submission_timestamp", ""), reverse=True)
-            
-            return reports[:limit]
-            
+                # Spooled reports are newer than anything already published
+                for summary in self._spooled_report_summaries():
+                    reports[summary["report_id"]] = summary
+            else:
+                # The query engine includes spooled reports itself; ask for enough rows
+                # to fill the page even if session reports replace some of them
+                for summary in self.query_reports(limit=limit + len(session_reports))["reports"]:
+                    reports[summary["report_id"]] = summary
         except Exception as e:
             # st.sidebar.error(f"Error listing reports: {str(e)}")
-            
-            # Fall back to session state reports
-            for key in st.session_state:
-                if key.startswith("report_"):
-                        report_id = key.replace("report_", "")
-                        data = st.session_state[key]
-                        form_data = data.get("form_data", {})
-                        
-                        reports.append({
-                            "report_id": report_id,
-                            "report_status": form_data.get("Report Status", "Unknown"),
-                            "report_types": form_data.get("Report Types", []),
-                            "reporter_id": form_data.get("Reporter ID", "Anonymous"),
-                            "submission_timestamp": data.get("timestamp", "Unknown")
-                        })
-            
-            return reports[:limit]
-            
-    def query_reports(self, query):
+            for summary in self._spooled_report_summaries():
+                reports[summary["report_id"]] = summary
+        
+        for report_id, summary in session_reports.items():
+            reports.setdefault(report_id, summary)
+        
+        # Sort by newest first
+        newest_first = sorted(
+            reports.values(),
+            key=lambda r: str(r["submission_timestamp"]) if r["submission_timestamp"] not in (None, "Unknown") else "",
+            reverse=True
+        )
+        return newest_first[:limit]
+    
+    def iter_reports(self, after_report_id=None, batch_size=500):
         """
-        Query reports (simplified implementation)
+        Stream reports from the Parquet shards at the current head revision
+        
+        Shards are scanned by DuckDB in report ID order, together with reports
+        still waiting in the spool, keeping the latest version of each report.
+        """
+        if not self.ensure_initialized():
+            raise RuntimeError("Hugging Face storage is not available")
+        
+        revision = self._get_head_revision(force=True)
+        manifest = self._load_manifest(revision)
+        parquet_files = [
+            self._download_parquet_shard(shard, revision)
+            for shard in manifest["shards"]
+        ]
+        pending_rows = [build_report_row(entry["report_id"], entry["report"]) for entry in self.spool.pending()]
+        
+        rows = get_query_engine().iter_rows(
+            parquet_files=parquet_files,
+            frame=pd.DataFrame(pending_rows) if pending_rows else None,
+            columns=["report_id", "submission_timestamp", "content_hash", "rdf_hash", "form_data", "machine_readable"],
+            after_report_id=after_report_id,
+            batch_size=batch_size
+        )
+        for row in rows:
+            yield row["report_id"], {
+                "form_data": json.loads(row["form_data"]) if row["form_data"] else {},
+                "machine_readable": json.loads(row["machine_readable"]) if row["machine_readable"] else None,
+                "timestamp": row["submission_timestamp"],
+                "content_hash": row["content_hash"],
+                "rdf_hash": row["rdf_hash"]
+            }
+    
+    def query_reports(self, report_types=None, systems=None, severities=None, statuses=None,
+                      date_from=None, date_to=None, columns=None, limit=100, cursor=None):
+        """
+        Query reports with DuckDB directly over the Parquet shards
+        
+        Reports that are still waiting in the spool are included as well.
+        See StorageProvider.query_reports for the arguments.
         
-        Args:
-            query (str): Query string to filter reports
-            
         Returns:
-            list: List of reports (without filtering for now)
+            dict: {"reports": list of dicts, "next_cursor": str or None}
         """
-        # st.sidebar.warning("Direct SQL querying is not supported in the simplified implementation")
-
-        all_reports = self.list_reports(limit=1000)
-        return all_reports
\ No newline at end of file
+        parquet_files = []
+        if self.ensure_initialized():
+            try:
+                revision = self._get_head_revision()
+                manifest = self._load_manifest(revision)
+                parquet_files = [
+                    self._download_parquet_shard(shard, revision)
+                    for shard in manifest["shards"]
+                ]
+            except Exception as e:
+                # st.sidebar.warning(f"Could not read Parquet shards: {str(e)}")
+                pass
+        
+        pending_rows = [build_report_row(entry["report_id"], entry["report"]) for entry in self.spool.pending()]
+        
+        return get_query_engine().query(
+            parquet_files=parquet_files,
+            frame=pd.DataFrame(pending_rows) if pending_rows else None,
+            report_types=report_types,
+            systems=systems,
+            severities=severities,
+            statuses=statuses,
+            date_from=date_from,
+            date_to=date_to,
+            columns=columns,
+            limit=limit,
+            cursor=cursor
+        )
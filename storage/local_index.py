@@ -0,0 +1,248 @@
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from storage.query_engine import build_report_row, decode_cursor, _as_list, _as_timestamp
+
+INDEX_COLUMNS = [
+    "report_id",
+    "report_status",
+    "report_types",
+    "reporter_id",
+    "submission_timestamp",
+    "systems",
+    "severity",
+    "content_hash",
+    "rdf_hash",
+    "file_path"
+]
+
+class ReportSummaryIndex:
+    """
+    SQLite index of report summaries for the local storage provider
+    
+    Each save upserts one row holding the summary fields, so listing and
+    counting reports never has to open the report files themselves. Rows
+    are ordered by an index on (submission_timestamp, report_id), so a page
+    costs O(page size) regardless of how many reports are stored.
+    """
+    
+    def __init__(self, db_path):
+        """
+        Args:
+            db_path (str): Path of the SQLite database file
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        
+        with self._connect() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS reports (
+                    report_id TEXT PRIMARY KEY,
+                    report_status TEXT,
+                    report_types TEXT,
+                    reporter_id TEXT,
+                    submission_timestamp TEXT,
+                    systems TEXT,
+                    severity TEXT,
+                    content_hash TEXT,
+                    rdf_hash TEXT,
+                    file_path TEXT
+                )
+            """)
+            
+            # Indexes created before reports carried content hashes need their rows refilled
+            existing = {row[1] for row in con.execute("PRAGMA table_info(reports)").fetchall()}
+            missing = [c for c in ("content_hash", "rdf_hash") if c not in existing]
+            for column in missing:
+                con.execute(f"ALTER TABLE reports ADD COLUMN {column} TEXT")
+            self.needs_rebuild = bool(missing)
+            con.execute("""
+                CREATE INDEX IF NOT EXISTS reports_by_time
+                ON reports (submission_timestamp DESC, report_id DESC)
+            """)
+            con.execute("CREATE INDEX IF NOT EXISTS reports_by_content_hash ON reports (content_hash)")
+    
+    @contextmanager
+    def _connect(self):
+        """Open a connection that commits on success and is always closed"""
+        con = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+    
+    def upsert(self, report_id, report_data, file_path):
+        """
+        Add or replace the summary row of a report
+        
+        Args:
+            report_id (str): The ID of the report
+            report_data (dict): The report record (form data, machine readable output, timestamp)
+            file_path (str): Path of the report file
+        """
+        row = build_report_row(report_id, report_data)
+        values = [row[c] for c in INDEX_COLUMNS[:-1]] + [file_path]
+        
+        with self._lock, self._connect() as con:
+            con.execute(
+                f"INSERT OR REPLACE INTO reports ({', '.join(INDEX_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in INDEX_COLUMNS)})",
+                values
+            )
+    
+    def list(self, limit=100, offset=0):
+        """
+        Get report summaries, newest first
+        
+        Args:
+            limit (int): Maximum number of summaries to return
+            offset (int): Number of summaries to skip
+        
+        Returns:
+            list: Summary dicts with the columns in INDEX_COLUMNS
+        """
+        with self._connect() as con:
+            result = con.execute(
+                f"SELECT {', '.join(INDEX_COLUMNS)} FROM reports "
+                "ORDER BY submission_timestamp DESC, report_id DESC LIMIT ? OFFSET ?",
+                (int(limit), int(offset))
+            )
+            rows = result.fetchall()
+        
+        summaries = []
+        for values in rows:
+            summary = dict(zip(INDEX_COLUMNS, values))
+            summary["report_types"] = json.loads(summary["report_types"] or "[]")
+            summary["systems"] = json.loads(summary["systems"] or "[]")
+            summaries.append(summary)
+        return summaries
+    
+    def query(self, report_types=None, systems=None, severities=None, statuses=None,
+              date_from=None, date_to=None, limit=100, cursor=None):
+        """
+        Get one page of filtered summary rows, newest first, in the Parquet shard row format
+        
+        Filters and the keyset cursor are evaluated by SQLite on the
+        (submission_timestamp, report_id) index, so a page costs O(page size)
+        rather than a scan of every report. The form_data and machine_readable
+        columns are left empty; callers load them from the report files for
+        the rows they actually return.
+        
+        Args:
+            report_types (list, optional): Match reports with any of these report types
+            systems (list, optional): Match reports naming any of these systems
+            severities (list, optional): Match reports with one of these severities
+            statuses (list, optional): Match reports with one of these statuses
+            date_from (str|datetime, optional): Earliest submission timestamp (inclusive)
+            date_to (str|datetime, optional): Latest submission timestamp (exclusive)
+            limit (int): Maximum number of rows
+            cursor (str, optional): Cursor from storage.query_engine.encode_cursor
+        
+        Returns:
+            list: Row dicts with the columns of build_report_row
+        """
+        where = []
+        params = []
+        
+        for column, values in (("report_types", report_types), ("systems", systems)):
+            values = _as_list(values)
+            if values:
+                where.append(
+                    f"EXISTS (SELECT 1 FROM json_each({column}) WHERE value IN ({', '.join('?' for _ in values)}))"
+                )
+                params.extend(values)
+        for column, values in (("severity", severities), ("report_status", statuses)):
+            values = _as_list(values)
+            if values:
+                where.append(f"{column} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+        if date_from:
+            where.append("submission_timestamp >= ?")
+            params.append(_as_timestamp(date_from))
+        if date_to:
+            where.append("submission_timestamp < ?")
+            params.append(_as_timestamp(date_to))
+        if cursor:
+            where.append("(submission_timestamp, report_id) < (?, ?)")
+            params.extend(decode_cursor(cursor))
+        
+        with self._connect() as con:
+            result = con.execute(
+                f"SELECT {', '.join(INDEX_COLUMNS[:-1])} FROM reports "
+                f"{('WHERE ' + ' AND '.join(where)) if where else ''} "
+                "ORDER BY submission_timestamp DESC, report_id DESC LIMIT ?",
+                [*params, int(limit)]
+            )
+            rows = [dict(zip(INDEX_COLUMNS[:-1], values)) for values in result.fetchall()]
+        
+        for row in rows:
+            row["form_data"] = "{}"
+            row["machine_readable"] = ""
+        return rows
+    
+    def iter_paths(self, after_report_id=None, batch_size=500):
+        """
+        Stream (report_id, file_path) pairs in report ID order
+        
+        Pages through the primary key, so no more than batch_size rows are held
+        in memory and no connection stays open between pages.
+        
+        Args:
+            after_report_id (str, optional): Only yield reports with a greater report ID
+            batch_size (int): Number of rows read per query
+        
+        Yields:
+            tuple: (report_id, file_path)
+        """
+        last_id = after_report_id
+        while True:
+            with self._connect() as con:
+                if last_id is None:
+                    result = con.execute(
+                        "SELECT report_id, file_path FROM reports ORDER BY report_id LIMIT ?",
+                        (int(batch_size),)
+                    )
+                else:
+                    result = con.execute(
+                        "SELECT report_id, file_path FROM reports WHERE report_id > ? ORDER BY report_id LIMIT ?",
+                        (last_id, int(batch_size))
+                    )
+                rows = result.fetchall()
+            
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+    
+    def find_by_content_hash(self, content_hash):
+        """
+        Get the IDs of reports whose form data has the given content hash
+        
+        Args:
+            content_hash (str): Hash from form.utils.hashing.report_hashes
+        
+        Returns:
+            list: Matching report IDs
+        """
+        with self._connect() as con:
+            rows = con.execute("SELECT report_id FROM reports WHERE content_hash = ?", (content_hash,)).fetchall()
+        return [row[0] for row in rows]
+    
+    def get_path(self, report_id):
+        """Get the file path of a report, or None if it is not indexed"""
+        with self._connect() as con:
+            row = con.execute("SELECT file_path FROM reports WHERE report_id = ?", (report_id,)).fetchone()
+        return row[0] if row else None
+    
+    def count(self):
+        """Get the number of indexed reports"""
+        with self._connect() as con:
+            return con.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+    
+    def clear(self):
+        """Remove every row, e.g. before a rebuild"""
+        with self._lock, self._connect() as con:
+            con.execute("DELETE FROM reports")
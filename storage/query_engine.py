@@ -0,0 +1,289 @@
+import json
+import base64
+import threading
+from datetime import date, datetime
+import duckdb
+from form.utils.hashing import content_hash, VOLATILE_FIELDS
+
+QUERYABLE_COLUMNS = [
+    "report_id",
+    "report_status",
+    "report_types",
+    "reporter_id",
+    "submission_timestamp",
+    "systems",
+    "severity",
+    "content_hash",
+    "rdf_hash",
+    "form_data",
+    "machine_readable"
+]
+
+SUMMARY_COLUMNS = ["report_id", "report_status", "report_types", "reporter_id", "submission_timestamp"]
+
+def build_report_row(report_id, report_data):
+    """
+    Build the flat row stored in Parquet shards and scanned by the query engine
+    
+    Args:
+        report_id (str): The ID of the report
+        report_data (dict): The report record (form data, machine readable output, timestamp, hashes)
+    
+    Returns:
+        dict: Row with summary columns, content hashes and the serialized form data and JSON-LD
+    """
+    form_data = report_data["form_data"]
+    machine_readable_output = report_data.get("machine_readable")
+    return {
+        "report_id": report_id,
+        "report_status": form_data.get("Report Status", "Unknown"),
+        "report_types": json.dumps(form_data.get("Report Types", [])),
+        "reporter_id": form_data.get("Reporter ID", "Anonymous"),
+        "submission_timestamp": report_data["timestamp"],
+        "systems": json.dumps(form_data.get("Systems") or []),
+        "severity": form_data.get("Severity"),
+        "content_hash": report_data.get("content_hash") or content_hash(form_data, exclude=VOLATILE_FIELDS),
+        "rdf_hash": report_data.get("rdf_hash"),
+        "form_data": json.dumps(form_data),
+        "machine_readable": json.dumps(machine_readable_output) if machine_readable_output else ""
+    }
+
+def encode_cursor(row):
+    """Encode the pagination key of the last row of a page"""
+    key = [str(row["submission_timestamp"]), row["report_id"]]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        submission_timestamp, report_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    return submission_timestamp, report_id
+
+def _as_list(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return [value]
+    return list(value)
+
+def _as_timestamp(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+class ReportQueryEngine:
+    """
+    Query engine that filters, projects and paginates reports with DuckDB
+    
+    Queries run directly over Parquet shards (plus an optional in-memory frame
+    of rows not yet published), so only the requested columns and the
+    matching page are materialized in Python.
+    """
+    
+    def __init__(self):
+        self._connection = duckdb.connect()
+        self._lock = threading.Lock()
+    
+    def query(self, parquet_files=None, frame=None, report_types=None, systems=None,
+              severities=None, statuses=None, date_from=None, date_to=None,
+              columns=None, limit=100, cursor=None):
+        """
+        Run a report query
+        
+        Args:
+            parquet_files (list, optional): Local paths of Parquet shards to scan
+            frame (DataFrame, optional): Extra rows in the shard row format
+            report_types (list, optional): Match reports with any of these report types
+            systems (list, optional): Match reports naming any of these systems
+            severities (list, optional): Match reports with one of these severities
+            statuses (list, optional): Match reports with one of these statuses
+            date_from (str|datetime, optional): Earliest submission timestamp (inclusive)
+            date_to (str|datetime, optional): Latest submission timestamp (exclusive)
+            columns (list, optional): Columns to return (default: summary columns)
+            limit (int): Maximum number of reports per page
+            cursor (str, optional): Cursor returned by the previous page
+        
+        Returns:
+            dict: {"reports": list of dicts, "next_cursor": str or None}
+        """
+        columns = columns or SUMMARY_COLUMNS
+        unknown_columns = [c for c in columns if c not in QUERYABLE_COLUMNS]
+        if unknown_columns:
+            raise ValueError(f"Unknown report columns: {unknown_columns}")
+        
+        with self._lock:
+            con = self._connection.cursor()
+        
+        try:
+            sources = []
+            if parquet_files:
+                sources.append(f"SELECT * FROM read_parquet({_sql_list(parquet_files)}, union_by_name = true)")
+            if frame is not None and len(frame):
+                con.register("pending_reports", frame)
+                sources.append("SELECT * FROM pending_reports")
+            if not sources:
+                return {"reports": [], "next_cursor": None}
+            
+            con.execute(f"CREATE TEMP VIEW raw_reports AS {' UNION ALL BY NAME '.join(sources)}")
+            con.execute(f"CREATE TEMP VIEW reports AS {self._normalized_view(con)}")
+            
+            where, params = self._build_filters(
+                report_types, systems, severities, statuses, date_from, date_to, cursor
+            )
+            selected = list(dict.fromkeys(["report_id", "submission_timestamp", *columns]))
+            
+            sql = f"""
+                SELECT {', '.join(selected)} FROM reports
+                {('WHERE ' + ' AND '.join(where)) if where else ''}
+                ORDER BY submission_timestamp DESC, report_id DESC
+                LIMIT {int(limit) + 1}
+            """
+            result = con.execute(sql, params)
+            names = [d[0] for d in result.description]
+            rows = [dict(zip(names, values)) for values in result.fetchall()]
+        finally:
+            con.close()
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1])
+        
+        reports = [{c: row[c] for c in columns} for row in rows]
+        return {"reports": reports, "next_cursor": next_cursor}
+    
+    def iter_rows(self, parquet_files=None, frame=None, columns=None, after_report_id=None, batch_size=500):
+        """
+        Stream the latest row of every report in report ID order
+        
+        Rows are fetched from DuckDB batch_size at a time, so memory use does not
+        grow with the number of reports.
+        
+        Args:
+            parquet_files (list, optional): Local paths of Parquet shards to scan
+            frame (DataFrame, optional): Extra rows in the shard row format
+            columns (list, optional): Columns to return (default: all queryable columns)
+            after_report_id (str, optional): Only yield reports with a greater report ID
+            batch_size (int): Number of rows fetched from DuckDB at a time
+        
+        Yields:
+            dict: One row per report
+        """
+        columns = columns or QUERYABLE_COLUMNS
+        unknown_columns = [c for c in columns if c not in QUERYABLE_COLUMNS]
+        if unknown_columns:
+            raise ValueError(f"Unknown report columns: {unknown_columns}")
+        
+        with self._lock:
+            con = self._connection.cursor()
+        
+        try:
+            sources = []
+            if parquet_files:
+                sources.append(f"SELECT * FROM read_parquet({_sql_list(parquet_files)}, union_by_name = true)")
+            if frame is not None and len(frame):
+                con.register("pending_reports", frame)
+                sources.append("SELECT * FROM pending_reports")
+            if not sources:
+                return
+            
+            con.execute(f"CREATE TEMP VIEW raw_reports AS {' UNION ALL BY NAME '.join(sources)}")
+            con.execute(f"CREATE TEMP VIEW reports AS {self._normalized_view(con)}")
+            
+            selected = list(dict.fromkeys(["report_id", *columns]))
+            result = con.execute(
+                f"SELECT {', '.join(selected)} FROM reports "
+                f"{'WHERE report_id > ?' if after_report_id is not None else ''} "
+                "ORDER BY report_id",
+                [after_report_id] if after_report_id is not None else []
+            )
+            names = [d[0] for d in result.description]
+            while True:
+                batch = result.fetchmany(batch_size)
+                if not batch:
+                    break
+                for values in batch:
+                    row = dict(zip(names, values))
+                    yield {c: row[c] for c in columns}
+        finally:
+            con.close()
+    
+    def _normalized_view(self, con):
+        """Build the view that decodes JSON columns and keeps the latest row per report"""
+        available = {row[0] for row in con.execute("DESCRIBE raw_reports").fetchall()}
+        
+        systems = "from_json(json_extract(form_data, '$.Systems'), '[\"VARCHAR\"]')"
+        if "systems" in available:
+            systems = f"COALESCE(from_json(systems, '[\"VARCHAR\"]'), {systems})"
+        
+        severity = "json_extract_string(form_data, '$.Severity')"
+        if "severity" in available:
+            severity = f"COALESCE(severity, {severity})"
+        
+        # Shards written before reports carried hashes have no hash columns
+        content_hash_column = "content_hash" if "content_hash" in available else "NULL"
+        rdf_hash_column = "rdf_hash" if "rdf_hash" in available else "NULL"
+        
+        return f"""
+            SELECT
+                report_id,
+                report_status,
+                from_json(report_types, '["VARCHAR"]') AS report_types,
+                reporter_id,
+                CAST(submission_timestamp AS VARCHAR) AS submission_timestamp,
+                {systems} AS systems,
+                {severity} AS severity,
+                CAST({content_hash_column} AS VARCHAR) AS content_hash,
+                CAST({rdf_hash_column} AS VARCHAR) AS rdf_hash,
+                form_data,
+                machine_readable
+            FROM raw_reports
+            QUALIFY row_number() OVER (PARTITION BY report_id ORDER BY submission_timestamp DESC) = 1
+        """
+    
+    def _build_filters(self, report_types, systems, severities, statuses, date_from, date_to, cursor):
+        """Translate query arguments into SQL predicates and bound parameters"""
+        where = []
+        params = []
+        
+        if _as_list(report_types):
+            where.append("list_has_any(report_types, ?::VARCHAR[])")
+            params.append(_as_list(report_types))
+        if _as_list(systems):
+            where.append("list_has_any(systems, ?::VARCHAR[])")
+            params.append(_as_list(systems))
+        if _as_list(severities):
+            where.append("list_contains(?::VARCHAR[], severity)")
+            params.append(_as_list(severities))
+        if _as_list(statuses):
+            where.append("list_contains(?::VARCHAR[], report_status)")
+            params.append(_as_list(statuses))
+        if date_from:
+            where.append("submission_timestamp >= ?")
+            params.append(_as_timestamp(date_from))
+        if date_to:
+            where.append("submission_timestamp < ?")
+            params.append(_as_timestamp(date_to))
+        if cursor:
+            cursor_timestamp, cursor_report_id = decode_cursor(cursor)
+            where.append("(submission_timestamp < ? OR (submission_timestamp = ? AND report_id < ?))")
+            params.extend([cursor_timestamp, cursor_timestamp, cursor_report_id])
+        
+        return where, params
+
+def _sql_list(values):
+    """Render a list of strings as a DuckDB list literal"""
+    return "[" + ", ".join("'" + str(v).replace("'", "''") + "'" for v in values) + "]"
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_query_engine():
+    """Get the process-wide report query engine"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = ReportQueryEngine()
+        return _engine
@@ -0,0 +1,220 @@
+import os
+import time
+import uuid
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from huggingface_hub.utils import EntryNotFoundError
+
+class RevisionCache:
+    """
+    Persistent read-through cache of repository files keyed by blob ID, or by commit SHA and path
+    
+    Callers that know a file's blob ID (a hash of its contents, e.g. from the
+    shard manifest or a tree listing) get it cached by content, so a file
+    left unchanged by later commits is downloaded once and shared by every
+    revision. Other files are cached per commit. Either way cached entries
+    never need to be revalidated; only the HEAD commit is re-checked, at most
+    once per head_ttl seconds. Entries are evicted least-recently-used first once the
+    cache grows beyond its size budget. Files used within the last
+    eviction_grace seconds are never evicted, so a path returned by get()
+    stays readable while its caller opens it.
+    """
+    
+    def __init__(self, cache_dir, max_bytes=1024 ** 3, head_ttl=30.0, eviction_grace=60.0, max_missing=4096):
+        """
+        Args:
+            cache_dir (str): Directory holding cached files as blobs/<blob_id> or <sha>/<path>
+            max_bytes (int): Size budget for cached files
+            head_ttl (float): Seconds a resolved HEAD commit is trusted
+            eviction_grace (float): Seconds after its last use during which a file is not evicted
+            max_missing (int): Number of known-missing (commit, path) pairs remembered
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.head_ttl = head_ttl
+        self.eviction_grace = eviction_grace
+        self.max_missing = max_missing
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "head_checks": 0}
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._missing = OrderedDict()
+        self._total_bytes = 0
+        self._head = None
+        self._head_checked_at = 0.0
+        
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._scan()
+    
+    def _scan(self):
+        """Register files already on disk from a previous process"""
+        for root, dirs, files in os.walk(self.cache_dir):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for file_name in files:
+                if file_name.startswith(".tmp"):
+                    continue
+                local_path = os.path.join(root, file_name)
+                stat = os.stat(local_path)
+                self._entries[local_path] = [stat.st_size, stat.st_atime]
+                self._total_bytes += stat.st_size
+    
+    def head(self, fetch_head, force=False):
+        """
+        Get the HEAD commit, revalidating it once the TTL has expired
+        
+        Args:
+            fetch_head (callable): Returns the current HEAD commit SHA
+            force (bool): Revalidate even if the TTL has not expired
+        
+        Returns:
+            str: The HEAD commit SHA
+        """
+        with self._lock:
+            fresh = self._head and time.monotonic() - self._head_checked_at < self.head_ttl
+            if fresh and not force:
+                return self._head
+        
+        sha = fetch_head()
+        self.set_head(sha)
+        with self._lock:
+            self.stats["head_checks"] += 1
+        return sha
+    
+    def set_head(self, sha):
+        """Record a HEAD commit, e.g. the one created by our own commit"""
+        with self._lock:
+            self._head = sha
+            self._head_checked_at = time.monotonic()
+    
+    def _local_path(self, revision, path, blob_id=None):
+        if blob_id:
+            return os.path.join(self.cache_dir, "blobs", blob_id)
+        return os.path.join(self.cache_dir, revision, *path.split("/"))
+    
+    def get(self, revision, path, download_fn, blob_id=None):
+        """
+        Get a local copy of a file at a commit, downloading it on a miss
+        
+        Args:
+            revision (str): Commit SHA
+            path (str): Path of the file in the repository
+            download_fn (callable): download_fn(revision, path, local_dir) downloads
+                the file below local_dir and returns its local path
+            blob_id (str, optional): Hash of the file's contents at that commit
+        
+        Returns:
+            str: Local path of the cached file
+        
+        Raises:
+            EntryNotFoundError: If the file does not exist at that commit
+        """
+        local_path = self._local_path(revision, path, blob_id)
+        
+        with self._lock:
+            if (revision, path) in self._missing:
+                self._missing.move_to_end((revision, path))
+                self.stats["hits"] += 1
+                raise EntryNotFoundError(f"{path} does not exist at revision {revision}")
+            
+            if local_path in self._entries and os.path.exists(local_path):
+                self.stats["hits"] += 1
+                self._entries[local_path][1] = time.time()
+                return local_path
+            
+            self.stats["misses"] += 1
+        
+        incoming_dir = os.path.join(self.cache_dir, ".incoming", uuid.uuid4().hex)
+        try:
+            downloaded_file = download_fn(revision, path, incoming_dir)
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            os.replace(downloaded_file, local_path)
+        except EntryNotFoundError:
+            with self._lock:
+                self._missing[(revision, path)] = True
+                while len(self._missing) > self.max_missing:
+                    self._missing.popitem(last=False)
+            raise
+        finally:
+            shutil.rmtree(incoming_dir, ignore_errors=True)
+        
+        self._register(local_path)
+        return local_path
+    
+    def put(self, revision, path, data, blob_id=None):
+        """
+        Store file contents known to exist at a commit (write-through after a commit)
+        
+        Args:
+            revision (str): Commit SHA
+            path (str): Path of the file in the repository
+            data (bytes): File contents
+            blob_id (str, optional): Hash of the contents, as later passed to get()
+        """
+        local_path = self._local_path(revision, path, blob_id)
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(local_path), prefix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, local_path)
+        
+        self._register(local_path)
+    
+    def _register(self, local_path):
+        """Account for a newly cached file and enforce the size budget"""
+        size = os.path.getsize(local_path)
+        with self._lock:
+            previous = self._entries.get(local_path)
+            if previous:
+                self._total_bytes -= previous[0]
+            self._entries[local_path] = [size, time.time()]
+            self._total_bytes += size
+            self._evict()
+    
+    def _evict(self):
+        """
+        Remove least recently used files until the cache fits its budget
+        
+        Files used within eviction_grace seconds (just returned by get() or
+        just written) are kept even if that leaves the cache over budget for now.
+        """
+        if self._total_bytes <= self.max_bytes:
+            return
+        
+        cutoff = time.time() - self.eviction_grace
+        for local_path, (size, last_used) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            if self._total_bytes <= self.max_bytes or last_used > cutoff:
+                break
+            try:
+                os.remove(local_path)
+            except FileNotFoundError:
+                pass
+            del self._entries[local_path]
+            self._total_bytes -= size
+            self.stats["evictions"] += 1
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_read_cache(repo_id):
+    """
+    Get the process-wide read cache for a dataset repository
+    
+    The cache lives under $AIFR_CACHE_DIR (default: <tempdir>/ai_flaw_cache)
+    and is bounded by $AIFR_CACHE_MAX_BYTES (default: 1 GiB).
+    
+    Args:
+        repo_id (str): The dataset repository ID
+    
+    Returns:
+        RevisionCache: The shared cache
+    """
+    base_dir = os.environ.get("AIFR_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "ai_flaw_cache")
+    cache_dir = os.path.join(base_dir, (repo_id or "default").replace("/", "--"))
+    max_bytes = int(os.environ.get("AIFR_CACHE_MAX_BYTES", 1024 ** 3))
+    
+    with _caches_lock:
+        if cache_dir not in _caches:
+            _caches[cache_dir] = RevisionCache(cache_dir, max_bytes=max_bytes)
+        return _caches[cache_dir]
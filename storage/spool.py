@@ -0,0 +1,458 @@
+import os
+import glob
+import json
+import uuid
+import random
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    # Without flock (Windows) a spool directory must only be used by one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Client errors that can succeed later: timeouts, stale parents and rate limits
+RETRYABLE_STATUS_CODES = (408, 409, 412, 425, 429)
+
+def is_permanent_error(error):
+    """
+    Check whether a publish failure will not go away by retrying
+    
+    Requests rejected by the server with a client error (e.g. 403 Forbidden,
+    413 Payload Too Large) and malformed records are permanent. Server errors,
+    rate limits, network errors and an unavailable backend are retried.
+    """
+    status_code = getattr(getattr(error, "response", None), "status_code", None)
+    if status_code is not None:
+        return 400 <= status_code < 500 and status_code not in RETRYABLE_STATUS_CODES
+    return isinstance(error, (ValueError, TypeError, KeyError))
+
+def _try_lock(f):
+    """Take an exclusive, non-blocking flock on an open file; False if another holder has it"""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+def _read_pending(f):
+    """Replay an outbox log into an ordered {entry_id: put record} dict of unacknowledged entries"""
+    pending = OrderedDict()
+    for line in f:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            # A torn final line from a crash mid-append carries no fsynced entry
+            continue
+        
+        if record.get("op") == "put":
+            pending[record["entry_id"]] = record
+        elif record.get("op") == "ack":
+            for entry_id in record.get("entry_ids", []):
+                pending.pop(entry_id, None)
+    return pending
+
+class ReportSpool:
+    """
+    Durable, append-only outbox of report submissions waiting to be published
+    
+    Every submission is appended to a JSON Lines log and fsynced before the
+    caller returns. Published entries are acknowledged with an "ack" record,
+    so replaying the log after a restart yields exactly the submissions that
+    still need to be flushed.
+    
+    Each spool instance writes its own outbox-<id>.jsonl log and holds an
+    exclusive flock on it while it is alive, so processes sharing a spool
+    directory never rewrite or publish each other's entries. Logs whose lock
+    is free belong to a process that exited; their pending entries are
+    adopted into this spool's log when it opens and whenever its flusher is
+    idle.
+    
+    Entries that can never be published are moved to a shared
+    dead-letter.jsonl log together with their error, so they stop blocking
+    the entries behind them.
+    """
+    
+    def __init__(self, spool_dir):
+        """
+        Open (or create) a spool directory and adopt the entries of exited processes
+        
+        Args:
+            spool_dir (str): Directory holding the outbox logs
+        """
+        self.spool_dir = spool_dir
+        self.dead_letter_path = os.path.join(spool_dir, "dead-letter.jsonl")
+        self.compact_after = 1000
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()
+        self._acked_since_compaction = 0
+        self._flusher = None
+        
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.log_path = os.path.join(spool_dir, f"outbox-{uuid.uuid4().hex}.jsonl")
+        # Lock the log before it becomes visible under its final name, so no
+        # other process can mistake it for an orphan
+        self._log_file = self._open_locked_log(f"{self.log_path}.new")
+        os.replace(f"{self.log_path}.new", self.log_path)
+        self.adopt_orphans()
+    
+    def _open_locked_log(self, path):
+        log_file = open(path, "a+")
+        if not _try_lock(log_file):
+            log_file.close()
+            raise RuntimeError(f"Spool log {path} is locked by another process")
+        return log_file
+    
+    def adopt_orphans(self):
+        """
+        Move the pending entries of logs left by exited processes into this spool
+        
+        Returns:
+            int: Number of adopted entries
+        """
+        adopted = 0
+        for path in sorted(glob.glob(os.path.join(self.spool_dir, "outbox*.jsonl"))):
+            if path == self.log_path:
+                continue
+            try:
+                f = open(path, "r")
+            except OSError:
+                continue
+            
+            with f:
+                if not _try_lock(f):
+                    continue
+                try:
+                    # Another adopter may have taken the log, or its owner compacted
+                    # it, between our open and our lock
+                    if os.fstat(f.fileno()).st_ino != os.stat(path).st_ino:
+                        continue
+                except OSError:
+                    continue
+                
+                records = _read_pending(f)
+                with self._lock:
+                    fresh = [record for entry_id, record in records.items() if entry_id not in self._pending]
+                    if fresh:
+                        self._write_records(fresh)
+                        for record in fresh:
+                            self._pending[record["entry_id"]] = record
+                    flusher = self._flusher
+                os.remove(path)
+                adopted += len(fresh)
+        
+        if adopted and flusher:
+            flusher.wake()
+        return adopted
+    
+    def _write_records(self, records):
+        """Append records to this spool's log and fsync them to disk"""
+        for record in records:
+            self._log_file.write(json.dumps(record) + "\n")
+        self._log_file.flush()
+        os.fsync(self._log_file.fileno())
+    
+    def append(self, report_id, report_data):
+        """
+        Durably enqueue a report for publishing
+        
+        Args:
+            report_id (str): The ID of the report
+            report_data (dict): The report record (form data, machine readable output, timestamp)
+        
+        Returns:
+            str: The ID of the spool entry
+        """
+        record = {
+            "op": "put",
+            "entry_id": uuid.uuid4().hex,
+            "report_id": report_id,
+            "spooled_at": datetime.now().isoformat(),
+            "report": report_data
+        }
+        
+        with self._lock:
+            self._write_records([record])
+            self._pending[record["entry_id"]] = record
+            flusher = self._flusher
+        
+        if flusher:
+            flusher.wake()
+        
+        return record["entry_id"]
+    
+    def acknowledge(self, entry_ids):
+        """
+        Mark entries as published so they are not replayed
+        
+        Args:
+            entry_ids (list): IDs of the entries that were published
+        """
+        if not entry_ids:
+            return
+        
+        with self._lock:
+            self._write_records([{"op": "ack", "entry_ids": list(entry_ids)}])
+            for entry_id in entry_ids:
+                self._pending.pop(entry_id, None)
+            self._acked_since_compaction += len(entry_ids)
+            
+            if not self._pending or self._acked_since_compaction >= self.compact_after:
+                self._compact()
+    
+    def dead_letter(self, records, error):
+        """
+        Set entries aside that can never be published and stop retrying them
+        
+        Args:
+            records (list): Spool records that failed permanently
+            error (str): Why publishing them failed
+        """
+        failed_at = datetime.now().isoformat()
+        with self._lock:
+            with open(self.dead_letter_path, "a") as f:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                for record in records:
+                    f.write(json.dumps({**record, "error": error, "failed_at": failed_at}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        
+        # Acknowledged only once the dead letters are on disk, so a crash in between cannot lose them
+        self.acknowledge([record["entry_id"] for record in records])
+        for record in records:
+            logger.error("Report %s could not be published and was moved to %s: %s",
+                         record["report_id"], self.dead_letter_path, error)
+    
+    def dead_letters(self):
+        """
+        Get the entries that failed permanently, across every process sharing this directory
+        
+        Returns:
+            list: Spool records with the "error" and "failed_at" of their failure
+        """
+        try:
+            with open(self.dead_letter_path, "r") as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+    
+    def dead_letter_count(self):
+        """Number of entries that failed permanently"""
+        return len(self.dead_letters())
+    
+    def requeue_dead_letters(self):
+        """
+        Move dead-lettered entries back into the outbox, e.g. after fixing the token or the backend
+        
+        Returns:
+            int: Number of requeued entries
+        """
+        try:
+            f = open(self.dead_letter_path, "r+")
+        except FileNotFoundError:
+            return 0
+        
+        with f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            records = [json.loads(line) for line in f if line.strip()]
+            for record in records:
+                self.append(record["report_id"], record["report"])
+            f.truncate(0)
+        return len(records)
+    
+    def _compact(self):
+        """Rewrite this spool's log so it only holds pending entries"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.spool_dir, suffix=".tmp")
+        os.close(fd)
+        new_log = self._open_locked_log(tmp_path)
+        for record in self._pending.values():
+            new_log.write(json.dumps(record) + "\n")
+        new_log.flush()
+        os.fsync(new_log.fileno())
+        # The replacement is locked before it takes the log's name, so the log is never unlocked
+        os.replace(tmp_path, self.log_path)
+        self._log_file.close()
+        self._log_file = new_log
+        self._acked_since_compaction = 0
+    
+    def pending(self, limit=None):
+        """
+        Get pending entries in submission order
+        
+        Args:
+            limit (int, optional): Maximum number of entries to return
+        
+        Returns:
+            list: Pending spool records
+        """
+        with self._lock:
+            entries = list(self._pending.values())
+        return entries[:limit] if limit else entries
+    
+    def get(self, report_id):
+        """Get the most recently spooled, still pending record for a report"""
+        with self._lock:
+            for record in reversed(self._pending.values()):
+                if record["report_id"] == report_id:
+                    return record["report"]
+        return None
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+    
+    def start_flusher(self, flush_fn, batch_size=20, interval=5.0, max_backoff=300.0,
+                      is_permanent=is_permanent_error):
+        """
+        Start the background thread draining this spool, if it is not running yet
+        
+        Args:
+            flush_fn (callable): Called with a list of spool records; must raise on failure
+            batch_size (int): Maximum number of records published per flush
+            interval (float): Seconds between polls when the spool is idle
+            max_backoff (float): Upper bound for the retry delay after failures
+            is_permanent (callable): Tells whether an exception raised by flush_fn
+                means the records can never be published
+        
+        Returns:
+            SpoolFlusher: The flusher attached to this spool
+        """
+        with self._lock:
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = SpoolFlusher(self, flush_fn, batch_size, interval, max_backoff, is_permanent)
+                self._flusher.start()
+            return self._flusher
+
+class SpoolFlusher(threading.Thread):
+    """
+    Background thread publishing spooled reports in batches with retry
+    
+    Transient failures are retried with jittered exponential backoff. When a
+    batch fails permanently its records are published one at a time, so the
+    records that cannot be published are dead-lettered and the rest go through.
+    """
+    
+    def __init__(self, spool, flush_fn, batch_size, interval, max_backoff, is_permanent=is_permanent_error):
+        super().__init__(name="report-spool-flusher", daemon=True)
+        self.spool = spool
+        self.flush_fn = flush_fn
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.is_permanent = is_permanent
+        self.failures = 0
+        self.dead_lettered = 0
+        self.last_error = None
+        self._wake = threading.Event()
+    
+    def wake(self):
+        """Ask the flusher to drain the spool now"""
+        self._wake.set()
+    
+    def run(self):
+        while True:
+            batch = self.spool.pending(self.batch_size)
+            if not batch:
+                # Pick up reports left behind by processes that exited since the last poll
+                if self.spool.adopt_orphans():
+                    continue
+                self._wake.wait(self.interval)
+                self._wake.clear()
+                continue
+            
+            try:
+                self.flush_fn(batch)
+            except Exception as e:
+                if not self.is_permanent(e):
+                    self._back_off(e)
+                    continue
+                if not self._flush_each(batch, e):
+                    continue
+            else:
+                self.spool.acknowledge([record["entry_id"] for record in batch])
+            
+            self.failures = 0
+            self.last_error = None
+    
+    def _flush_each(self, batch, error):
+        """
+        Publish the records of a permanently failed batch one at a time, dead-lettering the ones that fail
+        
+        Returns:
+            bool: False if a transient failure interrupted the batch
+        """
+        if len(batch) == 1:
+            self._dead_letter(batch, error)
+            return True
+        
+        for record in batch:
+            try:
+                self.flush_fn([record])
+            except Exception as e:
+                if not self.is_permanent(e):
+                    self._back_off(e)
+                    return False
+                self._dead_letter([record], e)
+            else:
+                self.spool.acknowledge([record["entry_id"]])
+        return True
+    
+    def _dead_letter(self, records, error):
+        self.spool.dead_letter(records, str(error))
+        self.dead_lettered += len(records)
+    
+    def _back_off(self, error):
+        """Wait before retrying after a transient failure (or until woken)"""
+        self.failures += 1
+        self.last_error = str(error)
+        delay = random.uniform(0, min(self.max_backoff, self.interval * (2 ** min(self.failures, 10))))
+        self._wake.wait(delay)
+        self._wake.clear()
+
+_spools = {}
+_spools_lock = threading.Lock()
+
+def default_spool_dir():
+    """
+    Persistent directory for spools: $AIFR_SPOOL_DIR, the persistent /data volume on
+    Hugging Face Spaces, or the user data directory ($XDG_DATA_HOME or ~/.local/share,
+    %LOCALAPPDATA% on Windows)
+    """
+    if os.environ.get("AIFR_SPOOL_DIR"):
+        return os.environ["AIFR_SPOOL_DIR"]
+    if os.environ.get("SPACE_ID") and os.path.isdir("/data") and os.access("/data", os.W_OK):
+        return os.path.join("/data", "ai_flaw_spool")
+    data_home = os.environ.get("XDG_DATA_HOME") or os.environ.get("LOCALAPPDATA") or os.path.join(
+        os.path.expanduser("~"), ".local", "share"
+    )
+    return os.path.join(data_home, "ai-flaw-report", "spool")
+
+def get_report_spool(name):
+    """
+    Get the process-wide spool for a storage backend
+    
+    The spool lives in a subdirectory of default_spool_dir() named after the
+    backend. It has to survive restarts, so it is never kept in the temp directory.
+    
+    Args:
+        name (str): Name of the storage backend (e.g. "huggingface", "local")
+    
+    Returns:
+        ReportSpool: The shared spool
+    """
+    spool_dir = os.path.join(default_spool_dir(), name)
+    
+    with _spools_lock:
+        if spool_dir not in _spools:
+            _spools[spool_dir] = ReportSpool(spool_dir)
+        return _spools[spool_dir]
@@ -2,18 +2,58 @@ from abc import ABC, abstractmethod
 import streamlit as st
 import os
 import json
+import hashlib
+import heapq
 import tempfile
+import threading
+import time
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from form.data.schema import generate_machine_readable_output
+from form.utils.hashing import report_hashes, fill_rdf_hash
+from storage.spool import get_report_spool
+from storage.query_engine import build_report_row, get_query_engine
+from storage.local_index import ReportSummaryIndex
 
 class StorageProvider(ABC):
     """Abstract base class for storage providers"""
     
+    init_retry_interval = 60.0
+    
     @abstractmethod
     def initialize(self):
         """Initialize the storage provider"""
         pass
     
+    def ensure_initialized(self, force=False):
+        """
+        Initialize the provider once, however many reruns or threads ask for it
+        
+        A failed attempt is not repeated until init_retry_interval seconds have
+        passed, so an unreachable backend does not slow down every call.
+        
+        Args:
+            force (bool): Retry now even if the last attempt failed recently
+            
+        Returns:
+            bool: True if the provider is initialized
+        """
+        if getattr(self, "initialized", False):
+            return True
+        
+        init_lock = self.__dict__.setdefault("_init_lock", threading.Lock())
+        with init_lock:
+            if getattr(self, "initialized", False):
+                return True
+            
+            last_attempt = getattr(self, "_last_init_attempt", None)
+            if not force and last_attempt is not None and time.monotonic() - last_attempt < self.init_retry_interval:
+                return False
+            
+            self._last_init_attempt = time.monotonic()
+            return bool(self.initialize())
+    
     @abstractmethod
     def save_report(self, form_data):
         """
@@ -53,19 +93,84 @@ class StorageProvider(ABC):
             bool: True if update was successful, False otherwise
         """
         pass
+    
+    @abstractmethod
+    def query_reports(self, report_types=None, systems=None, severities=None, statuses=None,
+                      date_from=None, date_to=None, columns=None, limit=100, cursor=None):
+        """
+        Query reports with filters, column projection and cursor pagination
+        
+        Args:
+            report_types (list, optional): Match reports with any of these report types
+            systems (list, optional): Match reports naming any of these systems
+            severities (list, optional): Match reports with one of these severities
+            statuses (list, optional): Match reports with one of these statuses
+            date_from (str|datetime, optional): Earliest submission timestamp (inclusive)
+            date_to (str|datetime, optional): Latest submission timestamp (exclusive)
+            columns (list, optional): Columns to return, from
+                storage.query_engine.QUERYABLE_COLUMNS (default: summary columns)
+            limit (int): Maximum number of reports per page
+            cursor (str, optional): next_cursor returned by the previous page
+            
+        Returns:
+            dict: {"reports": list of dicts, newest first,
+                   "next_cursor": cursor for the next page or None}
+        """
+        pass
+
+    @abstractmethod
+    def iter_reports(self, after_report_id=None, batch_size=500):
+        """
+        Stream every stored report in report ID order
+        
+        Implementations hold at most one batch of reports in memory, so the
+        whole store can be walked (e.g. by storage.export) at any size.
+        
+        Args:
+            after_report_id (str, optional): Only yield reports with a greater report ID,
+                used to resume an interrupted walk
+            batch_size (int): Number of reports read from the backend at a time
+            
+        Yields:
+            tuple: (report_id, report_data)
+        """
+        pass
 
 class LocalStorageProvider(StorageProvider):
-    """Provider that stores reports as local files in a temporary directory"""
+    """
+    Provider that stores reports as local files in a temporary directory
+    
+    Reports are fanned out by hash prefix (reports/<xx>/report_<id>.json) and
+    their summaries are kept in a SQLite index, so listing and counting never
+    touch the report files. The rdf_hash of a saved report is computed on a
+    background thread and written to its file and index row afterwards.
+    """
     
     def __init__(self):
         """Initialize with a temp directory that's writable"""
         self.report_dir = os.path.join(tempfile.gettempdir(), "ai_flaw_reports")
+        self.index_path = os.path.join(self.report_dir, "reports_index.sqlite")
+        self.summary_index = None
         self.initialized = False
+        self._write_lock = threading.RLock()
+        self._hash_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="local-rdf-hash")
+        self.spool = get_report_spool("local")
+        
+        # Replay submissions left in the spool by a previous process
+        if len(self.spool):
+            self.spool.start_flusher(self._publish_spooled_reports)
     
     def initialize(self):
         """Initialize local storage using a temporary directory"""
         try:
             os.makedirs(self.report_dir, exist_ok=True)
+            
+            new_index = not os.path.exists(self.index_path)
+            self.summary_index = ReportSummaryIndex(self.index_path)
+            if new_index or self.summary_index.needs_rebuild:
+                self.rebuild_index()
+            self._migrate_flat_layout()
+            
             # st.sidebar.success(f"Using local file storage in temporary directory: {self.report_dir}")
             self.initialized = True
             return True
@@ -75,44 +180,148 @@ class LocalStorageProvider(StorageProvider):
     
     def save_report(self, form_data):
         """Save report to a local file in the temp directory"""
-        if not self.initialized:
-            self.initialize()
+        self.ensure_initialized()
             
         report_id = form_data.get("Report ID")
         machine_readable_output = generate_machine_readable_output(form_data)
         
-        file_path = os.path.join(self.report_dir, f"report_{report_id}.json")
+        report_data = {
+            "form_data": form_data,
+            "machine_readable": machine_readable_output,
+            "timestamp": datetime.now().isoformat(),
+            # The rdf_hash is filled in in the background, off the request path
+            **report_hashes(form_data)
+        }
+        
         try:
-            with open(file_path, "w") as f:
-                json.dump({
-                    "form_data": form_data,
-                    "machine_readable": machine_readable_output,
-                    "timestamp": datetime.now().isoformat()
-                }, f, indent=4)
-            
+            file_path = self._write_report_file(report_id, report_data)
+            self._hash_executor.submit(self._store_rdf_hash, report_id, report_data)
             # st.sidebar.success(f"Report saved to: {file_path}")
             return file_path, machine_readable_output
         except Exception as e:
             # st.sidebar.error(f"Error saving report: {str(e)}")
-            st.session_state[f"report_{report_id}"] = {
-                "form_data": form_data,
-                "machine_readable": machine_readable_output,
-                "timestamp": datetime.now().isoformat()
-            }
+            pass
+        
+        try:
+            # Keep the report durable and retry the write in the background
+            self.spool.append(report_id, report_data)
+            self.spool.start_flusher(self._publish_spooled_reports)
+            # st.sidebar.info(f"Fallback: Report queued in local spool")
+            return f"spool:report_{report_id}", machine_readable_output
+        except Exception as e:
+            st.session_state[f"report_{report_id}"] = report_data
             # st.sidebar.info(f"Fallback: Report stored in session state")
             return f"session_state:report_{report_id}", machine_readable_output
     
+    def _report_path(self, report_id):
+        """Get the hash-prefixed path of a report file"""
+        prefix = hashlib.sha1(str(report_id).encode()).hexdigest()[:2]
+        return os.path.join(self.report_dir, "reports", prefix, f"report_{report_id}.json")
+    
+    def _write_report_file(self, report_id, report_data):
+        """Atomically write a report file, fsync it to disk and index its summary"""
+        file_path = self._report_path(report_id)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        
+        with self._write_lock:
+            tmp_path = f"{file_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(report_data, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, file_path)
+            
+            self.summary_index.upsert(report_id, report_data, file_path)
+        return file_path
+    
+    def _store_rdf_hash(self, report_id, report_data):
+        """Compute the rdf_hash of a saved report and write it to its file and index row"""
+        hashed = fill_rdf_hash(dict(report_data))
+        if hashed.get("rdf_hash") is None:
+            return
+        
+        file_path = self._report_path(report_id)
+        with self._write_lock:
+            try:
+                with open(file_path, "r") as f:
+                    stored = json.load(f)
+            except (OSError, ValueError):
+                return
+            # Leave the file alone if a newer version of the report replaced it meanwhile
+            if stored.get("timestamp") != hashed["timestamp"] or stored.get("rdf_hash") is not None:
+                return
+            
+            self._write_report_file(report_id, hashed)
+    
+    def _migrate_flat_layout(self):
+        """Move report files from the old flat directory layout into hash-prefixed directories"""
+        for file_name in os.listdir(self.report_dir):
+            if not (file_name.startswith("report_") and file_name.endswith(".json")):
+                continue
+            
+            legacy_path = os.path.join(self.report_dir, file_name)
+            report_id = file_name.replace("report_", "").replace(".json", "")
+            try:
+                with open(legacy_path, "r") as f:
+                    data = json.load(f)
+                
+                self._write_report_file(report_id, data)
+                os.remove(legacy_path)
+            except Exception as e:
+                # st.sidebar.warning(f"Could not migrate {file_name}: {str(e)}")
+                pass
+    
+    def rebuild_index(self):
+        """
+        Rebuild the summary index from the report files on disk
+        
+        Returns:
+            int: Number of reports in the rebuilt index
+        """
+        self.summary_index.clear()
+        
+        for root, dirs, files in os.walk(os.path.join(self.report_dir, "reports")):
+            for file_name in files:
+                if not (file_name.startswith("report_") and file_name.endswith(".json")):
+                    continue
+                
+                file_path = os.path.join(root, file_name)
+                try:
+                    with open(file_path, "r") as f:
+                        data = json.load(f)
+                except Exception:
+                    continue
+                
+                report_id = file_name.replace("report_", "").replace(".json", "")
+                self.summary_index.upsert(report_id, fill_rdf_hash(data), file_path)
+        
+        return self.summary_index.count()
+    
+    def _publish_spooled_reports(self, entries):
+        """Write spooled reports to the report directory"""
+        if not self.ensure_initialized():
+            raise RuntimeError("Local storage directory is not available")
+        
+        for entry in entries:
+            self._write_report_file(entry["report_id"], fill_rdf_hash(entry["report"]))
+    
     def get_report(self, report_id):
         """Retrieve a report from local storage or session state fallback"""
-        if not self.initialized:
-            self.initialize()
+        self.ensure_initialized()
             
+        spooled_report = self.spool.get(report_id)
+        if spooled_report:
+            return spooled_report
+        
         session_key = f"report_{report_id}"
         if session_key in st.session_state:
             # st.sidebar.info(f"Retrieved report {report_id} from session state")
             return st.session_state[session_key]
         
-        file_path = os.path.join(self.report_dir, f"report_{report_id}.json")
+        file_path = self._report_path(report_id)
+        if not os.path.exists(file_path):
+            # Reports written before the hash-prefixed layout
+            file_path = os.path.join(self.report_dir, f"report_{report_id}.json")
         if not os.path.exists(file_path):
             # st.sidebar.warning(f"Report {report_id} not found")
             return None
@@ -133,65 +342,159 @@ class LocalStorageProvider(StorageProvider):
         return True
     
     def list_reports(self, limit=100):
-        """List all reports in local storage and session state"""
-        if not self.initialized:
-            self.initialize()
-            
-        reports = []
-        
-        if os.path.exists(self.report_dir):
-                report_files = [f for f in os.listdir(self.report_dir) if f.endswith(".json")]
-                
-                # Sort by most recent first
-                try:
-                    report_files.sort(key=lambda f: os.path.getmtime(os.path.join(self.report_dir, f)), reverse=True)
-                except:
-                    pass
-                
-                report_files = report_files[:limit]
-                
-                for file_name in report_files:
-                        with open(os.path.join(self.report_dir, file_name), "r") as f:
-                            data = json.load(f)
-                        
-                        # Extract report ID from filename (report_ID.json)
-                        report_id = file_name.replace("report_", "").replace(".json", "")
-                        
-                        form_data = data.get("form_data", {})
-                        
-                        reports.append({
-                            "report_id": report_id,
-                            "report_status": form_data.get("Report Status", "Unknown"),
-                            "report_types": form_data.get("Report Types", []),
-                            "reporter_id": form_data.get("Reporter ID", "Unknown"),
-                            "submission_timestamp": data.get("timestamp", "Unknown")
-                        })
+        """List the newest reports in local storage, the spool and session state"""
+        self.ensure_initialized()
         
+        # Reports still waiting in the spool (or kept in session state after a failed
+        # write) are newer than their indexed version, if any
+        unpublished = {}
+        for entry in self.spool.pending():
+            unpublished[entry["report_id"]] = entry["report"]
         for key in st.session_state:
             if key.startswith("report_"):
-                    report_id = key.replace("report_", "")
-                    if any(r["report_id"] == report_id for r in reports):
-                        continue 
-                        
-                    data = st.session_state[key]
-                    form_data = data.get("form_data", {})
-                    
-                    reports.append({
-                        "report_id": report_id,
-                        "report_status": form_data.get("Report Status", "Unknown"),
-                        "report_types": form_data.get("Report Types", []),
-                        "reporter_id": form_data.get("Reporter ID", "Unknown"),
-                        "submission_timestamp": data.get("timestamp", "Unknown")
-                    })
-        
-        return reports[:limit]
+                unpublished.setdefault(key.replace("report_", ""), st.session_state[key])
+        
+        reports = {}
+        if self.summary_index:
+            # Enough rows to fill the page even if every unpublished report replaces one of them
+            for summary in self.summary_index.list(limit + len(unpublished)):
+                reports[summary["report_id"]] = {
+                    "report_id": summary["report_id"],
+                    "report_status": summary["report_status"],
+                    "report_types": summary["report_types"],
+                    "reporter_id": summary["reporter_id"],
+                    "submission_timestamp": summary["submission_timestamp"]
+                }
+        
+        for report_id, data in unpublished.items():
+            form_data = data.get("form_data", {})
+            reports[report_id] = {
+                "report_id": report_id,
+                "report_status": form_data.get("Report Status", "Unknown"),
+                "report_types": form_data.get("Report Types", []),
+                "reporter_id": form_data.get("Reporter ID", "Unknown"),
+                "submission_timestamp": data.get("timestamp", "Unknown")
+            }
+        
+        # Newest first, like the summary index; reports without a timestamp go last
+        newest_first = sorted(
+            reports.values(),
+            key=lambda r: str(r["submission_timestamp"]) if r["submission_timestamp"] not in (None, "Unknown") else "",
+            reverse=True
+        )
+        return newest_first[:limit]
+    
+    def count_reports(self):
+        """Count stored reports, including ones still waiting in the spool"""
+        self.ensure_initialized()
+        
+        if not self.summary_index:
+            return len(self.spool)
+        
+        pending_ids = {entry["report_id"] for entry in self.spool.pending()}
+        unpublished = [report_id for report_id in pending_ids if self.summary_index.get_path(report_id) is None]
+        return self.summary_index.count() + len(unpublished)
+    
+    def query_reports(self, report_types=None, systems=None, severities=None, statuses=None,
+                      date_from=None, date_to=None, columns=None, limit=100, cursor=None):
+        """
+        Query reports in local storage
+        
+        The page is read from the SQLite summary index with the filters and the
+        cursor applied there. Reports still waiting in the spool replace their
+        indexed version, so enough extra indexed rows are read to make up for
+        the ones they replace, and DuckDB merges both into the final page.
+        """
+        self.ensure_initialized()
+        
+        pending = {
+            entry["report_id"]: build_report_row(entry["report_id"], entry["report"])
+            for entry in self.spool.pending()
+        }
+        
+        rows = {}
+        if self.summary_index:
+            indexed_rows = self.summary_index.query(
+                report_types=report_types,
+                systems=systems,
+                severities=severities,
+                statuses=statuses,
+                date_from=date_from,
+                date_to=date_to,
+                limit=limit + 1 + len(pending),
+                cursor=cursor
+            )
+            for row in indexed_rows:
+                rows[row["report_id"]] = row
+        rows.update(pending)
+        
+        result = get_query_engine().query(
+            frame=pd.DataFrame(list(rows.values())) if rows else None,
+            report_types=report_types,
+            systems=systems,
+            severities=severities,
+            statuses=statuses,
+            date_from=date_from,
+            date_to=date_to,
+            columns=columns,
+            limit=limit,
+            cursor=cursor
+        )
+        
+        # The index only holds summaries; load full documents for the returned page
+        for column in ("form_data", "machine_readable"):
+            if columns and column in columns:
+                for report in result["reports"]:
+                    data = self.get_report(report["report_id"]) or {}
+                    value = data.get(column)
+                    report[column] = json.dumps(value) if value else ("" if column == "machine_readable" else "{}")
+        
+        return result
+
+    def iter_reports(self, after_report_id=None, batch_size=500):
+        """Stream reports from the report files, merged with reports still in the spool"""
+        self.ensure_initialized()
+        
+        pending = sorted(
+            (entry["report_id"], entry["report"]) for entry in self.spool.pending()
+            if after_report_id is None or entry["report_id"] > after_report_id
+        )
+        pending_ids = {report_id for report_id, _ in pending}
+        
+        def published():
+            if not self.summary_index:
+                return
+            for report_id, file_path in self.summary_index.iter_paths(after_report_id, batch_size):
+                if report_id in pending_ids:
+                    continue
+                try:
+                    with open(file_path, "r") as f:
+                        yield report_id, json.load(f)
+                except Exception as e:
+                    # st.sidebar.warning(f"Could not read {file_path}: {str(e)}")
+                    continue
+        
+        yield from heapq.merge(published(), pending, key=lambda item: item[0])
+
+_providers = {}
+_providers_lock = threading.Lock()
 
 def get_storage_provider():
-    """Get the configured storage provider"""
+    """
+    Get the process-wide instance of the configured storage provider
+    
+    The provider is created once per process and shared by every session and
+    rerun; it initializes lazily on first use.
+    """
     provider_name = os.environ.get("STORAGE_PROVIDER", "huggingface").lower()
     
-    if provider_name == "local":
-        return LocalStorageProvider()
-    else:
-        from storage.huggingface_storage import HuggingFaceStorageProvider
-        return HuggingFaceStorageProvider()
\ No newline at end of file
+    with _providers_lock:
+        if provider_name not in _providers:
+            if provider_name == "local":
+                _providers[provider_name] = LocalStorageProvider()
+            else:
+                from storage.huggingface_storage import HuggingFaceStorageProvider
+                provider = HuggingFaceStorageProvider()
+                provider.start_health_monitor()
+                _providers[provider_name] = provider
+        return _providers[provider_name]
\ No newline at end of file
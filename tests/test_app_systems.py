@@ -0,0 +1,73 @@
+import os
+import tempfile
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from storage import storage_interface
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("STORAGE_PROVIDER", "local")
+    monkeypatch.setenv("AIFR_SPOOL_DIR", str(tmp_path / "spool"))
+    monkeypatch.chdir(REPO_ROOT)
+    # A fresh local provider writing under tmp_path instead of the shared temp directory
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    monkeypatch.setattr(storage_interface, "_providers", {})
+
+    at = AppTest.from_file(os.path.join(REPO_ROOT, "main.py"), default_timeout=120)
+    # A hazard report: neither a real-world incident nor a threat actor
+    at.session_state["real_world_incident_radio"] = "No"
+    at.session_state["involves_real_world_incident"] = False
+    at.session_state["threat_actor_radio"] = "No"
+    at.session_state["involves_threat_actor"] = False
+    return at.run()
+
+
+def suggestion_buttons(at):
+    return [button for button in at.button if (button.key or "").startswith("systems_suggestion_")]
+
+
+def test_systems_field_has_label_and_placeholder(app):
+    search = app.text_input(key="systems_text_input")
+
+    assert search.label == "AI System(s)"
+    assert search.placeholder.startswith("Choose AI systems...")
+
+
+def test_pick_a_suggestion_and_submit(app):
+    app.text_input(key="systems_text_input").input("claude").run()
+    assert not app.exception
+    suggestion = suggestion_buttons(app)[0]
+    picked = suggestion.label.removeprefix("➕ ")
+
+    suggestion.click().run()
+
+    assert not app.exception
+    assert app.session_state["systems_selections"] == [picked]
+    assert app.text_input(key="systems_text_input").value == ""
+
+    app.text_area(key="Flaw Description - Detailed Description").input("The model leaks its system prompt")
+    app.text_area(key="Potential Policy Violations").input("Terms of use, section 2")
+    app.multiselect(key="Impacts").select(app.multiselect(key="Impacts").options[0])
+    app.multiselect(key="Impacted Stakeholder(s)").select(app.multiselect(key="Impacted Stakeholder(s)").options[0])
+    app.radio(key="Disclosure Intent").set_value("No")
+    app.run()
+    next(button for button in app.button if button.label == "Submit Report").click().run()
+
+    assert not app.exception
+    assert not app.error, [error.value for error in app.error]
+    assert app.session_state["submission_status"]
+    assert app.session_state["complete_form_data"]["Systems"] == [picked]
+
+
+def test_remove_a_selected_system(app):
+    suggestion_buttons(app)[0].click().run()
+    assert len(app.session_state["systems_selections"]) == 1
+
+    app.button(key="systems_remove_0").click().run()
+
+    assert not app.exception
+    assert app.session_state["systems_selections"] == []
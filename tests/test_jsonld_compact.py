@@ -0,0 +1,67 @@
+import json
+import random
+import pytest
+from pyld import jsonld
+
+from form.data.jsonld_compact import CompactionUnsupported, DirectCompactor, check_equivalence, compact_document
+from form.data.jsonld_loader import jsonld_options
+from form.data.schema import process_raw_report, serialize_to_jsonld
+
+
+def random_records(count, seed=0):
+    """Form records covering optional, list, nested and free-form fields"""
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        record = {
+            "Report ID": f"report-{i}",
+            "Disclosure Intent": rng.choice(["Yes", "No"]),
+            "Systems": rng.sample(["GPT-4", "Claude", "Llama 3", "Unknown model"], rng.randint(0, 3)),
+            "Report Types": rng.sample(["Real-World Incidents", "Security Incident Report", "Hazard Report"],
+                                       rng.randint(1, 2)),
+        }
+        optional = {
+            "Reporter ID": f"reporter-{i}",
+            "Severity": rng.choice(["Critical", "High", "Medium", "Low"]),
+            "Prevalence": rng.choice(["Rare", "Common"]),
+            "Flaw Description": "Model leaks \"quoted\" text\nacross lines",
+            "Impacts": rng.sample(["Financial", "Reputational", "Physical"], rng.randint(1, 2)),
+            "Experienced Harm Types": ["Privacy"],
+            "Impacted Stakeholder(s)": ["Users", "Third parties"],
+            "Context Info": "Seen in production",
+            "Submission Timestamp": f"2026-01-{1 + i % 28:02d}T12:00:00",
+            "Embargo Request": "30 days",
+            "Disclosure Channels": ["Email"],
+            "Risk Source(s)": {"Responsible Factors": ["Training data"],
+                               "Responsible Factors Context": "Scraped corpus"},
+            "Custom Extra": i,
+        }
+        for field, value in optional.items():
+            if rng.random() < 0.6:
+                record[field] = value
+        records.append(record)
+    return records
+
+
+@pytest.fixture(scope="module")
+def documents():
+    return [serialize_to_jsonld(process_raw_report(record)) for record in random_records(60)]
+
+
+def test_direct_compaction_is_identical_to_pyld(documents):
+    summary = check_equivalence(documents)
+
+    assert summary["mismatches"] == []
+    assert summary["unsupported"] == 0
+    assert summary["matched"] == summary["checked"] == len(documents)
+
+
+def test_compact_document_falls_back_to_pyld_for_unsupported_features(documents):
+    document = dict(documents[0])
+    document["aifr:tags"] = {"@list": ["first", "second"]}
+
+    with pytest.raises(CompactionUnsupported):
+        DirectCompactor(document["@context"]).compact(document)
+
+    expected = jsonld.compact(document, document["@context"], options=jsonld_options())
+    assert json.dumps(compact_document(document)) == json.dumps(expected)
@@ -0,0 +1,89 @@
+import json
+import random
+import tempfile
+from datetime import datetime
+from functools import partial
+import pandas as pd
+import pytest
+
+from form.utils.hashing import rdf_hash
+from storage.query_engine import build_report_row, get_query_engine
+from storage.storage_interface import LocalStorageProvider
+
+
+def form_data(i, **fields):
+    return {"Report ID": f"r{i}", "Disclosure Intent": "No", "Report Types": ["Hazard Report"], **fields}
+
+
+@pytest.fixture
+def provider(tmp_path, monkeypatch):
+    monkeypatch.setenv("AIFR_SPOOL_DIR", str(tmp_path / "spool"))
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    provider = LocalStorageProvider()
+    assert provider.initialize()
+    return provider
+
+
+def stored(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def test_rdf_hash_is_stored_in_the_background(provider):
+    path, machine_readable = provider.save_report(form_data(1, Systems=["GPT-4"]))
+    provider._hash_executor.shutdown(wait=True)
+
+    expected = rdf_hash(machine_readable)
+    assert stored(path)["rdf_hash"] == expected
+    assert provider.summary_index.list(10, 0)[0]["rdf_hash"] == expected
+
+
+def test_background_hash_does_not_overwrite_a_newer_version(provider):
+    path, _ = provider.save_report(form_data(1, Severity="Low"))
+    provider._hash_executor.shutdown(wait=True)
+    outdated = dict(stored(path), rdf_hash=None)
+    provider._write_report_file("r1", dict(stored(path), rdf_hash=None, timestamp="2099-01-01T00:00:00"))
+
+    provider._store_rdf_hash("r1", outdated)
+
+    assert stored(path)["timestamp"] == "2099-01-01T00:00:00"
+
+
+def stored_report(i, rng):
+    form = form_data(
+        i,
+        Systems=rng.sample(["GPT-4", "Claude", "Llama 3"], rng.randint(0, 2)),
+        Severity=rng.choice(["Low", "High", None]),
+        **{"Report Status": rng.choice(["Submitted", "Closed"]),
+           "Report Types": rng.sample(["Hazard Report", "Real-World Incidents", "Malign Actor"], rng.randint(1, 2))}
+    )
+    # Repeated timestamps exercise the report ID tie-break of the cursor
+    return {"form_data": form, "machine_readable": None, "timestamp": f"2026-01-{1 + rng.randrange(5):02d}T00:00:00"}
+
+
+def all_pages(query, **filters):
+    pages, cursor = [], None
+    while True:
+        result = query(limit=7, cursor=cursor, **filters)
+        pages.extend(report["report_id"] for report in result["reports"])
+        cursor = result["next_cursor"]
+        if not cursor:
+            return pages
+
+
+def test_query_pages_match_a_query_over_every_report(provider):
+    rng = random.Random(5)
+    reports = {f"r{i}": stored_report(i, rng) for i in range(60)}
+    for report_id, report_data in reports.items():
+        provider._write_report_file(report_id, report_data)
+    # Spooled versions replace some published ones and add new reports
+    for i in (3, 10, 61, 62):
+        reports[f"r{i}"] = stored_report(i, rng)
+        provider.spool.append(f"r{i}", reports[f"r{i}"])
+
+    every_report = pd.DataFrame([build_report_row(report_id, data) for report_id, data in reports.items()])
+    for filters in ({}, {"systems": ["Claude"]}, {"report_types": ["Malign Actor", "Hazard Report"]},
+                    {"severities": ["High"], "statuses": "Closed"},
+                    {"date_from": "2026-01-02", "date_to": datetime(2026, 1, 4)}):
+        expected = all_pages(partial(get_query_engine().query, frame=every_report), **filters)
+        assert all_pages(provider.query_reports, **filters) == expected, filters
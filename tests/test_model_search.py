@@ -0,0 +1,99 @@
+import random
+import string
+from difflib import SequenceMatcher
+import pytest
+
+from form.data.model_index import CompactModelIndex
+from form.data.model_search import ModelSearchIndex, PinnedSearchIndex
+
+
+@pytest.fixture(scope="module")
+def models():
+    rng = random.Random(7)
+    orgs = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 8))) for _ in range(40)]
+    names = ["llama", "gpt", "mistral", "bert", "t5", "whisper", "qwen", "phi"]
+    alphabet = string.ascii_letters + string.digits + "-_."
+    ids = set()
+    while len(ids) < 3000:
+        name = f"{rng.choice(names)}{''.join(rng.choices(alphabet, k=rng.randint(0, 12)))}"
+        ids.add(f"{rng.choice(orgs)}/{name}" if rng.random() < 0.9 else name)
+    downloads = rng.sample(range(10 ** 6), len(ids))
+    return [{"id": model_id, "downloads": count} for model_id, count in zip(sorted(ids), downloads)]
+
+
+@pytest.fixture(scope="module")
+def ranking(models):
+    """Model IDs, most downloaded first"""
+    return [model["id"] for model in sorted(models, key=lambda model: -model["downloads"])]
+
+
+@pytest.fixture(scope="module")
+def index(models):
+    return ModelSearchIndex(CompactModelIndex.build(models))
+
+
+def naive_substring_matches(ranking, query, limit, exclude=()):
+    """The documented ranking, by scanning every ID"""
+    query = query.strip().lower()
+    matches = [model_id for model_id in ranking if query in model_id.lower() and model_id not in exclude]
+
+    def tier(model_id):
+        lowered = model_id.lower()
+        if lowered == query:
+            return 0
+        if lowered.startswith(query):
+            return 1
+        if "/" in lowered and lowered.rsplit("/", 1)[1].startswith(query):
+            return 2
+        return 3
+
+    # Only the first limit * 4 matches in download order are ranked
+    window = matches[:limit * 4]
+    return sorted(window, key=lambda model_id: (tier(model_id), window.index(model_id)))[:limit]
+
+
+def queries(ranking):
+    rng = random.Random(3)
+    picked = ["l", "ll", "a", "-", "gpt", "LLAMA", "/ph", "qwen7", "zzzz", " whisper ", "t5"]
+    for model_id in rng.sample(ranking, 40):
+        start = rng.randrange(len(model_id))
+        picked.append(model_id[start:start + rng.randint(1, 6)])
+    picked.extend(rng.sample(ranking, 5))
+    return picked
+
+
+def test_substring_matches_equal_a_naive_scan(index, ranking):
+    for query in queries(ranking):
+        for limit in (1, 10, 50):
+            assert index.substring_matches(query, limit) == naive_substring_matches(ranking, query, limit), query
+
+
+def test_substring_matches_skip_excluded_ids(index, ranking):
+    exclude = set(naive_substring_matches(ranking, "llama", 5))
+
+    assert index.substring_matches("llama", 10, exclude) == naive_substring_matches(ranking, "llama", 10, exclude)
+
+
+def test_top_is_the_download_ranking(index, ranking):
+    assert index.top(25) == ranking[:25]
+    assert index.top(5, exclude=set(ranking[:2])) == ranking[2:7]
+    assert len(index) == len(ranking)
+
+
+def test_close_matches_are_similar_ids_in_score_order(index, ranking):
+    target = ranking[10]
+    typo = target[:-1] + ("x" if target[-1] != "x" else "y")
+
+    matches = index.close_matches(typo, limit=5)
+
+    assert target in matches
+    scores = [SequenceMatcher(None, model_id.lower(), typo.lower()).ratio() for model_id in matches]
+    assert all(score >= 0.6 for score in scores)
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_pinned_entries_are_suggested_first(index):
+    pinned = PinnedSearchIndex(ModelSearchIndex.from_names(["GPT-4", "Other"]), index)
+
+    assert pinned.substring_matches("gpt", 3)[0] == "GPT-4"
+    assert pinned.top(2) == ["GPT-4", "Other"]
@@ -0,0 +1,70 @@
+import os
+import pytest
+from huggingface_hub.utils import EntryNotFoundError
+
+from storage.read_cache import RevisionCache
+
+
+class FakeRepo:
+    """Files per commit, counting downloads"""
+
+    def __init__(self, commits):
+        self.commits = commits
+        self.downloads = []
+
+    def download(self, revision, path, local_dir):
+        self.downloads.append((revision, path))
+        if path not in self.commits[revision]:
+            raise EntryNotFoundError(path)
+        local_path = os.path.join(local_dir, path)
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        with open(local_path, "wb") as f:
+            f.write(self.commits[revision][path])
+        return local_path
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_files_with_a_blob_id_are_shared_across_commits(tmp_path):
+    repo = FakeRepo({"c1": {"a.json": b"one"}, "c2": {"a.json": b"one"}, "c3": {"a.json": b"two"}})
+    cache = RevisionCache(str(tmp_path))
+
+    first = cache.get("c1", "a.json", repo.download, blob_id="blob-one")
+    second = cache.get("c2", "a.json", repo.download, blob_id="blob-one")
+    changed = cache.get("c3", "a.json", repo.download, blob_id="blob-two")
+
+    assert first == second
+    assert read(second) == b"one" and read(changed) == b"two"
+    assert repo.downloads == [("c1", "a.json"), ("c3", "a.json")]
+
+
+def test_files_without_a_blob_id_are_cached_per_commit(tmp_path):
+    repo = FakeRepo({"c1": {"manifest.json": b"v1"}, "c2": {"manifest.json": b"v2"}})
+    cache = RevisionCache(str(tmp_path))
+
+    assert read(cache.get("c1", "manifest.json", repo.download)) == b"v1"
+    assert read(cache.get("c1", "manifest.json", repo.download)) == b"v1"
+    assert read(cache.get("c2", "manifest.json", repo.download)) == b"v2"
+    assert len(repo.downloads) == 2
+
+
+def test_written_through_blobs_are_found_from_any_commit(tmp_path):
+    repo = FakeRepo({"c2": {}})
+    cache = RevisionCache(str(tmp_path))
+    cache.put("c1", "shard.parquet", b"rows", blob_id="sha-rows")
+
+    assert read(cache.get("c2", "shard.parquet", repo.download, blob_id="sha-rows")) == b"rows"
+    assert repo.downloads == []
+
+
+def test_missing_files_are_remembered(tmp_path):
+    repo = FakeRepo({"c1": {}})
+    cache = RevisionCache(str(tmp_path))
+
+    for _ in range(2):
+        with pytest.raises(EntryNotFoundError):
+            cache.get("c1", "gone.json", repo.download)
+    assert len(repo.downloads) == 1
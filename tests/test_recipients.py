@@ -0,0 +1,170 @@
+import os
+import random
+import pandas as pd
+import pytest
+
+from form.data.org_resolver import OrgResolver
+from form.utils.recipients import RULES_PATH, RecipientRouter, get_recipient_router, load_routing_rules
+
+VENDORS = {
+    "GPT-4": ("OpenAI", "https://openai.com/security"),
+    "ChatGPT": ("OpenAI", "https://openai.com/security"),
+    "Claude": ("Anthropic", "mailto:security@anthropic.com"),
+    "Llama 3": ("Meta", None),
+    "Gemini": ("Google", "https://bughunters.google.com"),
+}
+
+HARM_TYPES = ["Child sexual-abuse material (CSAM)", "Privacy", "Physical harm", "Misinformation"]
+SEVERITIES = ["Critical", "High", "Medium", "Low"]
+REPORT_TYPES = ["Real-World Incidents", "Security Incident Report", "Hazard Report", "Malign Actor"]
+
+
+class StubResolver:
+    """Resolves the systems in VENDORS; anything else has no organization"""
+
+    def resolve(self, name):
+        organization, disclosure = VENDORS.get(name, (None, None))
+        return {"organization": organization, "disclosure": disclosure}
+
+
+def many_rules(count):
+    """Rules spread over every dimension, more than fit in one mask word"""
+    rng = random.Random(count)
+    rules = []
+    for i in range(count):
+        when = {}
+        if rng.random() < 0.4:
+            when["harm_types"] = rng.sample(HARM_TYPES, rng.randint(1, 2))
+        if rng.random() < 0.4:
+            when["severities"] = rng.sample(SEVERITIES, rng.randint(1, 2))
+        if rng.random() < 0.4:
+            when["report_types"] = rng.sample(REPORT_TYPES, rng.randint(1, 2))
+        if rng.random() < 0.3:
+            when["organizations"] = rng.sample(["OpenAI", "Anthropic", "Meta", "Google"], 2)
+        rule = {"id": f"rule-{i}", "when": when,
+                "recipient": {"name": f"Recipient {i % 50}", "type": "Authority",
+                              "contact": f"https://example.org/{i % 50}", "reason": f"Rule {i}"}}
+        if rng.random() < 0.2:
+            rule["for_each"] = "organization"
+            rule["recipient"] = {"name": "{organization}", "type": "Developer",
+                                 "contact": "{disclosure}", "reason": f"Rule {i} for {{organization}}"}
+        rules.append(rule)
+    return rules
+
+
+def random_reports(count, seed=0):
+    rng = random.Random(seed)
+    systems = [*VENDORS, "Some unknown model"]
+    reports = []
+    for _ in range(count):
+        form_data = {}
+        if rng.random() < 0.9:
+            systems_field = "Implicated Systems" if rng.random() < 0.2 else "Systems"
+            form_data[systems_field] = rng.sample(systems, rng.randint(0, 3))
+        if rng.random() < 0.8:
+            form_data["Experienced Harm Types"] = rng.sample(HARM_TYPES, rng.randint(0, 2))
+        if rng.random() < 0.8:
+            form_data["Severity"] = rng.choice(SEVERITIES)
+        if rng.random() < 0.8:
+            form_data["Report Types"] = rng.sample(REPORT_TYPES, rng.randint(1, 2))
+        reports.append(form_data)
+    return reports
+
+
+def recipient_tuples(recipients):
+    return [(r.name, r.recipient_type, r.contact, r.reason) for r in recipients]
+
+
+@pytest.mark.parametrize("rules", [load_routing_rules(RULES_PATH), many_rules(150)], ids=["shipped", "150-rules"])
+def test_route_frame_matches_route(rules):
+    router = RecipientRouter(rules, resolver=StubResolver())
+    reports = random_reports(400)
+
+    routed = router.route_frame(pd.DataFrame(reports, index=[f"report-{i}" for i in range(len(reports))]))
+    assert not routed.empty
+
+    for i, form_data in enumerate(reports):
+        rows = routed[routed["report"] == f"report-{i}"]
+        frame_recipients = list(rows[["name", "type", "contact", "reason"]].itertuples(index=False, name=None))
+        assert frame_recipients == recipient_tuples(router.route(form_data)), form_data
+
+
+def test_developer_recipients_come_from_resolved_organizations():
+    router = RecipientRouter(load_routing_rules(RULES_PATH), resolver=StubResolver())
+
+    recipients = router.route({"Systems": ["GPT-4", "ChatGPT", "Llama 3", "Claude"]})
+
+    developers = [(r.name, r.contact) for r in recipients if r.recipient_type == "Developer"]
+    # Organizations appear once, in system order; Meta has no disclosure contact
+    assert developers == [("OpenAI", "https://openai.com/security"),
+                          ("Anthropic", "mailto:security@anthropic.com")]
+
+
+def test_route_frame_of_no_reports_is_empty():
+    router = RecipientRouter(many_rules(10), resolver=StubResolver())
+
+    routed = router.route_frame(pd.DataFrame([]))
+
+    assert routed.empty
+    assert list(routed.columns) == ["report", "rule", "name", "type", "contact", "reason"]
+
+
+def baseline_developers(systems):
+    """Developer recipients chosen by the keyword checks that preceded the rules table"""
+    developers = []
+    for system in systems:
+        if "OpenAI" in system or "GPT" in system:
+            developer = ("OpenAI", "https://openai.com/security/vulnerability-reporting")
+        elif "Anthropic" in system or "Claude" in system:
+            developer = ("Anthropic", "https://www.anthropic.com/security")
+        elif "Google" in system or "Gemini" in system or "Bard" in system:
+            developer = ("Google", "https://bughunters.google.com/")
+        elif "Meta" in system or "Llama" in system:
+            developer = ("Meta", "https://www.facebook.com/whitehat")
+        else:
+            continue
+        if developer not in developers:
+            developers.append(developer)
+    return developers
+
+
+def routed_developers(router, systems):
+    return [(r.name, r.contact) for r in router.route({"Systems": systems}) if r.recipient_type == "Developer"]
+
+
+def test_developer_routing_against_the_keyword_baseline():
+    router = RecipientRouter(load_routing_rules(RULES_PATH), resolver=OrgResolver())
+
+    unchanged = ["GPT-4", "ChatGPT", "Claude 3 Opus", "Anthropic API", "Gemini Pro", "Bard", "Google Bard",
+                 "Meta AI", "Llama 3", "meta-llama/Llama-3-8B", "OpenAI o1", "GPTZero", "Unknown model"]
+    for system in unchanged:
+        assert routed_developers(router, [system]) == baseline_developers([system]), system
+
+    # Matching is case-insensitive, Hugging Face owners are resolved, and the short
+    # aliases "meta" and "bard" only match whole words
+    changed = {
+        "gpt-4": ["OpenAI"],
+        "claude": ["Anthropic"],
+        "bard": ["Google"],
+        "meta": ["Meta"],
+        "llama-3-8b": ["Meta"],
+        "google/gemma-7b": ["Google"],
+        "Metaverse bot": [],
+        "Metamodel": [],
+        "Bardic LLM": [],
+    }
+    for system, organizations in changed.items():
+        assert [name for name, _ in routed_developers(router, [system])] == organizations, system
+        assert [name for name, _ in baseline_developers([system])] != organizations, system
+
+
+def test_broken_rules_file_keeps_the_last_good_router(tmp_path, caplog):
+    rules_path = tmp_path / "rules.json"
+    rules_path.write_text(RULES_PATH.read_text())
+    router = get_recipient_router(rules_path)
+
+    rules_path.write_text("{not json")
+    os.utime(rules_path, ns=(0, rules_path.stat().st_mtime_ns + 10 ** 9))
+
+    assert get_recipient_router(rules_path) is router
+    assert "Could not reload routing rules" in caplog.text
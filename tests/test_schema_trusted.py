@@ -0,0 +1,72 @@
+import random
+import pytest
+from pydantic import ValidationError
+
+from form.data import schema
+from form.data.schema import build_jsonld_document, process_raw_report, verify_trusted_fast_path
+
+
+def stored_records(count, seed=0):
+    """Records shaped like stored, previously validated form data"""
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        record = {
+            "Report ID": f"report-{i}",
+            "Disclosure Intent": rng.choice(["Yes", "No", "Undecided", "Already Public Knowledge"]),
+            "Report Types": rng.sample(["Real-World Incidents", "Malign Actor", "Security Incident Report",
+                                        "Vulnerability Report", "Hazard Report"], rng.randint(0, 3)),
+        }
+        optional = {
+            "Reporter ID": f"reporter-{i}",
+            "Systems": rng.sample(["GPT-4", "Claude", "Llama 3", "Unknown model"], rng.randint(0, 3)),
+            "Severity": rng.choice(["Negligible", "Low", "Medium", "High", "Critical", None]),
+            "Prevalence": "Common",
+            "Incident Description": "Harm already happened",
+            "Flaw Description - Detailed": "Steps to reproduce",
+            "Potential Policy Violation": "Section 2",
+            "Impacts": ["Financial"],
+            "Attacker Resources": ["API access"],
+            "Proof-of-Concept Exploit": "curl ...",
+            "Statistical Argument with Examples": "9 of 10 prompts",
+            "Disclosure Channels": ["Email"],
+            "Risk Source(s)": {"Responsible Factors": ["Training data"]},
+            "Custom Extra": i,
+        }
+        for field, value in optional.items():
+            if rng.random() < 0.5:
+                record[field] = value
+        records.append(record)
+    return records
+
+
+def without_creation_time(document):
+    return {key: value for key, value in document.items() if key != "dateCreated"}
+
+
+def test_trusted_path_matches_full_validation():
+    for record in stored_records(200):
+        assert verify_trusted_fast_path(record) is None, record
+        assert (without_creation_time(build_jsonld_document(record, trusted=True))
+                == without_creation_time(build_jsonld_document(record)))
+
+
+def test_untrusted_input_is_still_validated():
+    with pytest.raises(ValidationError):
+        process_raw_report({"Report ID": "r1", "Disclosure Intent": "Maybe"})
+
+
+def test_verify_mode_rejects_divergent_trusted_results(monkeypatch):
+    monkeypatch.setattr(schema, "VERIFY_TRUSTED_PATH", True)
+    trusted_raw_report = schema._trusted_raw_report
+
+    def diverging_raw_report(raw_data):
+        raw_report = trusted_raw_report(raw_data)
+        raw_report.severity = "Critical"
+        return raw_report
+
+    monkeypatch.setattr(schema, "_trusted_raw_report", diverging_raw_report)
+    record = {**stored_records(1)[0], "Severity": "Low"}
+
+    with pytest.raises(AssertionError, match="severity"):
+        process_raw_report(record, trusted=True)
@@ -0,0 +1,196 @@
+import os
+import sys
+import glob
+import json
+import time
+import subprocess
+import textwrap
+import pytest
+
+from storage import spool as spool_module
+from storage.spool import ReportSpool
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+needs_flock = pytest.mark.skipif(spool_module.fcntl is None, reason="requires fcntl.flock")
+
+
+def report(i):
+    return {"form_data": {"Report ID": f"r{i}"}, "timestamp": f"2026-01-01T00:00:{i:02d}"}
+
+
+def run_exited_process(spool_dir, appended, acknowledged=0):
+    """Spool reports from a separate process that exits without publishing them all"""
+    script = textwrap.dedent(f"""
+        import sys
+        sys.path.insert(0, {REPO_ROOT!r})
+        from storage.spool import ReportSpool
+        spool = ReportSpool({spool_dir!r})
+        entry_ids = [
+            spool.append(f"r{{i}}", {{"form_data": {{"Report ID": f"r{{i}}"}}, "timestamp": "2026-01-01T00:00:00"}})
+            for i in range({appended})
+        ]
+        spool.acknowledge(entry_ids[:{acknowledged}])
+    """)
+    subprocess.run([sys.executable, "-c", script], check=True)
+
+
+def log_records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_replays_unacknowledged_entries_after_restart(tmp_path):
+    run_exited_process(str(tmp_path), appended=4, acknowledged=1)
+
+    spool = ReportSpool(str(tmp_path))
+
+    assert [entry["report_id"] for entry in spool.pending()] == ["r1", "r2", "r3"]
+    assert spool.get("r2")["form_data"] == {"Report ID": "r2"}
+    assert spool.get("r0") is None
+    assert glob.glob(str(tmp_path / "outbox*.jsonl")) == [spool.log_path]
+
+
+def test_acknowledge_compacts_the_log(tmp_path):
+    spool = ReportSpool(str(tmp_path))
+    spool.compact_after = 2
+    entry_ids = [spool.append(f"r{i}", report(i)) for i in range(3)]
+
+    spool.acknowledge(entry_ids[:2])
+
+    assert [record["entry_id"] for record in log_records(spool.log_path)] == entry_ids[2:]
+    assert len(spool) == 1
+
+    spool.acknowledge(entry_ids[2:])
+
+    assert log_records(spool.log_path) == []
+    assert spool.pending() == []
+
+
+def test_torn_final_line_is_ignored(tmp_path):
+    orphan = tmp_path / "outbox-orphan.jsonl"
+    put = {"op": "put", "entry_id": "e1", "report_id": "r1", "report": report(1)}
+    orphan.write_text(json.dumps(put) + "\n" + '{"op": "put", "entry_id": "e2", "rep')
+
+    spool = ReportSpool(str(tmp_path))
+
+    assert [entry["entry_id"] for entry in spool.pending()] == ["e1"]
+    assert not orphan.exists()
+
+
+@needs_flock
+def test_two_live_spools_keep_each_others_entries(tmp_path):
+    first = ReportSpool(str(tmp_path))
+    second = ReportSpool(str(tmp_path))
+    first_id = first.append("a", report(1))
+    second_id = second.append("b", report(2))
+
+    # Acknowledging everything compacts the first log; the second one must survive
+    first.acknowledge([first_id])
+
+    assert first.adopt_orphans() == 0
+    assert [entry["entry_id"] for entry in second.pending()] == [second_id]
+    assert [record["entry_id"] for record in log_records(second.log_path)] == [second_id]
+    assert first.pending() == []
+
+
+@needs_flock
+def test_orphaned_entries_are_adopted_exactly_once(tmp_path):
+    run_exited_process(str(tmp_path), appended=3)
+
+    first = ReportSpool(str(tmp_path))
+    second = ReportSpool(str(tmp_path))
+
+    adopted = [entry["report_id"] for entry in first.pending() + second.pending()]
+    assert sorted(adopted) == ["r0", "r1", "r2"]
+    assert sorted(glob.glob(str(tmp_path / "outbox*.jsonl"))) == sorted([first.log_path, second.log_path])
+
+
+def test_flusher_retries_failed_batches_and_acknowledges(tmp_path):
+    spool = ReportSpool(str(tmp_path))
+    published = []
+    attempts = []
+
+    def flush(batch):
+        attempts.append(len(batch))
+        if len(attempts) == 1:
+            raise RuntimeError("hub unavailable")
+        published.extend(entry["report_id"] for entry in batch)
+
+    for i in range(5):
+        spool.append(f"r{i}", report(i))
+    flusher = spool.start_flusher(flush, batch_size=2, interval=0.01, max_backoff=0.05)
+
+    deadline = time.monotonic() + 10
+    while len(spool) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert len(spool) == 0
+    assert published == ["r0", "r1", "r2", "r3", "r4"]
+    assert attempts[0] == 2
+    assert flusher.failures == 0
+
+
+class Forbidden(Exception):
+    """An HTTP error as raised by the Hub client"""
+
+    class response:
+        status_code = 403
+
+
+def drain(spool):
+    deadline = time.monotonic() + 10
+    while len(spool) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_permanent_failures_are_dead_lettered_without_blocking_the_queue(tmp_path):
+    spool = ReportSpool(str(tmp_path))
+    published = []
+
+    def flush(batch):
+        if any(entry["report_id"] == "r1" for entry in batch):
+            raise Forbidden("403 Forbidden")
+        published.extend(entry["report_id"] for entry in batch)
+
+    for i in range(4):
+        spool.append(f"r{i}", report(i))
+    flusher = spool.start_flusher(flush, batch_size=3, interval=0.01, max_backoff=0.05)
+    drain(spool)
+
+    assert len(spool) == 0
+    assert published == ["r0", "r2", "r3"]
+    assert flusher.dead_lettered == 1 and flusher.failures == 0
+    assert [(entry["report_id"], entry["error"]) for entry in spool.dead_letters()] == [("r1", "403 Forbidden")]
+    # Dead letters are shared by every spool on the directory and survive restarts
+    assert ReportSpool(str(tmp_path)).dead_letter_count() == 1
+
+
+def test_transient_failures_are_not_dead_lettered(tmp_path):
+    spool = ReportSpool(str(tmp_path))
+    attempts = []
+
+    def flush(batch):
+        attempts.append(len(batch))
+        if len(attempts) < 3:
+            raise ConnectionError("connection reset")
+
+    spool.append("r0", report(0))
+    spool.start_flusher(flush, interval=0.01, max_backoff=0.05)
+    drain(spool)
+
+    assert len(spool) == 0
+    assert len(attempts) == 3
+    assert spool.dead_letter_count() == 0
+
+
+def test_requeued_dead_letters_are_published_again(tmp_path):
+    spool = ReportSpool(str(tmp_path))
+    spool.append("r0", report(0))
+    spool.dead_letter(spool.pending(), "413 Payload Too Large")
+    assert len(spool) == 0
+
+    assert spool.requeue_dead_letters() == 1
+
+    assert [entry["report_id"] for entry in spool.pending()] == ["r0"]
+    assert spool.dead_letter_count() == 0